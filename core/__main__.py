@@ -0,0 +1,11 @@
+import os
+import sys
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if base_dir not in sys.path:
+    sys.path.insert(0, base_dir)
+
+from core.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
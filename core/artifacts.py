@@ -0,0 +1,73 @@
+import os
+import json
+import hashlib
+from contextlib import contextmanager
+
+from core.utils import norm_path
+
+_active = None
+
+
+class Artifacts:
+    """工作流运行期间在步骤之间交接的内存产物：路径 → TTFont / 映射表 dict。
+
+    handoff 中的路径不写盘，由上游步骤 put、下游步骤 take/get；其余路径照常读写文件。"""
+
+    def __init__(self, handoff=()):
+        self.handoff = {norm_path(p) for p in handoff}
+        self.items = {}
+
+    def close(self):
+        for obj in self.items.values():
+            if hasattr(obj, 'close'):
+                try:
+                    obj.close()
+                except:
+                    pass
+        self.items.clear()
+
+
+@contextmanager
+def activate(artifacts):
+    global _active
+    previous, _active = _active, artifacts
+    try:
+        yield artifacts
+    finally:
+        _active = previous
+
+
+def is_handoff(path):
+    """当前工作流中该路径只在内存中交给下游步骤，不必写盘。"""
+    return bool(path) and _active is not None and norm_path(path) in _active.handoff
+
+
+def put(path, obj):
+    _active.items[norm_path(path)] = obj
+
+
+def get(path):
+    """读取内存中的产物 (不转移所有权)，没有时返回 None。"""
+    if not path or _active is None:
+        return None
+    return _active.items.get(norm_path(path))
+
+
+def take(path):
+    """取走内存中的产物 (如 TTFont)，调用方之后可以随意修改；没有时返回 None。"""
+    if not path or _active is None:
+        return None
+    return _active.items.pop(norm_path(path), None)
+
+
+def available(path):
+    return get(path) is not None
+
+
+def exists(path):
+    return available(path) or (bool(path) and os.path.exists(path))
+
+
+def mapping_digest(mapping):
+    text = json.dumps(mapping, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()
@@ -0,0 +1,70 @@
+import os
+import threading
+
+from core.error_handler import TaskCancelled
+
+
+class CancelToken:
+    """协作式取消标记：任务在字形/文件/分页循环里调用 check()，已取消时抛出 TaskCancelled。
+
+    event 可以传入 multiprocessing 的 Event，这样父进程就能取消子进程里的任务。"""
+
+    def __init__(self, event=None):
+        self._event = event if event is not None else threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise TaskCancelled("任务已取消")
+
+
+def _listing(path):
+    if os.path.isdir(path):
+        entries = {path}
+        for root, dirs, files in os.walk(path):
+            entries.update(os.path.join(root, d) for d in dirs)
+            entries.update(os.path.join(root, f) for f in files)
+        return entries
+    return {path} if os.path.exists(path) else set()
+
+
+class OutputGuard:
+    """记下任务开始前各输出路径下已有的文件；任务被取消时撤回本次新增的历史记录
+    (恢复被覆盖的文件、删除新建的文件)，再删掉其余新产生的半成品文件和空目录。
+
+    history 为 None 时只做文件清理。"""
+
+    def __init__(self, paths, history=None):
+        self.paths = list(paths)
+        self.history = history
+        self._snapshot = history.snapshot() if history is not None else None
+        self._before = set()
+        for path in self.paths:
+            self._before |= _listing(path)
+
+    def rollback(self):
+        """返回 (撤回的历史记录数, 删除的文件数)。"""
+        undone = self.history.rollback(self._snapshot) if self.history is not None else 0
+        created = set()
+        for path in self.paths:
+            created |= _listing(path) - self._before
+
+        removed = 0
+        # 先删文件，再由深到浅删目录
+        for path in sorted(created, key=len, reverse=True):
+            try:
+                if os.path.isdir(path):
+                    if not os.listdir(path):
+                        os.rmdir(path)
+                else:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+        return undone, removed
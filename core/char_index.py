@@ -0,0 +1,75 @@
+import os
+import sqlite3
+from core.utils import get_cache_dir
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT NOT NULL,
+    opts TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    chars BLOB NOT NULL,
+    PRIMARY KEY (path, opts)
+)
+"""
+
+
+def _pack_chars(chars):
+    return "".join(sorted(chars)).encode('utf-8', 'surrogatepass')
+
+
+def _unpack_chars(blob):
+    return bytes(blob).decode('utf-8', 'surrogatepass')
+
+
+class CharIndex:
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(get_cache_dir(), "char_index.sqlite")
+        self.conn = sqlite3.connect(self.db_path, timeout=30)
+        self.conn.execute(_SCHEMA)
+        self.conn.commit()
+
+    def lookup(self, paths, opts):
+        result = {}
+        cur = self.conn.cursor()
+        keys = {os.path.abspath(p): p for p in paths}
+        key_list = list(keys)
+        for i in range(0, len(key_list), 500):
+            chunk = key_list[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            cur.execute(f"SELECT path, size, mtime_ns, hash, chars FROM files "
+                        f"WHERE opts = ? AND path IN ({marks})", [opts] + chunk)
+            for key, size, mtime_ns, digest, blob in cur.fetchall():
+                result[keys[key]] = (size, mtime_ns, digest, _unpack_chars(blob))
+        return result
+
+    def store(self, records, opts):
+        rows = [(os.path.abspath(path), opts, size, mtime_ns, digest, _pack_chars(chars))
+                for path, size, mtime_ns, digest, chars in records]
+        if not rows:
+            return
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def forget(self, paths, opts):
+        with self.conn:
+            self.conn.executemany("DELETE FROM files WHERE path = ? AND opts = ?",
+                                  [(os.path.abspath(p), opts) for p in paths])
+
+    def prune(self, root):
+        """删除 root 目录下已不存在的文件的记录 (不区分读取选项)。"""
+        prefix = os.path.join(os.path.abspath(root), '')
+        rows = self.conn.execute("SELECT DISTINCT path FROM files WHERE substr(path, 1, ?) = ?",
+                                 (len(prefix), prefix)).fetchall()
+        gone = [(path,) for path, in rows if not os.path.exists(path)]
+        if gone:
+            with self.conn:
+                self.conn.executemany("DELETE FROM files WHERE path = ?", gone)
+        return len(gone)
+
+    def close(self):
+        try:
+            self.conn.close()
+        except:
+            pass
@@ -0,0 +1,200 @@
+import numpy as np
+
+UNICODE_SIZE = 0x110000
+_NBYTES = UNICODE_SIZE // 8
+_DENSE_THRESHOLD = 1 << 16
+
+if hasattr(np, 'bitwise_count'):
+    def _popcount(bits):
+        return int(np.bitwise_count(bits).sum(dtype=np.int64))
+else:
+    _POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def _popcount(bits):
+        return int(_POPCOUNT[bits].sum(dtype=np.int64))
+
+
+def _text_codes(text):
+    return np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype='<u4')
+
+
+class Charset:
+    """Unicode 字符集合：0x110000 位的位图 (np.packbits 布局，139 KB)。
+
+    支持 | & - ^、len、in、按码位升序迭代 (产出单字符 str)；可以直接和普通 set 混用。"""
+
+    __slots__ = ('bits',)
+
+    def __init__(self, chars=None, bits=None):
+        self.bits = np.zeros(_NBYTES, dtype=np.uint8) if bits is None else bits
+        if chars is not None:
+            self.update(chars)
+
+    @classmethod
+    def from_codes(cls, codes):
+        cs = cls()
+        cs.add_codes(codes)
+        return cs
+
+    @classmethod
+    def from_bits(cls, bits):
+        bits = np.asarray(bits, dtype=np.uint8)
+        if bits.shape != (_NBYTES,):
+            raise ValueError(f"位图长度应为 {_NBYTES} 字节")
+        return cls(bits=bits)
+
+    @classmethod
+    def from_range(cls, start, end):
+        return cls.from_codes(np.arange(start, end + 1))
+
+    # ---- 写入 ----
+    def add_codes(self, codes):
+        codes = np.asarray(codes, dtype=np.int64).ravel()
+        codes = codes[(codes >= 0) & (codes < UNICODE_SIZE)]
+        if len(codes) > _DENSE_THRESHOLD:
+            # 大批量 (整块文本) 走整张布尔表，避免排序去重
+            mask = np.zeros(UNICODE_SIZE, dtype=bool)
+            mask[codes] = True
+            self.bits |= np.packbits(mask)
+        elif len(codes):
+            codes = np.unique(codes)
+            np.bitwise_or.at(self.bits, codes >> 3, (0x80 >> (codes & 7)).astype(np.uint8))
+
+    def add(self, char):
+        self.add_codes([char if isinstance(char, int) else ord(char)])
+
+    def update(self, *others):
+        for other in others:
+            if isinstance(other, Charset):
+                self.bits |= other.bits
+            elif isinstance(other, str):
+                self.add_codes(_text_codes(other))
+            elif isinstance(other, np.ndarray):
+                self.add_codes(other)
+            else:
+                items = list(other)
+                if items and all(isinstance(x, str) for x in items):
+                    self.add_codes(_text_codes("".join(items)))
+                elif items:
+                    self.add_codes([x if isinstance(x, int) else ord(x) for x in items])
+
+    def clear(self):
+        self.bits[:] = 0
+
+    def copy(self):
+        return Charset(bits=self.bits.copy())
+
+    # ---- 查询 ----
+    def codes(self):
+        """升序码位数组；只展开非零字节。"""
+        nonzero = np.flatnonzero(self.bits)
+        mask = np.unpackbits(self.bits[nonzero]).reshape(-1, 8).astype(bool)
+        return ((nonzero[:, None] << 3) + np.arange(8))[mask]
+
+    def count_range(self, start, end):
+        """闭区间 [start, end] 内的字符数。"""
+        start, end = max(start, 0), min(end, UNICODE_SIZE - 1)
+        if start > end:
+            return 0
+        first, last = start >> 3, end >> 3
+        head_mask = 0xFF >> (start & 7)
+        tail_mask = (0xFF << (7 - (end & 7))) & 0xFF
+        if first == last:
+            return bin(int(self.bits[first]) & head_mask & tail_mask).count('1')
+        return (bin(int(self.bits[first]) & head_mask).count('1')
+                + bin(int(self.bits[last]) & tail_mask).count('1')
+                + _popcount(self.bits[first + 1:last]))
+
+    def select(self, predicate):
+        """返回满足 predicate(char) 的子集。"""
+        return Charset.from_codes([c for c in self.codes().tolist() if predicate(chr(c))])
+
+    def __len__(self):
+        return _popcount(self.bits)
+
+    def __bool__(self):
+        return bool(self.bits.any())
+
+    def __contains__(self, char):
+        code = char if isinstance(char, int) else (ord(char) if isinstance(char, str) and len(char) == 1 else -1)
+        if not 0 <= code < UNICODE_SIZE:
+            return False
+        return bool(self.bits[code >> 3] & (0x80 >> (code & 7)))
+
+    def __iter__(self):
+        return map(chr, self.codes().tolist())
+
+    def __repr__(self):
+        return f"<Charset {len(self)} chars>"
+
+    def __eq__(self, other):
+        other = _coerce(other)
+        if other is None:
+            return NotImplemented
+        return bool(np.array_equal(self.bits, other.bits))
+
+    __hash__ = None
+
+    def __getstate__(self):
+        return self.bits
+
+    def __setstate__(self, state):
+        self.bits = state
+
+    # ---- 集合运算 ----
+    def _binary(self, other, op):
+        other = _coerce(other)
+        if other is None:
+            return NotImplemented
+        return Charset(bits=op(self.bits, other.bits))
+
+    def _inplace(self, other, op):
+        other = _coerce(other)
+        if other is None:
+            return NotImplemented
+        op(self.bits, other.bits, out=self.bits)
+        return self
+
+    def __or__(self, other):
+        return self._binary(other, np.bitwise_or)
+
+    def __and__(self, other):
+        return self._binary(other, np.bitwise_and)
+
+    def __xor__(self, other):
+        return self._binary(other, np.bitwise_xor)
+
+    def __sub__(self, other):
+        return self._binary(other, lambda a, b: a & ~b)
+
+    __ror__, __rand__, __rxor__ = __or__, __and__, __xor__
+
+    def __rsub__(self, other):
+        other = _coerce(other)
+        if other is None:
+            return NotImplemented
+        return other - self
+
+    def __ior__(self, other):
+        return self._inplace(other, np.bitwise_or)
+
+    def __iand__(self, other):
+        return self._inplace(other, np.bitwise_and)
+
+    def __ixor__(self, other):
+        return self._inplace(other, np.bitwise_xor)
+
+    def __isub__(self, other):
+        other = _coerce(other)
+        if other is None:
+            return NotImplemented
+        self.bits &= ~other.bits
+        return self
+
+
+def _coerce(other):
+    if isinstance(other, Charset):
+        return other
+    if isinstance(other, (set, frozenset, str)):
+        return Charset(other)
+    return None
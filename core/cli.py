@@ -0,0 +1,367 @@
+import os
+import re
+import sys
+import json
+import argparse
+import traceback
+from html import unescape
+
+from core.error_handler import ConfigError
+from core.task_registry import run_task
+from core.text_scanner import find_files, scan_files, read_chars
+
+
+def _section(config, name):
+    value = config.get(name)
+    return value if isinstance(value, dict) else {}
+
+
+def _int(value, default):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _required(section, name, key):
+    """取必填项：缺少时报错，不用默认值顶替 (否则生成的结果与界面上的设置对不上)。"""
+    value = section.get(key)
+    if value is None or value == '':
+        raise ConfigError(f"配置 [{name}] 缺少 {key}")
+    return value
+
+
+def _number(section, name, key, kind=int):
+    value = _required(section, name, key)
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        raise ConfigError(f"配置 [{name}] 的 {key} 不是有效的数值: {value!r}")
+
+
+def _font_conf(config):
+    b = _section(config, 'basic')
+    return {
+        'src': b.get('src', ''),
+        'fallback': b.get('fallback', ''),
+        'json': b.get('json', ''),
+        'file_name': b.get('file_name', 'game.ttf'),
+        'internal_name': b.get('font_name', 'My Game Font'),
+        'mode': _int(b.get('mode'), 0),
+        'output_dir': b.get('output_dir', ''),
+    }
+
+
+def _map_conf(config):
+    m = _section(config, 'mapping')
+    return {
+        'src_dir': m.get('src', ''),
+        'out_dir': m.get('out', ''),
+        'out_json': m.get('json', 'custom_map.json'),
+        'exts': m.get('ext', 'txt; json'),
+        'limit_font': m.get('limit_font', ''),
+        'incremental': bool(m.get('incremental', False)),
+        'recycle': bool(m.get('recycle', False)),
+        'codepage': m.get('codepage', 'cp932'),
+        'manifest': m.get('manifest', ''),
+    }
+
+
+def _subset_conf(config):
+    s = _section(config, 'subset')
+    return {
+        'font_path': s.get('font', ''),
+        'txt_dir': s.get('txt', ''),
+        'json_path': s.get('json', ''),
+        'out_path': s.get('out', 'game_subset.ttf'),
+        'exts': s.get('exts', '.txt;.json'),
+    }
+
+
+def _woff2_conf(config):
+    w = _section(config, 'woff2')
+    return {'src': w.get('src', ''), 'out_path': w.get('out', 'webfont.woff2')}
+
+
+def _pic_conf(config):
+    p = _section(config, 'pic')
+    return {
+        'font': p.get('font', 'game.ttf'), 'folder': p.get('folder', 'image38'), 'format': p.get('fmt', 'webp'),
+        'fsize': _number(p, 'pic', 'fs'), 'count': _number(p, 'pic', 'cnt'),
+        'cw': _number(p, 'pic', 'cw'), 'ch': _number(p, 'pic', 'ch'),
+        'iw': _number(p, 'pic', 'iw'), 'ih': _number(p, 'pic', 'ih'),
+        'img_w': _number(p, 'pic', 'imw'), 'img_h': _number(p, 'pic', 'imh'),
+        'ix': _number(p, 'pic', 'ix'), 'iy': _number(p, 'pic', 'iy'),
+        'codepage': p.get('codepage', 'cp932'),
+    }
+
+
+def _tga_conf(config):
+    t = _section(config, 'tga')
+    return {
+        'font': t.get('font', 'game.ttf'), 'folder': 'tga_output', 'dat': t.get('dat', 'text'),
+        'eng_name': _required(t, 'tga', 'eng_n'), 'eng_path': _required(t, 'tga', 'eng_p'),
+        'fsize': _number(t, 'tga', 'fs'),
+        'cw': _number(t, 'tga', 'cw'), 'ch': _number(t, 'tga', 'ch'),
+        'iw': _number(t, 'tga', 'iw'), 'ih': _number(t, 'tga', 'ih'),
+        'img_w': _number(t, 'tga', 'w'), 'img_h': _number(t, 'tga', 'h'),
+        'codepage': t.get('codepage', 'cp932'),
+    }
+
+
+def _bmp_conf(config):
+    b = _section(config, 'bmp')
+    size = _number(b, 'bmp', 'sz')
+    return {
+        'font': b.get('font', 'game.ttf'), 'folder': 'bmp_output',
+        'fsize': _number(b, 'bmp', 'fs'), 'cw': size, 'ch': size,
+        'count': _number(b, 'bmp', 'cnt'), 'img_w': _number(b, 'bmp', 'w'),
+        'scale': _number(b, 'bmp', 'scale', float), 'depth': _number(b, 'bmp', 'depth'),
+        'codepage': b.get('codepage', 'cp932'),
+    }
+
+
+def _bmfont_conf(config):
+    b = _section(config, 'bmfont')
+    conf = {
+        'font_path': b.get('font', 'game.ttf'),
+        'tex_size': _int(b.get('tex_size'), 1024),
+        'font_size': _int(b.get('size'), 32),
+        'out_fnt': b.get('out', 'font.fnt'),
+    }
+    char_src = b.get('chars_from', '')
+    if char_src:
+        exts = ('.txt', '.json', '.c', '.cpp', '.h', '.hpp', '.py', '.md', '.ini')
+        if os.path.isdir(char_src):
+            found = scan_files(find_files(char_src, exts), errors='ignore')
+        else:
+            found = read_chars(char_src, errors='ignore')
+        conf['chars'] = sorted(c for c in found if c >= ' ')
+    else:
+        conf['chars'] = sorted(set(c for c in b.get('chars', '') if c >= ' '))
+    return conf
+
+
+def _smart_fallback_conf(config):
+    s = _section(config, 'smart_fallback')
+    costs = s.get('costs')
+    return {'primary': s.get('primary', ''), 'txt_dir': s.get('txt', ''), 'fb_dir': s.get('lib', ''),
+            'font_costs': costs if isinstance(costs, dict) else None}
+
+
+def _transplant_conf(config):
+    t = _section(config, 'transplant')
+    plan = t.get('plan')
+    return {'primary': t.get('primary', ''), 'plan': plan if isinstance(plan, dict) else {},
+            'fb_dir': t.get('lib', ''), 'out_path': t.get('out', 'game_filled.ttf')}
+
+
+def _tweak_width_conf(config):
+    t = _section(config, 'tweak_width')
+    return {'src': t.get('src', ''), 'scale': float(t.get('scale', 1.0)),
+            'dx': _int(t.get('dx'), 0), 'out_name': t.get('out', 'condensed.ttf')}
+
+
+def _cleanup_conf(config):
+    c = _section(config, 'cleanup')
+    return {'src': c.get('src', ''), 'out_path': c.get('out', 'game_clean.ttf'), 'tables': c.get('tables', [])}
+
+
+def _unified_fix_conf(config):
+    f = _section(config, 'fix')
+    return {
+        'src': _required(f, 'fix', 'src'), 'out_path': _required(f, 'fix', 'out'),
+        'scale_x': _number(f, 'fix', 'scale_x', float), 'scale_y': _number(f, 'fix', 'scale_y', float),
+        'spacing': _number(f, 'fix', 'spacing'),
+        'asc': _number(f, 'fix', 'asc'), 'desc': _number(f, 'fix', 'desc'), 'gap': _number(f, 'fix', 'gap'),
+    }
+
+
+def _apply_metrics_conf(config):
+    m = _section(config, 'metrics')
+    return {'path': _required(m, 'metrics', 'src'), 'asc': _number(m, 'metrics', 'asc'),
+            'desc': _number(m, 'metrics', 'desc'), 'gap': _number(m, 'metrics', 'gap')}
+
+
+def _save_info_conf(config):
+    i = _section(config, 'info')
+    names = i.get('names')
+    # names: {nameID: 新值}
+    rows = [(_int(k, -1), str(v)) for k, v in names.items()] if isinstance(names, dict) else []
+    return {'path': i.get('src', ''), 'rows': [(k, v) for k, v in rows if k >= 0]}
+
+
+def _merge_conf(config):
+    m = _section(config, 'merge')
+    return {'base': m.get('base', ''), 'add': m.get('add', ''), 'out_path': m.get('out', 'merged.ttf'),
+            'filter': m.get('filter', '')}
+
+
+def _convert_conf(config):
+    c = _section(config, 'convert')
+    return {'src': c.get('src', ''), 'out_path': c.get('out', '')}
+
+
+def _compare_conf(config):
+    c = _section(config, 'compare')
+    return {'path1': c.get('a', ''), 'path2': c.get('b', '')}
+
+
+def _checkup_conf(config):
+    c = _section(config, 'checkup')
+    return {'txt_dir': c.get('txt', ''), 'exts': c.get('exts', '.txt;.json'),
+            'font_path': c.get('font', ''), 'json_path': c.get('json', '')}
+
+
+# read_metrics / read_unified_metrics / read_info / coverage 只为界面填表，没有命令行入口
+CONF_BUILDERS = {
+    "font": _font_conf,
+    "subset": _subset_conf,
+    "woff2": _woff2_conf,
+    "pic": _pic_conf,
+    "tga": _tga_conf,
+    "bmp": _bmp_conf,
+    "bmfont": _bmfont_conf,
+    "map": _map_conf,
+    "smart_fallback": _smart_fallback_conf,
+    "transplant": _transplant_conf,
+    "tweak_width": _tweak_width_conf,
+    "cleanup": _cleanup_conf,
+    "unified_fix": _unified_fix_conf,
+    "apply_metrics": _apply_metrics_conf,
+    "save_info": _save_info_conf,
+    "merge": _merge_conf,
+    "convert": _convert_conf,
+    "compare": _compare_conf,
+    "checkup": _checkup_conf,
+}
+
+
+def build_task_conf(task_type, config, overrides=None):
+    builder = CONF_BUILDERS.get(task_type)
+    if builder is None:
+        raise ConfigError(f"未知的任务类型: {task_type}")
+    conf = builder(config)
+    if overrides:
+        conf.update(overrides)
+    return conf
+
+
+def load_jobs(config, task_types=None):
+    if task_types:
+        entries = list(task_types)
+    else:
+        entries = config.get('tasks', [])
+        if not entries:
+            raise ConfigError("配置中没有 tasks 列表，请用 --task 指定要执行的任务")
+
+    jobs = []
+    for entry in entries:
+        if isinstance(entry, str):
+            task_type, overrides = entry, None
+        elif isinstance(entry, dict) and 'type' in entry:
+            task_type, overrides = entry['type'], entry.get('conf')
+        else:
+            raise ConfigError(f"无法识别的任务条目: {entry!r}")
+        jobs.append((task_type, build_task_conf(task_type, config, overrides)))
+    return jobs
+
+
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def console_log(message):
+    text = re.sub(r"<br\s*/?>", "\n", str(message), flags=re.IGNORECASE)
+    text = unescape(_TAG_RE.sub("", text))
+    for line in text.splitlines():
+        if line.strip():
+            print(line, flush=True)
+
+
+def make_progress(task_type):
+    state = {'last': -1}
+
+    def prog(value):
+        value = max(0, min(100, int(value)))
+        if value // 10 != state['last'] // 10 and sys.stderr.isatty():
+            sys.stderr.write(f"\r[{task_type}] {value:3d}%")
+            sys.stderr.flush()
+            if value >= 100:
+                sys.stderr.write("\n")
+        state['last'] = value
+    return prog
+
+
+def run_jobs(jobs, keep_going=False):
+    failures = 0
+    for idx, (task_type, conf) in enumerate(jobs, 1):
+        console_log(f"📌 [{idx}/{len(jobs)}] {task_type}")
+        errors = []
+
+        def log(message):
+            if "❌" in str(message):
+                errors.append(message)
+            console_log(message)
+
+        try:
+            result = run_task(task_type, conf, log, make_progress(task_type))
+            if isinstance(result, str):
+                console_log(f"   -> {result}")
+        except Exception as e:
+            errors.append(e)
+            console_log(f"❌ [系统异常] {e}")
+            traceback.print_exc()
+
+        if errors:
+            failures += 1
+            if not keep_going:
+                break
+    return failures
+
+
+def run_pipeline(jobs, force=False):
+    steps = []
+    for idx, (task_type, conf) in enumerate(jobs, 1):
+        steps.append({'name': f"{task_type}#{idx}", 'task': task_type, 'conf': conf, 'title': task_type})
+    try:
+        result = run_task('pipeline', {'steps': steps, 'force': force}, console_log, make_progress('pipeline'))
+    except Exception as e:
+        console_log(f"❌ [系统异常] {e}")
+        traceback.print_exc()
+        return 1
+    return len(result['failed']) if result else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core", description="GalFontTool 无界面批处理")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_run = sub.add_parser('run', help="按导出的配置文件执行任务")
+    p_run.add_argument('config', help="do_export_config 导出的 .gft/.json 配置")
+    p_run.add_argument('-t', '--task', action='append', dest='tasks', choices=sorted(CONF_BUILDERS),
+                       help="要执行的任务类型，可重复指定；缺省时读取配置中的 tasks 列表")
+    p_run.add_argument('-k', '--keep-going', action='store_true', help="某个任务失败后继续执行后续任务")
+    p_run.add_argument('-p', '--pipeline', action='store_true',
+                       help="按读写路径的依赖关系执行，输入未变化的步骤直接沿用上次的结果")
+    p_run.add_argument('-f', '--force', action='store_true', help="配合 --pipeline 使用，忽略缓存全部重跑")
+
+    sub.add_parser('list', help="列出可用的任务类型")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        for name in sorted(CONF_BUILDERS):
+            print(name)
+        return 0
+
+    try:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        jobs = load_jobs(config, args.tasks)
+    except (OSError, ValueError, ConfigError) as e:
+        console_log(f"❌ 配置读取失败: {e}")
+        return 2
+
+    if args.pipeline:
+        return 1 if run_pipeline(jobs, args.force) else 0
+    return 1 if run_jobs(jobs, args.keep_going) else 0
@@ -0,0 +1,138 @@
+import mmap
+import struct
+
+import numpy as np
+
+from core.charset import Charset
+
+# 与 fontTools getBestCmap 相同的子表优先级
+_PREFERRED = ((3, 10), (0, 6), (0, 4), (3, 1), (0, 3), (0, 2), (0, 1), (0, 0))
+_SFNT_VERSIONS = (b"\x00\x01\x00\x00", b"OTTO", b"true")
+
+
+class CmapReadError(ValueError):
+    pass
+
+
+def _font_offset(mm, font_number):
+    tag = mm[:4]
+    if tag == b"ttcf":
+        num_fonts = struct.unpack_from(">L", mm, 8)[0]
+        if not 0 <= font_number < num_fonts:
+            raise CmapReadError(f"TTC 中没有第 {font_number} 个字体 (共 {num_fonts} 个)")
+        return struct.unpack_from(">L", mm, 12 + 4 * font_number)[0]
+    if tag not in _SFNT_VERSIONS:
+        raise CmapReadError(f"不支持的字体容器: {tag!r}")
+    return 0
+
+
+def _find_table(mm, font_offset, wanted):
+    num_tables = struct.unpack_from(">H", mm, font_offset + 4)[0]
+    for i in range(num_tables):
+        tag, _, offset, length = struct.unpack_from(">4sLLL", mm, font_offset + 12 + 16 * i)
+        if tag == wanted:
+            return offset, length
+    raise CmapReadError(f"缺少 {wanted.decode()} 表")
+
+
+def _expand_ranges(starts, ends):
+    """把 [start, end] 区间展开成连续码位，并返回每个码位所属区间的下标。"""
+    lengths = ends - starts + 1
+    seg = np.repeat(np.arange(len(starts)), lengths)
+    firsts = np.cumsum(lengths) - lengths
+    codes = np.arange(int(lengths.sum()), dtype=np.int64) - firsts[seg] + starts[seg]
+    return codes, seg
+
+
+def _decode_format4(mm, offset, length):
+    seg_count = struct.unpack_from(">H", mm, offset + 6)[0] // 2
+    arrays = offset + 14
+    ends = np.frombuffer(mm, '>u2', seg_count, arrays).astype(np.int64)
+    starts = np.frombuffer(mm, '>u2', seg_count, arrays + 2 * seg_count + 2).astype(np.int64)
+    deltas = np.frombuffer(mm, '>i2', seg_count, arrays + 4 * seg_count + 2).astype(np.int64)
+    range_offsets = np.frombuffer(mm, '>u2', seg_count, arrays + 6 * seg_count + 2).astype(np.int64)
+    gid_start = arrays + 8 * seg_count + 2
+    gid_count = max(0, (offset + length - gid_start) // 2)
+    gid_array = np.frombuffer(mm, '>u2', gid_count, gid_start).astype(np.int64)
+
+    valid = ends >= starts
+    starts, ends, deltas, range_offsets = starts[valid], ends[valid], deltas[valid], range_offsets[valid]
+    seg_index = np.flatnonzero(valid)
+    codes, seg = _expand_ranges(starts, ends)
+
+    gids = (codes + deltas[seg]) & 0xFFFF
+    indirect = range_offsets[seg] != 0
+    if indirect.any():
+        # idRangeOffset 相对于自身位置的偏移，换算成 glyphIdArray 下标
+        idx = range_offsets[seg] // 2 + (codes - starts[seg]) - (seg_count - seg_index[seg])
+        idx = idx[indirect]
+        in_range = (idx >= 0) & (idx < gid_count)
+        looked = np.zeros(len(idx), dtype=np.int64)
+        looked[in_range] = gid_array[idx[in_range]]
+        looked = np.where(looked != 0, (looked + deltas[seg][indirect]) & 0xFFFF, 0)
+        gids[indirect] = looked
+    return codes[gids != 0]
+
+
+def _decode_format12_13(mm, offset, fmt):
+    num_groups = struct.unpack_from(">L", mm, offset + 12)[0]
+    groups = np.frombuffer(mm, '>u4', num_groups * 3, offset + 16).astype(np.int64).reshape(-1, 3)
+    starts, ends, start_gids = groups[:, 0], groups[:, 1], groups[:, 2]
+    valid = (ends >= starts) & (ends < 0x110000)
+    starts, ends, start_gids = starts[valid], ends[valid], start_gids[valid]
+    codes, seg = _expand_ranges(starts, ends)
+    if fmt == 12:
+        gids = start_gids[seg] + (codes - starts[seg])
+    else:
+        gids = start_gids[seg]
+    return codes[gids != 0]
+
+
+def _read_cmap(mm, font_number):
+    font_offset = _font_offset(mm, font_number)
+    cmap_offset, _ = _find_table(mm, font_offset, b"cmap")
+    num_subtables = struct.unpack_from(">H", mm, cmap_offset + 2)[0]
+
+    subtables = {}
+    for i in range(num_subtables):
+        platform_id, encoding_id, sub_offset = struct.unpack_from(">HHL", mm, cmap_offset + 4 + 8 * i)
+        subtables.setdefault((platform_id, encoding_id), cmap_offset + sub_offset)
+
+    for key in _PREFERRED:
+        offset = subtables.get(key)
+        if offset is None:
+            continue
+        fmt = struct.unpack_from(">H", mm, offset)[0]
+        if fmt == 4:
+            length = struct.unpack_from(">H", mm, offset + 2)[0]
+            return _decode_format4(mm, offset, length)
+        if fmt in (12, 13):
+            return _decode_format12_13(mm, offset, fmt)
+    raise CmapReadError("没有可用的 Unicode cmap 子表 (格式 4/12/13)")
+
+
+def _read_with_fonttools(path, font_number):
+    from fontTools.ttLib import TTFont
+    font = TTFont(path, fontNumber=font_number, lazy=True)
+    try:
+        return np.fromiter((font.getBestCmap() or {}).keys(), dtype=np.int64)
+    finally:
+        font.close()
+
+
+def read_codepoints(path, font_number=0, fallback=True):
+    """直接 mmap 字体文件解析最佳 cmap 子表，返回排好序的码位数组 (uint32)，不构造 TTFont。
+
+    WOFF/WOFF2 或不支持的子表格式在 fallback=True 时退回 fontTools 解析。"""
+    try:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            codes = _read_cmap(mm, font_number)
+    except (CmapReadError, struct.error, ValueError) as e:
+        if not fallback:
+            raise CmapReadError(str(e)) from e
+        codes = _read_with_fonttools(path, font_number)
+    return np.unique(codes).astype(np.uint32)
+
+
+def read_charset(path, font_number=0):
+    return Charset.from_codes(read_codepoints(path, font_number))
@@ -0,0 +1,167 @@
+import os
+import sys
+import unicodedata
+
+import numpy as np
+
+from core.utils import get_cache_dir
+from core.charset import Charset
+from core.error_handler import ConfigError
+
+
+def _span(*ranges):
+    return [b for lo, hi in ranges for b in range(lo, hi + 1)]
+
+
+# leads/trails: 双字节编码的首/次字节范围；grid_leads: 图片字库按首字节分页时的页；
+# proxy_leads: 动态映射可以借用的区 (汉字区，借用后不影响假名、谚文等)
+CODEPAGES = {
+    'cp932': {
+        'label': 'CP932',
+        'leads': _span((0x81, 0x9F), (0xE0, 0xFC)),
+        'trails': _span((0x40, 0x7E), (0x80, 0xFC)),
+        'grid_leads': _span((0x81, 0x9F), (0xE0, 0xEF), (0xFA, 0xFC)),
+        'proxy_leads': _span((0x89, 0x9F), (0xE0, 0xEA)),
+    },
+    'gbk': {
+        'label': 'GBK',
+        'leads': _span((0x81, 0xFE)),
+        'trails': _span((0x40, 0x7E), (0x80, 0xFE)),
+        'proxy_leads': _span((0xB0, 0xF7)),
+    },
+    'cp949': {
+        'label': 'CP949',
+        'leads': _span((0x81, 0xFE)),
+        'trails': _span((0x41, 0x5A), (0x61, 0x7A), (0x81, 0xFE)),
+        'proxy_leads': _span((0xCA, 0xFD)),
+    },
+    'big5': {
+        'label': 'Big5',
+        'leads': _span((0x81, 0xFE)),
+        'trails': _span((0x40, 0x7E), (0xA1, 0xFE)),
+        'proxy_leads': _span((0xA4, 0xC6), (0xC9, 0xF9)),
+    },
+}
+
+# 编解码表随 Python 版本变化，类别随 Unicode 版本变化
+_VERSION = f"1|{sys.version_info[0]}.{sys.version_info[1]}|{unicodedata.unidata_version}"
+
+_ARRAYS = ('codes', 'chars', 'cats', 'roundtrip', 'extra')
+
+_loaded = {}
+
+
+class CodePage:
+    """代码页的有效编码索引，按编码值升序存放：
+
+    codes 编码值 (单字节 < 0x100)、chars 对应的码位、cats Unicode 类别、
+    roundtrip 字符编码回去仍是同一个编码 (NEC/IBM 重复收录的字只有一个编码为 True)；
+    extra 为能编码但解码不会得到的字符 (如 CP932 把 U+2212 编码成全角减号)。
+
+    encodable 为能编码的全部字符，double_byte 为编码成双字节的字符 (含 extra 中编码成双字节的)。"""
+
+    def __init__(self, name, codes, chars, cats, roundtrip, extra):
+        spec = CODEPAGES[name]
+        self.name = name
+        self.label = spec['label']
+        self.trails = spec['trails']
+        self.grid_leads = spec.get('grid_leads', spec['leads'])
+        self.proxy_leads = spec['proxy_leads']
+        self.codes, self.chars, self.cats, self.roundtrip = codes, chars, cats, roundtrip
+
+        self._valid = np.zeros(0x10000, dtype=bool)
+        self._valid[codes] = True
+        self._by_code = np.zeros(0x10000, dtype=np.uint32)
+        self._by_code[codes] = chars
+        self.encodable = Charset.from_codes(np.concatenate([chars, extra]))
+        wide_extra = np.array([c for c in extra.tolist() if len(chr(c).encode(name)) == 2], dtype=np.uint32)
+        self.double_byte = Charset.from_codes(np.concatenate([chars[codes > 0xFF], wide_extra]))
+
+    def items(self, leads=None):
+        """[(字符, 编码)]：双字节编码，可限定首字节。"""
+        mask = self.codes > 0xFF
+        if leads is not None:
+            mask &= np.isin(self.codes >> 8, leads)
+        return [(chr(c), code) for c, code in zip(self.chars[mask].tolist(), self.codes[mask].tolist())]
+
+    def row(self, lead, trails, fill):
+        """首字节为 lead 的一行字符，无效编码用 fill 占位；返回 (文本, 有效字符数)。"""
+        codes = (lead << 8) | np.asarray(trails)
+        valid = self._valid[codes]
+        text = "".join(chr(c) if ok else fill for c, ok in zip(self._by_code[codes].tolist(), valid.tolist()))
+        return text, int(valid.sum())
+
+    def proxies(self, exclude=None):
+        """动态映射可用的空位：借用区内可往返编码、且不是控制符/空白的字符 (按编码顺序)。"""
+        mask = self.roundtrip & np.isin(self.codes >> 8, self.proxy_leads)
+        mask &= ~np.isin(self.cats.astype('<U1'), ['C', 'Z'])
+        chars = [chr(c) for c in self.chars[mask].tolist()]
+        if exclude is not None:
+            chars = [c for c in chars if c not in exclude]
+        return chars
+
+
+def _build(name):
+    spec = CODEPAGES[name]
+    codes, chars = [], []
+    candidates = [(b, bytes([b])) for b in range(0x100)]
+    candidates += [((lead << 8) | trail, bytes([lead, trail])) for lead in spec['leads'] for trail in spec['trails']]
+    for code, raw in candidates:
+        try:
+            text = raw.decode(name)
+        except UnicodeDecodeError:
+            continue
+        # 首字节本身是单字节字符时会解出两个字符，不算双字节编码
+        if len(text) == 1:
+            codes.append(code)
+            chars.append(ord(text))
+
+    roundtrip = []
+    for code, c in zip(codes, chars):
+        raw = code.to_bytes(2 if code > 0xFF else 1, 'big')
+        roundtrip.append(chr(c).encode(name, 'ignore') == raw)
+    cats = [unicodedata.category(chr(c)) for c in chars]
+
+    decoded = set(chars)
+    extra = []
+    for c in range(0x10000):
+        if c in decoded or 0xD800 <= c < 0xE000:
+            continue
+        try:
+            chr(c).encode(name)
+            extra.append(c)
+        except UnicodeEncodeError:
+            pass
+    return (np.array(codes, dtype=np.uint16), np.array(chars, dtype=np.uint32),
+            np.array(cats, dtype='<U2'), np.array(roundtrip, dtype=bool), np.array(extra, dtype=np.uint32))
+
+
+def load(name='cp932'):
+    """取代码页索引：进程内只建一次，结果缓存在缓存目录下的 codepage_<名称>.npz。"""
+    name = (name or 'cp932').lower()
+    if name not in CODEPAGES:
+        raise ConfigError(f"不支持的代码页: {name} (可选: {', '.join(CODEPAGES)})")
+    if name in _loaded:
+        return _loaded[name]
+
+    path = os.path.join(get_cache_dir(), f"codepage_{name}.npz")
+    arrays = None
+    try:
+        with np.load(path) as data:
+            if str(data['version']) == _VERSION:
+                arrays = tuple(data[key] for key in _ARRAYS)
+    except Exception:
+        pass
+
+    if arrays is None:
+        arrays = _build(name)
+        try:
+            tmp = path + ".tmp"
+            with open(tmp, 'wb') as f:
+                np.savez(f, version=_VERSION, **dict(zip(_ARRAYS, arrays)))
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    _loaded[name] = CodePage(name, *arrays)
+    return _loaded[name]
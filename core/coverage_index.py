@@ -0,0 +1,129 @@
+import os
+import zlib
+import sqlite3
+
+import numpy as np
+
+from core.utils import get_cache_dir
+from core.charset import Charset
+from core.cmap_reader import read_charset
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fonts (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    bits BLOB NOT NULL
+)
+"""
+
+
+def _pack_bits(charset):
+    return zlib.compress(charset.bits.tobytes(), 6)
+
+
+def _unpack_bits(blob):
+    return Charset.from_bits(np.frombuffer(zlib.decompress(bytes(blob)), dtype=np.uint8).copy())
+
+
+class CoverageIndex:
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(get_cache_dir(), "coverage_index.sqlite")
+        self.conn = sqlite3.connect(self.db_path, timeout=30)
+        self.conn.execute(_SCHEMA)
+        self.conn.commit()
+
+    def lookup(self, paths):
+        result = {}
+        cur = self.conn.cursor()
+        keys = {os.path.abspath(p): p for p in paths}
+        key_list = list(keys)
+        for i in range(0, len(key_list), 500):
+            chunk = key_list[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            cur.execute(f"SELECT path, size, mtime_ns, bits FROM fonts WHERE path IN ({marks})", chunk)
+            for key, size, mtime_ns, blob in cur.fetchall():
+                result[keys[key]] = (size, mtime_ns, blob)
+        return result
+
+    def store(self, records):
+        rows = [(os.path.abspath(path), size, mtime_ns, len(charset), _pack_bits(charset))
+                for path, size, mtime_ns, charset in records]
+        if not rows:
+            return
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO fonts VALUES (?, ?, ?, ?, ?)", rows)
+
+    def forget(self, paths):
+        with self.conn:
+            self.conn.executemany("DELETE FROM fonts WHERE path = ?", [(os.path.abspath(p),) for p in paths])
+
+    def close(self):
+        try:
+            self.conn.close()
+        except:
+            pass
+
+
+def load_coverage(paths, log_signal=None, prog_signal=None, prog_range=(0, 100), index_path=None,
+                  cancel_token=None):
+    """返回 {字体路径: Charset}；只有新增或大小/修改时间变化的字体才会被重新打开。"""
+    coverage = {}
+    prog_start, prog_end = prog_range
+
+    try:
+        index = CoverageIndex(index_path)
+        cached = index.lookup(paths)
+    except Exception as e:
+        if log_signal:
+            log_signal(f"⚠️ 覆盖率索引不可用，改为全量读取: {e}")
+        index, cached = None, {}
+
+    to_read = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        row = cached.get(path)
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            try:
+                coverage[path] = _unpack_bits(row[2])
+                continue
+            except (zlib.error, ValueError):
+                pass
+        to_read.append((path, st))
+
+    if log_signal and index:
+        log_signal(f"   📇 覆盖率索引: {len(paths) - len(to_read)} 个字体未变化，{len(to_read)} 个需要读取")
+
+    records = []
+    failed = []
+    for idx, (path, st) in enumerate(to_read):
+        if cancel_token is not None and cancel_token.cancelled:
+            break
+        try:
+            charset = read_charset(path)
+            coverage[path] = charset
+            records.append((path, st.st_size, st.st_mtime_ns, charset))
+        except Exception:
+            failed.append(path)
+        if prog_signal:
+            prog_signal(prog_start + int((prog_end - prog_start) * (idx + 1) / len(to_read)))
+
+    if index:
+        try:
+            index.store(records)
+            index.forget(failed)
+        except Exception as e:
+            if log_signal:
+                log_signal(f"⚠️ 覆盖率索引写入失败: {e}")
+        finally:
+            index.close()
+
+    if cancel_token is not None:
+        cancel_token.check()
+    if prog_signal:
+        prog_signal(prog_end)
+    return coverage
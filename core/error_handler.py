@@ -1,5 +1,4 @@
 import traceback
-from PyQt6.QtWidgets import QMessageBox
 
 class FontToolError(Exception):
     def __init__(self, message, details=None):
@@ -18,7 +17,11 @@ class FontWriteError(FontToolError):
 class ConfigError(FontToolError):
     pass
 
+class TaskCancelled(FontToolError):
+    pass
+
 def show_error(parent, title, message, details=None):
+    from PyQt6.QtWidgets import QMessageBox
     msg_box = QMessageBox(parent)
     msg_box.setIcon(QMessageBox.Icon.Critical)
     msg_box.setWindowTitle(title)
@@ -28,9 +31,11 @@ def show_error(parent, title, message, details=None):
     msg_box.exec()
 
 def show_warning(parent, title, message):
+    from PyQt6.QtWidgets import QMessageBox
     QMessageBox.warning(parent, title, message)
 
 def show_info(parent, title, message):
+    from PyQt6.QtWidgets import QMessageBox
     QMessageBox.information(parent, title, message)
 
 def handle_exception(parent, e, log_func=None, context=""):
@@ -0,0 +1,89 @@
+import os
+import json
+import sqlite3
+import hashlib
+from core.utils import get_cache_dir, file_digest
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS digests (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS steps (
+    key TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    outputs TEXT NOT NULL,
+    result TEXT
+)
+"""
+
+MISSING = "missing"
+
+
+class FingerprintStore:
+    """工作流步骤的指纹库：记录每个步骤上次成功运行时的输入指纹、输出摘要和结果。
+
+    文件内容摘要按 (大小, 修改时间) 缓存，未变化的文件不会重复读取。"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(get_cache_dir(), "pipeline.sqlite")
+        self.conn = sqlite3.connect(self.db_path, timeout=30)
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+
+    def file_hash(self, path):
+        key = os.path.abspath(path)
+        try:
+            st = os.stat(key)
+        except OSError:
+            return MISSING
+        row = self.conn.execute("SELECT size, mtime_ns, hash FROM digests WHERE path = ?", (key,)).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+        digest = file_digest(key)
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?)",
+                              (key, st.st_size, st.st_mtime_ns, digest))
+        return digest
+
+    def path_hash(self, path, exclude=()):
+        """文件取内容摘要；目录按相对路径汇总其下所有文件的摘要 (跳过 exclude 中的子路径)。"""
+        if not os.path.isdir(path):
+            return self.file_hash(path)
+        skip = [os.path.abspath(p) for p in exclude]
+        entries = []
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if os.path.abspath(os.path.join(root, d)) not in skip)
+            for name in sorted(files):
+                full = os.path.join(root, name)
+                if os.path.abspath(full) in skip:
+                    continue
+                entries.append(f"{os.path.relpath(full, path)}\0{self.file_hash(full)}")
+        return hashlib.sha256("\n".join(entries).encode('utf-8', 'surrogatepass')).hexdigest()
+
+    def lookup(self, key):
+        row = self.conn.execute("SELECT fingerprint, outputs, result FROM steps WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), json.loads(row[2]) if row[2] is not None else None
+
+    def store(self, key, fingerprint, outputs, result):
+        try:
+            result_text = json.dumps(result, ensure_ascii=False)
+        except (TypeError, ValueError):
+            result_text = None
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO steps VALUES (?, ?, ?, ?)",
+                              (key, fingerprint, json.dumps(outputs, ensure_ascii=False), result_text))
+
+    def forget(self, key):
+        with self.conn:
+            self.conn.execute("DELETE FROM steps WHERE key = ?", (key,))
+
+    def close(self):
+        try:
+            self.conn.close()
+        except:
+            pass
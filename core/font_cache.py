@@ -3,8 +3,12 @@ import time
 from fontTools.ttLib import TTFont
 from functools import lru_cache
 
+from core.charset import Charset
+from core.cmap_reader import read_codepoints
+
 _font_cache = {}
 _cmap_cache = {}
+_codes_cache = {}
 _cache_times = {}
 _MAX_CACHE_AGE = 300
 _MAX_CACHE_SIZE = 10
@@ -43,12 +47,25 @@ def get_cmap(path):
     
     return cmap
 
+def get_codepoints(path):
+    path = os.path.abspath(path)
+    mtime = os.path.getmtime(path) if os.path.exists(path) else 0
+    
+    cache_key = (path, mtime)
+    
+    if cache_key in _codes_cache:
+        return _codes_cache[cache_key]
+    
+    codes = read_codepoints(path)
+    _codes_cache[cache_key] = codes
+    
+    return codes
+
 def get_charset(path):
-    cmap = get_cmap(path)
-    return set(chr(c) for c in cmap.keys() if c < 0x110000)
+    return Charset.from_codes(get_codepoints(path))
 
 def invalidate_cache(path=None):
-    global _font_cache, _cmap_cache, _cache_times
+    global _font_cache, _cmap_cache, _codes_cache, _cache_times
     
     if path is None:
         for font in _font_cache.values():
@@ -58,6 +75,7 @@ def invalidate_cache(path=None):
                 pass
         _font_cache.clear()
         _cmap_cache.clear()
+        _codes_cache.clear()
         _cache_times.clear()
     else:
         path = os.path.abspath(path)
@@ -74,6 +92,10 @@ def invalidate_cache(path=None):
         keys_to_remove = [k for k in _cmap_cache.keys() if k[0] == path]
         for key in keys_to_remove:
             del _cmap_cache[key]
+        
+        keys_to_remove = [k for k in _codes_cache.keys() if k[0] == path]
+        for key in keys_to_remove:
+            del _codes_cache[key]
 
 def _cleanup_old_cache():
     now = time.time()
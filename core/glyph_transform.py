@@ -0,0 +1,117 @@
+import numpy as np
+
+from core.sfnt_edit import mark_dirty
+
+
+def _round(values):
+    return np.floor(values + 0.5)
+
+
+def _collect_glyphs(glyf, names, prog_signal, prog_range, cancel_token=None):
+    simple = []
+    composite = []
+    total = len(names)
+    prog_start, prog_end = prog_range
+    for idx, name in enumerate(names):
+        if cancel_token is not None:
+            cancel_token.check()
+        if name in glyf:
+            g = glyf[name]
+            if g.isComposite():
+                composite.append(g)
+            elif g.numberOfContours > 0 and hasattr(g, 'coordinates') and len(g.coordinates):
+                simple.append(g)
+        if prog_signal and idx % 2000 == 0:
+            prog_signal(prog_start + int((prog_end - prog_start) * idx / total))
+    return simple, composite
+
+
+def _transform_simple(glyphs, sx, sy):
+    buffers = [g.coordinates.array for g in glyphs]
+    counts = np.fromiter((len(b) // 2 for b in buffers), dtype=np.int64, count=len(buffers))
+    starts = np.zeros(len(buffers), dtype=np.int64)
+    np.cumsum(counts[:-1], out=starts[1:])
+
+    points = np.concatenate([np.frombuffer(b, dtype=np.float64) for b in buffers]).reshape(-1, 2)
+    points *= (sx, sy)
+    points = _round(points)
+
+    x_min = np.minimum.reduceat(points[:, 0], starts).astype(np.int64)
+    x_max = np.maximum.reduceat(points[:, 0], starts).astype(np.int64)
+    y_min = np.minimum.reduceat(points[:, 1], starts).astype(np.int64)
+    y_max = np.maximum.reduceat(points[:, 1], starts).astype(np.int64)
+
+    flat = points.ravel()
+    for i, (g, buf) in enumerate(zip(glyphs, buffers)):
+        start = starts[i] * 2
+        np.frombuffer(buf, dtype=np.float64)[:] = flat[start:start + counts[i] * 2]
+        g.xMin, g.xMax = int(x_min[i]), int(x_max[i])
+        g.yMin, g.yMax = int(y_min[i]), int(y_max[i])
+
+    return int(counts.sum())
+
+
+def _transform_composite(glyphs, glyf, sx, sy):
+    for g in glyphs:
+        for comp in g.components:
+            if hasattr(comp, 'x'):
+                comp.x = int(_round(comp.x * sx))
+                comp.y = int(_round(comp.y * sy))
+    bounds_done = set()
+    for g in glyphs:
+        try:
+            g.recalcBounds(glyf, boundsDone=bounds_done)
+        except Exception:
+            pass
+
+
+def _transform_metrics(font, names, sx, spacing):
+    metrics = font['hmtx'].metrics
+    names = [n for n in names if n in metrics]
+    if not names:
+        return
+
+    table = np.array([metrics[n] for n in names], dtype=np.float64).reshape(-1, 2)
+    widths = np.maximum(0, np.trunc(table[:, 0] * sx) + spacing).astype(np.int64)
+    lsbs = np.trunc(table[:, 1] * sx).astype(np.int64)
+
+    glyf = font['glyf'] if 'glyf' in font else None
+    for name, width, lsb in zip(names, widths.tolist(), lsbs.tolist()):
+        if glyf is not None and name in glyf:
+            g = glyf[name]
+            if g.numberOfContours != 0 and hasattr(g, 'xMin'):
+                lsb = g.xMin
+        metrics[name] = (width, lsb)
+
+
+def transform_glyphs(font, sx=1.0, sy=1.0, spacing=0, glyph_names=None,
+                     scale_head=True, prog_signal=None, prog_range=(0, 100), cancel_token=None):
+    names = list(glyph_names) if glyph_names is not None else font.getGlyphOrder()
+    stats = {'simple': 0, 'composite': 0, 'points': 0}
+
+    if 'glyf' in font:
+        glyf = font['glyf']
+        simple, composite = _collect_glyphs(glyf, names, prog_signal, prog_range, cancel_token)
+        if simple:
+            stats['points'] = _transform_simple(simple, sx, sy)
+        if composite:
+            _transform_composite(composite, glyf, sx, sy)
+        stats['simple'] = len(simple)
+        stats['composite'] = len(composite)
+        mark_dirty(font, 'glyf')
+
+    if 'hmtx' in font:
+        _transform_metrics(font, names, sx, spacing)
+        mark_dirty(font, 'hmtx')
+
+    if scale_head and 'head' in font:
+        head = font['head']
+        head.xMin = int(head.xMin * sx)
+        head.yMin = int(head.yMin * sy)
+        head.xMax = int(head.xMax * sx)
+        head.yMax = int(head.yMax * sy)
+        mark_dirty(font, 'head')
+
+    if prog_signal:
+        prog_signal(prog_range[1])
+    return stats
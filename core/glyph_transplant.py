@@ -0,0 +1,176 @@
+import struct
+
+from fontTools.ttLib.tables._g_l_y_f import Glyph
+from fontTools.ttLib.tables._c_m_a_p import CmapSubtable
+
+from core.utils import open_ttf
+from core.glyph_transform import transform_glyphs
+from core.sfnt_edit import mark_dirty
+
+# 以字形序号为索引的表，字形数变化后无法沿用
+_GLYPH_INDEXED = ('hdmx', 'LTSH')
+
+
+def _raw_glyph(glyf, name):
+    """未展开的字形直接返回原始字节，否则返回 None。"""
+    glyph = glyf.glyphs.get(name)
+    return getattr(glyph, 'data', None)
+
+
+def _is_composite(glyf, name):
+    raw = _raw_glyph(glyf, name)
+    if raw is not None:
+        return len(raw) >= 2 and struct.unpack(">h", raw[:2])[0] < 0
+    return glyf[name].isComposite()
+
+
+def _components(glyf, name):
+    if not _is_composite(glyf, name):
+        return []
+    return [comp.glyphName for comp in glyf[name].components]
+
+
+def _closure(glyf, names):
+    """字形及其复合字形引用到的全部组件。"""
+    result = []
+    seen = set()
+    stack = list(reversed(names))
+    while stack:
+        name = stack.pop()
+        if name in seen or name not in glyf.glyphs:
+            continue
+        seen.add(name)
+        result.append(name)
+        stack.extend(reversed(_components(glyf, name)))
+    return result
+
+
+def _unique_name(base, taken):
+    name = base
+    n = 1
+    while name in taken:
+        name = f"{base}.{n}"
+        n += 1
+    taken.add(name)
+    return name
+
+
+def _unicode_tables(font, need_full_range):
+    tables = [t for t in font['cmap'].tables if t.platformID == 3]
+    if need_full_range and not any(t.format in (12, 13) for t in tables):
+        bmp = next((t for t in tables if t.platEncID == 1), None)
+        if bmp is not None:
+            table = CmapSubtable.newSubtable(12)
+            table.platformID, table.platEncID, table.language = 3, 10, 0
+            table.cmap = dict(bmp.cmap)
+            font['cmap'].tables.append(table)
+            tables.append(table)
+    return tables
+
+
+def _scale_vmetric(metric, scale):
+    # 与 glyph_transform 缩放 hmtx 一样截断取整
+    return int(metric[0] * scale), int(metric[1] * scale)
+
+
+def _copy_glyphs(font, src, names, rename, scale, cancel_token=None):
+    """scale 不为 1 时来源字形已按 UPM 缩放过，vmtx 的前进高度和顶部间距也要按同样的倍率缩放。"""
+    scaled = scale != 1
+    glyf, src_glyf = font['glyf'], src['glyf']
+    hmtx, src_hmtx = font['hmtx'].metrics, src['hmtx'].metrics
+    vmtx = font['vmtx'].metrics if 'vmtx' in font else None
+    src_vmtx = src['vmtx'].metrics if 'vmtx' in src else None
+    default_vmetric = (font['head'].unitsPerEm, 0)
+
+    for name in names:
+        if cancel_token is not None:
+            cancel_token.check()
+        new_name = rename[name]
+        raw = None if scaled else _raw_glyph(src_glyf, name)
+        if raw is not None and not _is_composite(src_glyf, name):
+            glyph = Glyph(raw)
+        else:
+            glyph = src_glyf[name]
+            if glyph.isComposite():
+                for comp in glyph.components:
+                    comp.glyphName = rename[comp.glyphName]
+        glyf[new_name] = glyph
+        hmtx[new_name] = src_hmtx[name]
+        if vmtx is not None:
+            if src_vmtx and name in src_vmtx:
+                vmtx[new_name] = _scale_vmetric(src_vmtx[name], scale) if scaled else src_vmtx[name]
+            else:
+                vmtx[new_name] = default_vmetric
+
+
+def transplant_glyphs(font, sources, log_signal=None, prog_signal=None, prog_range=(0, 100), cancel_token=None):
+    """一次性从多个来源字体把指定字符的字形移植进 font。
+
+    sources: [(来源字体路径, 字符集合)]。主字体已有的字符会跳过；复合字形连同组件一起移植；
+    UPM 不同的来源先缩放，UPM 相同则直接拷贝 glyf 原始字节。返回 {来源路径: 移植的字符数}。"""
+    log = log_signal or (lambda s: None)
+    if 'glyf' not in font:
+        raise ValueError("主字体不是 TrueType 轮廓，无法移植字形")
+
+    upm = font['head'].unitsPerEm
+    existing = set(font.getBestCmap() or {})
+    taken = set(font.getGlyphOrder())
+    pending = [(path, sorted({ord(c) for c in chars} - existing)) for path, chars in sources]
+    tables = _unicode_tables(font, any(code > 0xFFFF for _, codes in pending for code in codes))
+
+    prog_start, prog_end = prog_range
+    counts = {}
+    for idx, (path, codes) in enumerate(pending):
+        counts[path] = 0
+        if cancel_token is not None:
+            cancel_token.check()
+        if not codes:
+            continue
+        src = open_ttf(path, log_signal or print, "来源字体")
+        try:
+            if 'glyf' not in src:
+                log(f"   ⚠️ {path}: 非 TrueType 轮廓，跳过")
+                continue
+            src_cmap = src.getBestCmap() or {}
+            wanted = {code: src_cmap[code] for code in codes if code in src_cmap and code not in existing}
+            if not wanted:
+                continue
+
+            base_names = list(dict.fromkeys(wanted.values()))
+            names = _closure(src['glyf'], base_names)
+
+            rename = {}
+            for code, name in wanted.items():
+                if name not in rename:
+                    rename[name] = _unique_name(f"uni{code:04X}_fb", taken)
+            for name in names:
+                if name not in rename:
+                    rename[name] = _unique_name(f"{name}_fb", taken)
+
+            src_upm = src['head'].unitsPerEm
+            scale = upm / src_upm
+            if src_upm != upm:
+                log(f"   ⚖️ UPM 差异 (主:{upm} vs 补:{src_upm})，缩放倍率: {scale:.2f}")
+                transform_glyphs(src, sx=scale, sy=scale, glyph_names=names, scale_head=False,
+                                 cancel_token=cancel_token)
+
+            _copy_glyphs(font, src, names, rename, scale, cancel_token)
+            for code, name in wanted.items():
+                for table in tables:
+                    if code <= 0xFFFF or table.format in (12, 13):
+                        table.cmap[code] = rename[name]
+                existing.add(code)
+            counts[path] = len(wanted)
+        finally:
+            src.close()
+        if prog_signal:
+            prog_signal(prog_start + int((prog_end - prog_start) * (idx + 1) / len(pending)))
+
+    if any(counts.values()):
+        for tag in _GLYPH_INDEXED:
+            if tag in font:
+                del font[tag]
+        mark_dirty(font, 'glyf', 'hmtx', 'cmap', *(('vmtx',) if 'vmtx' in font else ()))
+    if prog_signal:
+        prog_signal(prog_end)
+    return counts
@@ -67,6 +67,12 @@ class HistoryManager:
         self.redo_stack.clear()
         return True
     
+    def merge_records(self, records):
+        for record in records:
+            self.history.append(record)
+        if records:
+            self.redo_stack.clear()
+
     def undo(self):
         if not self.history:
             return None, "没有可撤销的操作"
@@ -166,6 +172,26 @@ class HistoryManager:
             for r in reversed(self.history)
         ]
     
+    def snapshot(self):
+        return list(self.history)
+
+    def rollback(self, snapshot):
+        """撤回 snapshot 之后新增的记录：被覆盖的文件从备份恢复，新建的文件删除；不进入重做栈。"""
+        known = {id(r) for r in snapshot}
+        added = [r for r in self.history if id(r) not in known]
+        for record in reversed(added):
+            self.history.remove(record)
+            try:
+                if record.get('is_new_file', False):
+                    if os.path.exists(record['original_path']):
+                        os.remove(record['original_path'])
+                elif record.get('backup_path') and os.path.exists(record['backup_path']):
+                    shutil.copy2(record['backup_path'], record['original_path'])
+                    os.remove(record['backup_path'])
+            except Exception as e:
+                print(f"History rollback failed: {e}")
+        return len(added)
+
     def can_undo(self):
         return len(self.history) > 0
     
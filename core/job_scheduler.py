@@ -0,0 +1,162 @@
+import os
+import time
+import itertools
+from collections import deque
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from core.worker import Worker
+from core.process_runner import CANCEL_GRACE
+from core.task_registry import task_paths, task_backend
+from core.utils import norm_path, paths_overlap
+
+DEFAULT_MAX_JOBS = max(1, min(4, (os.cpu_count() or 2) // 2))
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+
+
+class Job:
+    def __init__(self, job_id, task, conf, title, reads, writes):
+        self.id = job_id
+        self.task = task
+        self.conf = conf
+        self.title = title
+        self.reads = {norm_path(p) for p in reads}
+        self.writes = {norm_path(p) for p in writes}
+        self.state = QUEUED
+        self.progress = 0
+        self.worker = None
+        self.callbacks = []
+
+    def conflicts(self, other):
+        """任一方写入的路径被另一方读取或写入时，两个任务不能同时运行。"""
+        return (any(paths_overlap(w, p) for w in self.writes for p in other.reads | other.writes)
+                or any(paths_overlap(r, w) for r in self.reads for w in other.writes))
+
+
+class JobScheduler(QObject):
+    """后台任务队列：最多同时运行 max_jobs 个任务，读写路径冲突的任务按提交顺序串行。"""
+
+    job_queued = pyqtSignal(int)
+    job_started = pyqtSignal(int)
+    job_log = pyqtSignal(int, str)
+    job_prog = pyqtSignal(int, int)
+    job_finished = pyqtSignal(int, str)
+    busy_changed = pyqtSignal(bool)
+
+    def __init__(self, max_jobs=DEFAULT_MAX_JOBS, parent=None):
+        super().__init__(parent)
+        self.max_jobs = max(1, int(max_jobs))
+        self.jobs = {}
+        self._queue = deque()
+        self._ids = itertools.count(1)
+
+    def set_max_jobs(self, max_jobs):
+        self.max_jobs = max(1, int(max_jobs))
+        self._dispatch()
+
+    def submit(self, task, conf, on_done=None, title=None, reads=None, writes=None):
+        """提交任务并返回 Job；未声明读写路径时按任务注册表推断。"""
+        if reads is None and writes is None:
+            reads, writes = task_paths(task, conf)
+        job = Job(next(self._ids), task, conf, title or task, reads or [], writes or [])
+        if on_done:
+            job.callbacks.append(on_done)
+        was_busy = self.is_busy()
+        self.jobs[job.id] = job
+        self._queue.append(job)
+        self.job_queued.emit(job.id)
+        if not was_busy:
+            self.busy_changed.emit(True)
+        self._dispatch()
+        return job
+
+    def running(self):
+        return [job for job in self.jobs.values() if job.state == RUNNING]
+
+    def pending(self):
+        return list(self._queue)
+
+    def is_busy(self):
+        return bool(self.jobs)
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        if job.state == QUEUED:
+            self._queue.remove(job)
+            self._finish(job, CANCELLED)
+        elif job.state == RUNNING:
+            job.state = CANCELLED
+            job.worker.cancel()
+
+    def cancel_all(self):
+        for job in list(self._queue):
+            self.cancel(job.id)
+        for job in self.running():
+            self.cancel(job.id)
+
+    def wait_all(self, msecs=None):
+        """等待各任务线程结束。默认等满子进程的取消宽限期再加上收尾时间 (结束进程后还要 join 5 秒)，
+        避免窗口关闭时线程还在运行、子进程成为孤儿。"""
+        if msecs is None:
+            msecs = int((CANCEL_GRACE + 5) * 1000) + 1000
+        # 各任务同时在收尾，共用一个截止时间
+        deadline = time.monotonic() + msecs / 1000
+        for job in list(self.jobs.values()):
+            if job.worker is not None:
+                job.worker.wait(max(0, int((deadline - time.monotonic()) * 1000)))
+
+    def _dispatch(self):
+        active = self.running()
+        blockers = list(active)
+        for job in list(self._queue):
+            if len(active) >= self.max_jobs:
+                break
+            if any(job.conflicts(other) for other in blockers):
+                # 排队中的冲突任务也算阻塞，保证同一路径上的任务按提交顺序执行
+                blockers.append(job)
+                continue
+            self._queue.remove(job)
+            self._start(job)
+            active.append(job)
+            blockers.append(job)
+
+    def _start(self, job):
+        job.state = RUNNING
+        job.worker = Worker(job.task, job.conf, task_backend(job.task))
+        job.worker.log.connect(lambda m, jid=job.id: self.job_log.emit(jid, m))
+        job.worker.prog.connect(lambda v, jid=job.id: self._on_prog(jid, v))
+        job.worker.done.connect(lambda result, j=job: self._on_done(j, result))
+        job.worker.finished.connect(lambda j=job: self._on_finished(j))
+        self.job_started.emit(job.id)
+        job.worker.start()
+
+    def _on_prog(self, job_id, value):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        job.progress = value
+        self.job_prog.emit(job_id, value)
+
+    def _on_done(self, job, result):
+        if job.state != RUNNING:
+            return
+        job.state = DONE
+        for callback in job.callbacks:
+            callback(result)
+
+    def _on_finished(self, job):
+        self._finish(job, job.state if job.state != RUNNING else FAILED)
+
+    def _finish(self, job, state):
+        job.state = state
+        if job.worker is not None:
+            # finished 在线程退出前发出，等它真正结束再释放 QThread
+            job.worker.wait()
+            job.worker = None
+        self.job_finished.emit(job.id, state)
+        del self.jobs[job.id]
+        self._dispatch()
+        if not self.is_busy():
+            self.busy_changed.emit(False)
@@ -0,0 +1,91 @@
+import os
+import json
+
+from core.utils import get_cache_dir
+
+_SEP = "\n"
+_TABLE_FORMAT = 1
+# BMP (跳过代理区/私用区) + 第二、三平面，覆盖 OpenCC 单字词典可能涉及的全部码位
+_RANGES = ((0x20, 0xD800), (0xF900, 0x10000), (0x20000, 0x40000))
+
+
+def _candidate_codes():
+    for start, end in _RANGES:
+        for code in range(start, end):
+            if not 0x7F <= code <= 0x9F:
+                yield code
+
+
+def _opencc_version(opencc):
+    from importlib.metadata import version
+    for dist in ('opencc-python-reimplemented', 'OpenCC', 'opencc'):
+        try:
+            return version(dist)
+        except Exception:
+            pass
+    return str(getattr(opencc, '__version__', 'unknown'))
+
+
+def _build_table(cc):
+    codes = list(_candidate_codes())
+    source = _SEP.join(chr(c) for c in codes)
+    converted = cc.convert(source).split(_SEP)
+
+    table = {}
+    if len(converted) == len(codes):
+        for code, out in zip(codes, converted):
+            if len(out) == 1 and ord(out) != code:
+                table[code] = ord(out)
+        return table
+
+    # 批量结果无法逐字对齐时退回逐字转换
+    for code in codes:
+        try:
+            out = cc.convert(chr(code))
+        except Exception:
+            continue
+        if len(out) == 1 and ord(out) != code:
+            table[code] = ord(out)
+    return table
+
+
+def load_char_table(config, log_signal=None):
+    """返回 OpenCC 单字转换表 {源码位: 目标码位}，按 OpenCC 版本缓存在磁盘上。"""
+    import opencc
+
+    version = _opencc_version(opencc)
+    safe_version = "".join(ch if ch.isalnum() or ch in '.-_' else '_' for ch in version)
+    cache_path = os.path.join(get_cache_dir("opencc"), f"{config}-{safe_version}-v{_TABLE_FORMAT}.json")
+
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                return {int(k): v for k, v in json.load(f).items()}
+        except (OSError, ValueError):
+            pass
+
+    if log_signal:
+        log_signal(f"   首次使用 OpenCC {version} ({config})，正在生成单字转换表...")
+    table = _build_table(opencc.OpenCC(config))
+
+    tmp_path = cache_path + ".tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(table, f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        if log_signal:
+            log_signal(f"⚠️ 转换表缓存写入失败: {e}")
+    return table
+
+
+def remap_cmap_tables(cmap_tables, char_table):
+    """把 cmap 子表中可转换的码位指向目标字的字形；所有子表基于改动前的快照一次性更新。"""
+    remapped = set()
+    for table in cmap_tables:
+        cmap = table.cmap
+        updates = {code: cmap[target] for code, target in char_table.items()
+                   if code in cmap and target in cmap}
+        cmap.update(updates)
+        remapped.update(updates)
+    return len(remapped)
@@ -0,0 +1,125 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from fontTools.ttLib import TTFont, newTable
+from fontTools.pens.cu2quPen import Cu2QuPen
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+from fontTools.ttLib.tables._g_l_y_f import Glyph
+
+DEFAULT_MAX_ERR = 1.0
+_CHUNK_SIZE = 1024
+_MIN_PARALLEL_GLYPHS = 4000
+
+_CFF_TAGS = ('CFF ', 'CFF2', 'VORG')
+
+
+def is_cff_font(font):
+    return 'CFF ' in font or 'CFF2' in font
+
+
+def _convert_names(glyph_set, names, max_err, reverse_direction, cancel_token=None):
+    results = []
+    failed = []
+    for name in names:
+        if cancel_token is not None:
+            cancel_token.check()
+        try:
+            tt_pen = TTGlyphPen(None)
+            glyph_set[name].draw(Cu2QuPen(tt_pen, max_err, reverse_direction=reverse_direction))
+            data = tt_pen.glyph().compile(None)
+        except Exception:
+            failed.append(name)
+            data = b""
+        results.append((name, data))
+    return results, failed
+
+
+def _convert_chunk(path, names, max_err, reverse_direction):
+    font = TTFont(path, lazy=True)
+    try:
+        return _convert_names(font.getGlyphSet(), names, max_err, reverse_direction)
+    finally:
+        font.close()
+
+
+def _source_path(font):
+    reader = getattr(font, 'reader', None)
+    if reader is None or hasattr(reader, 'numFonts') or reader.flavor:
+        return None
+    path = getattr(reader.file, 'name', None)
+    return path if isinstance(path, str) and os.path.isfile(path) else None
+
+
+def _worker_count(max_workers=None):
+    if max_workers:
+        return max_workers
+    return max(1, min(8, (os.cpu_count() or 1)))
+
+
+def _install_glyf(font, compiled):
+    glyph_order = font.getGlyphOrder()
+
+    maxp = newTable('maxp')
+    maxp.tableVersion = 0x00010000
+    maxp.numGlyphs = len(glyph_order)
+    maxp.maxZones = 1
+    for attr in ('maxPoints', 'maxContours', 'maxCompositePoints', 'maxCompositeContours',
+                 'maxTwilightPoints', 'maxStorage', 'maxFunctionDefs', 'maxInstructionDefs',
+                 'maxStackElements', 'maxSizeOfInstructions', 'maxComponentElements',
+                 'maxComponentDepth'):
+        setattr(maxp, attr, 0)
+    font['maxp'] = maxp
+
+    glyf = newTable('glyf')
+    glyf.glyphOrder = glyph_order
+    glyf.glyphs = {name: Glyph(compiled.get(name, b"")) for name in glyph_order}
+    font['glyf'] = glyf
+    font['loca'] = newTable('loca')
+
+    for tag in _CFF_TAGS:
+        if tag in font:
+            del font[tag]
+    font['head'].glyphDataFormat = 0
+    font.sfntVersion = "\x00\x01\x00\x00"
+
+
+def convert_cff_to_glyf(font, max_err=DEFAULT_MAX_ERR, reverse_direction=True, max_workers=None,
+                        prog_signal=None, prog_range=(0, 100), cancel_token=None):
+    """把 CFF/CFF2 轮廓用 cu2qu 转为 TrueType 二次曲线，字形按块分给进程池并行处理。
+
+    返回转换失败（已置为空字形）的字形名列表。"""
+    glyph_order = font.getGlyphOrder()
+    total = len(glyph_order)
+    prog_start, prog_end = prog_range
+    path = _source_path(font)
+    workers = _worker_count(max_workers)
+
+    compiled = {}
+    failed = []
+    if path is None or workers < 2 or total < _MIN_PARALLEL_GLYPHS:
+        results, failed = _convert_names(font.getGlyphSet(), glyph_order, max_err, reverse_direction, cancel_token)
+        compiled.update(results)
+    else:
+        chunk = max(_CHUNK_SIZE // 4, min(_CHUNK_SIZE, total // (workers * 4) or 1))
+        chunks = [glyph_order[i:i + chunk] for i in range(0, total, chunk)]
+        done = 0
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=ctx) as pool:
+            futures = [pool.submit(_convert_chunk, path, names, max_err, reverse_direction) for names in chunks]
+            for future in as_completed(futures):
+                if cancel_token is not None and cancel_token.cancelled:
+                    for f in futures:
+                        f.cancel()
+                    cancel_token.check()
+                results, chunk_failed = future.result()
+                compiled.update(results)
+                failed.extend(chunk_failed)
+                done += len(results)
+                if prog_signal:
+                    prog_signal(prog_start + int((prog_end - prog_start) * done / total))
+
+    _install_glyf(font, compiled)
+    if prog_signal:
+        prog_signal(prog_end)
+    return failed
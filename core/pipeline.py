@@ -0,0 +1,206 @@
+import json
+import hashlib
+
+from core import artifacts
+from core.error_handler import ConfigError, TaskCancelled
+from core.utils import norm_path, paths_overlap
+from core.fingerprint_store import FingerprintStore
+
+# 只存在于内存中的产物在指纹库里记为 "mem:<摘要>"
+_MEM = "mem:"
+
+
+class Step:
+    """工作流中的一步；输入/输出路径取自任务注册表声明的读写路径。
+
+    keep 为 True 时该步的产物一定写盘，即使下游可以直接在内存中接手。"""
+
+    def __init__(self, name, task, conf, title=None, keep=False):
+        from core.task_registry import task_paths, handoff_paths, HANDOFF_INPUTS, HANDOFF_OUTPUTS
+        self.name = name
+        self.task = task
+        self.conf = conf
+        self.title = title or name
+        self.keep = keep
+        self.inputs, self.outputs = task_paths(task, conf)
+        self.handoff_inputs = {norm_path(p): kind for p, kind in handoff_paths(HANDOFF_INPUTS, task, conf).items()}
+        self.handoff_outputs = {norm_path(p): kind for p, kind in handoff_paths(HANDOFF_OUTPUTS, task, conf).items()}
+        self.deps = []
+
+    @property
+    def key(self):
+        # 同一任务写同一组输出时共用一条指纹记录；没有输出的步骤按输入区分
+        paths = self.outputs or self.inputs
+        ident = json.dumps([self.task, sorted(norm_path(p) for p in paths)], ensure_ascii=False)
+        return hashlib.sha256(ident.encode('utf-8')).hexdigest()
+
+    def reads_from(self, other):
+        return any(paths_overlap(norm_path(i), norm_path(o)) for i in self.inputs for o in other.outputs)
+
+    def fingerprint(self, store, known):
+        """known: 本次运行中上游步骤产物的摘要 (含只在内存中的产物)。"""
+        inputs = {p: known.get(norm_path(p)) or store.path_hash(p, exclude=self.outputs) for p in self.inputs}
+        text = json.dumps({'task': self.task, 'params': self.conf, 'inputs': inputs},
+                          sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+class Pipeline:
+    """由步骤组成的有向无环图：读取某步输出的步骤依赖于该步。
+
+    运行时按拓扑顺序执行；输入 (文件内容、参数) 与上次成功运行时一致且输出未被改动的步骤直接沿用上次的结果。
+    只被下游步骤读取的中间产物 (映射表、TTFont) 在内存中交接，不写盘。"""
+
+    def __init__(self, steps):
+        names = [step.name for step in steps]
+        if len(set(names)) != len(names):
+            raise ConfigError(f"工作流步骤名称重复: {names}")
+        for step in steps:
+            step.deps = [other for other in steps if other is not step and step.reads_from(other)]
+        self.steps = self._sorted(steps)
+        self.handoff = self._plan_handoff()
+
+    @staticmethod
+    def _sorted(steps):
+        order, done = [], set()
+        pending = list(steps)
+        while pending:
+            # 依赖都已排好的步骤中取声明顺序最靠前的一个
+            ready = next((s for s in pending if all(d.name in done for d in s.deps)), None)
+            if ready is None:
+                raise ConfigError(f"工作流存在循环依赖: {', '.join(s.name for s in pending)}")
+            pending.remove(ready)
+            order.append(ready)
+            done.add(ready.name)
+        return order
+
+    def _plan_handoff(self):
+        """返回 {只在内存中交接的产物路径: 产出它的步骤}。
+
+        产物的所有读取者都能在内存中接手时才不写盘；TTFont 会被接手的步骤修改，只能交给一个步骤。"""
+        handoff = {}
+        for step in self.steps:
+            if step.keep:
+                continue
+            for path, kind in step.handoff_outputs.items():
+                readers = [s for s in self.steps if s is not step
+                           and any(paths_overlap(norm_path(i), path) for i in s.inputs)]
+                takers = [s for s in readers if s.handoff_inputs.get(path) == kind]
+                if takers and len(takers) == len(readers) and (kind != 'font' or len(takers) == 1):
+                    handoff[path] = step
+        return handoff
+
+    def run(self, log_signal, prog_signal, cancel_token, force=False):
+        results, ran, skipped, failed = {}, [], [], []
+        total = len(self.steps)
+        self._store = FingerprintStore()
+        self._memory = artifacts.Artifacts(self.handoff)
+        self._known = {}
+        self._log, self._cancel_token = log_signal, cancel_token
+        try:
+            with artifacts.activate(self._memory):
+                for idx, step in enumerate(self.steps):
+                    cancel_token.check()
+                    lo, hi = idx * 100 // total, (idx + 1) * 100 // total
+                    label = f"[{idx + 1}/{total}] {step.title}"
+                    step_prog = lambda v, lo=lo, hi=hi: prog_signal(lo + (hi - lo) * int(v) // 100)
+
+                    broken = [d.title for d in step.deps if d.name in failed]
+                    if broken:
+                        log_signal(f"⏭ {label}: 上游步骤 {', '.join(broken)} 未成功，跳过")
+                        failed.append(step.name)
+                        continue
+
+                    fingerprint = step.fingerprint(self._store, self._known)
+                    record = None if force else self._store.lookup(step.key)
+                    if record and record[0] == fingerprint and self._outputs_intact(record[1]):
+                        log_signal(f"♻️ {label}: 输入未变化，沿用上次的结果")
+                        self._known.update((norm_path(p), h) for p, h in record[1].items())
+                        results[step.name] = record[2]
+                        skipped.append(step.name)
+                        prog_signal(hi)
+                        continue
+
+                    log_signal(f"📌 <b>{label}</b>")
+                    if not self._restore_inputs(step, step_prog):
+                        failed.append(step.name)
+                        continue
+                    ok, result = self._execute(step, fingerprint, step_prog)
+                    if not ok:
+                        failed.append(step.name)
+                        continue
+                    results[step.name] = result
+                    ran.append(step.name)
+        finally:
+            self._memory.close()
+            self._store.close()
+            self._store = self._memory = None
+
+        prog_signal(100)
+        summary = f"执行 {len(ran)} 步，沿用 {len(skipped)} 步"
+        if failed:
+            log_signal(f"⚠️ <b>工作流结束</b>：{summary}，{len(failed)} 步未完成")
+        else:
+            log_signal(f"✅ <b>工作流完成</b>：{summary}")
+        return {'results': results, 'ran': ran, 'skipped': skipped, 'failed': failed}
+
+    def _outputs_intact(self, recorded):
+        for path, digest in recorded.items():
+            if digest.startswith(_MEM):
+                # 上次只留在内存里的产物：这次仍然在内存中交接才能沿用，否则要重跑把它写出来
+                if norm_path(path) not in self.handoff:
+                    return False
+            elif self._store.path_hash(path) != digest:
+                return False
+        return True
+
+    def _restore_inputs(self, step, prog_signal):
+        """上游步骤被跳过时它的内存产物并不存在，先重新执行一次上游 (必要时逐级向上)。"""
+        for path in step.handoff_inputs:
+            producer = self.handoff.get(path)
+            if producer is None or artifacts.available(path) or not self._known.get(path, '').startswith(_MEM):
+                continue
+            self._log(f"🔁 重新生成中间产物: {producer.title} → {step.title}")
+            if not self._restore_inputs(producer, prog_signal):
+                return False
+            ok, _ = self._execute(producer, producer.fingerprint(self._store, self._known), prog_signal)
+            if not ok:
+                return False
+        return True
+
+    def _execute(self, step, fingerprint, prog_signal):
+        from core.task_registry import run_task
+        errors = []
+
+        def step_log(message):
+            if "❌" in str(message):
+                errors.append(message)
+            self._log(message)
+
+        try:
+            result = run_task(step.task, step.conf, step_log, prog_signal, self._cancel_token)
+        except TaskCancelled:
+            self._store.forget(step.key)
+            raise
+        except Exception as e:
+            errors.append(e)
+            self._log(f"❌ 步骤 {step.title} 异常: {e}")
+
+        if errors:
+            self._store.forget(step.key)
+            return False, None
+
+        outputs = {}
+        for path in step.outputs:
+            key = norm_path(path)
+            obj = artifacts.get(path) if key in self.handoff else None
+            if isinstance(obj, dict):
+                outputs[path] = _MEM + artifacts.mapping_digest(obj)
+            elif obj is not None:
+                # TTFont 不做序列化，用产出它的步骤指纹代表其内容
+                outputs[path] = _MEM + hashlib.sha256(f"{fingerprint}|{key}".encode('utf-8')).hexdigest()
+            else:
+                outputs[path] = self._store.path_hash(path)
+            self._known[key] = outputs[path]
+        self._store.store(step.key, fingerprint, outputs, result)
+        return True, result
@@ -0,0 +1,136 @@
+import time
+import traceback
+import multiprocessing
+
+from core.error_handler import TaskCancelled
+from core.cancellation import CancelToken, OutputGuard
+
+_POLL_INTERVAL = 0.1
+# 发出取消后等待任务自行收尾的时间，超时才强制结束子进程
+CANCEL_GRACE = 10.0
+
+
+class _RemoteTraceback(Exception):
+    """子进程里的异常堆栈，挂在抛出的异常上，调用方打印堆栈时一并显示。"""
+
+    def __init__(self, tb):
+        self.tb = tb
+
+    def __str__(self):
+        return self.tb
+
+
+def _child_main(task_type, conf, conn, cancel_event):
+    from core.task_registry import run_task
+    from core.history_manager import get_history_manager
+
+    def send(*msg):
+        try:
+            conn.send(msg)
+        except (BrokenPipeError, EOFError, OSError):
+            pass
+
+    try:
+        result = run_task(task_type, conf, lambda m: send('log', str(m)), lambda v: send('prog', int(v)),
+                          CancelToken(cancel_event))
+        send('history', list(get_history_manager().history))
+        send('done', result)
+    except TaskCancelled:
+        send('history', list(get_history_manager().history))
+        send('cancelled')
+    except BaseException as e:
+        send('history', list(get_history_manager().history))
+        send('error', str(e), traceback.format_exc())
+    finally:
+        conn.close()
+
+
+class ProcessTask:
+    """在独立子进程中执行一个注册任务，日志/进度经管道回传；结束后子进程占用的内存全部归还系统。"""
+
+    def __init__(self, task_type, conf):
+        self.task_type = task_type
+        self.conf = conf
+        self.proc = None
+        self.conn = None
+        self.cancelled = False
+        self._ctx = multiprocessing.get_context('spawn')
+        self._cancel_event = self._ctx.Event()
+        self._cancel_time = None
+
+    def start(self):
+        self.conn, child_conn = self._ctx.Pipe(duplex=False)
+        # 非守护进程：任务内部还可以再开进程池
+        self.proc = self._ctx.Process(target=_child_main,
+                                      args=(self.task_type, self.conf, child_conn, self._cancel_event),
+                                      name=f"galfont-{self.task_type}", daemon=False)
+        self.proc.start()
+        child_conn.close()
+
+    def cancel(self):
+        """通知子进程里的任务在下一个检查点停下；任务会自行清理输出并撤回历史记录。"""
+        if not self.cancelled:
+            self.cancelled = True
+            self._cancel_time = time.monotonic()
+            self._cancel_event.set()
+
+    def run(self, log_signal, prog_signal, history_signal=None):
+        from core.task_registry import task_paths
+        guard = OutputGuard(task_paths(self.task_type, self.conf)[1])
+        if self.proc is None:
+            self.start()
+
+        outcome = None
+        killed = False
+        try:
+            while outcome is None:
+                if self.cancelled and time.monotonic() - self._cancel_time > CANCEL_GRACE:
+                    log_signal("⚠️ 任务未能及时响应取消，已强制结束")
+                    self.proc.terminate()
+                    killed = True
+                    break
+                try:
+                    if not self.conn.poll(_POLL_INTERVAL):
+                        if not self.proc.is_alive() and not self.conn.poll():
+                            break
+                        continue
+                    msg = self.conn.recv()
+                except (EOFError, OSError):
+                    break
+
+                kind = msg[0]
+                if kind == 'log':
+                    log_signal(msg[1])
+                elif kind == 'prog':
+                    prog_signal(msg[1])
+                elif kind == 'history':
+                    if history_signal and msg[1]:
+                        history_signal(msg[1])
+                else:
+                    outcome = msg
+        finally:
+            self._shutdown()
+
+        if killed:
+            # 子进程来不及收尾，至少删掉新产生的半成品文件
+            guard.rollback()
+        if (outcome is not None and outcome[0] == 'cancelled') or (outcome is None and self.cancelled):
+            raise TaskCancelled("任务已取消")
+        if outcome is None:
+            raise RuntimeError(f"任务子进程异常退出 (exitcode={self.proc.exitcode})")
+        if outcome[0] == 'error':
+            raise RuntimeError(outcome[1]) from _RemoteTraceback(outcome[2])
+        return outcome[1]
+
+    def _shutdown(self):
+        if self.proc is None:
+            return
+        self.proc.join(timeout=5)
+        if self.proc.is_alive():
+            self.proc.terminate()
+            self.proc.join()
+        self.conn.close()
+
+
+def run_task_in_process(task_type, conf, log_signal, prog_signal, history_signal=None):
+    return ProcessTask(task_type, conf).run(log_signal, prog_signal, history_signal)
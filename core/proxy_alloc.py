@@ -0,0 +1,46 @@
+def allocate_proxies(chars, proxies, previous=None, recycle=False, present=()):
+    """给 chars 中的每个字符分配一个代理字符 (proxies 为当前可用的空位)。
+
+    previous 为上次的映射表：代理仍在可用空位中的分配原样保留，新字符 (及代理失效的字符) 按顺序取未占用的空位。
+    recycle 为 False 时只追加：上次映射表中已不在文本里的字符继续占着原来的空位；为 True 时这些空位可以重新分配。
+    present 为文本中出现的全部字符：仍在文本中但已不需要映射的字符总是移出映射表。
+
+    返回 (映射表, 分配发生变化的字符集合, 统计)；空位不足时映射表为 None，统计中 'missing' 为缺少的空位数。"""
+    previous = previous or {}
+    need = set(chars)
+    pool = set(proxies)
+
+    mapping, used = {}, set()
+    stats = {'kept': 0, 'added': 0, 'moved': 0, 'retained': 0, 'recycled': 0, 'dropped': 0, 'missing': 0}
+    for char, proxy in previous.items():
+        # 代理已被文本占用、不在限制字体中或与其他字符重复时，这条分配作废
+        valid = proxy in pool and proxy not in used
+        if char in need:
+            if valid:
+                mapping[char] = proxy
+                used.add(proxy)
+                stats['kept'] += 1
+        elif char in present:
+            stats['dropped'] += 1
+        elif recycle:
+            stats['recycled'] += 1
+        elif valid:
+            mapping[char] = proxy
+            used.add(proxy)
+            stats['retained'] += 1
+
+    free = sorted(p for p in pool if p not in used)
+    pending = sorted(need - mapping.keys())
+    if len(pending) > len(free):
+        stats['missing'] = len(pending) - len(free)
+        return None, set(), stats
+
+    for char, proxy in zip(pending, free):
+        if char in previous:
+            stats['moved'] += 1
+        else:
+            stats['added'] += 1
+        mapping[char] = proxy
+
+    changed = {c for c in previous.keys() | mapping.keys() if previous.get(c) != mapping.get(c)}
+    return mapping, changed, stats
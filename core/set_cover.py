@@ -0,0 +1,132 @@
+import heapq
+
+import numpy as np
+
+EXACT_LIMIT = 24
+NODE_LIMIT = 200000
+
+
+def _cost(costs, name):
+    cost = float((costs or {}).get(name, 1.0))
+    return cost if cost > 0 else 1e-6
+
+
+def greedy_cover(target, candidates, costs=None):
+    """贪心集合覆盖：每一步选「新增覆盖数 / 代价」最大的字体，选中后重新计算其余字体的边际收益。
+
+    candidates: {名称: Charset}；返回被选中的名称列表 (按选择顺序)。"""
+    remaining = target.copy()
+    # 边际收益只会变小，堆里的旧值可以作为上界做惰性更新
+    heap = []
+    for order, (name, charset) in enumerate(candidates.items()):
+        gain = len(charset & remaining)
+        if gain:
+            heapq.heappush(heap, (-gain / _cost(costs, name), -gain, order, name))
+
+    chosen = []
+    while heap and remaining:
+        _, _, order, name = heapq.heappop(heap)
+        gain = len(candidates[name] & remaining)
+        if not gain:
+            continue
+        score = -gain / _cost(costs, name)
+        if heap and (score, -gain, order) > heap[0][:3]:
+            heapq.heappush(heap, (score, -gain, order, name))
+            continue
+        chosen.append(name)
+        remaining -= candidates[name]
+    return chosen
+
+
+def _column_masks(target, names, candidates):
+    """把目标字符按「能被哪些候选字体覆盖」分组，返回各组的候选位掩码。"""
+    universe = target.codes()
+    masks = np.zeros(len(universe), dtype=np.uint64)
+    for i, name in enumerate(names):
+        idx = np.searchsorted(universe, (candidates[name] & target).codes())
+        masks[idx] |= np.uint64(1 << i)
+    return [int(m) for m in np.unique(masks) if m]
+
+
+def exact_cover(target, candidates, costs=None, upper_bound=None, node_limit=NODE_LIMIT):
+    """分支限界求最小代价覆盖，适用于候选字体较少的情况。
+
+    返回 (名称列表, 是否已证明最优)；upper_bound 为已知可行解 (通常是贪心结果)。"""
+    names = [n for n, cs in candidates.items() if cs & target]
+    if len(names) > 64:
+        raise ValueError("候选字体过多，无法精确求解")
+    weights = [_cost(costs, n) for n in names]
+    masks = _column_masks(target, names, candidates)
+
+    best_pick = None
+    best_cost = float('inf')
+    if upper_bound is not None:
+        index = {n: i for i, n in enumerate(names)}
+        pick = 0
+        for n in upper_bound:
+            if n in index:
+                pick |= 1 << index[n]
+        if all(m & pick for m in masks):
+            best_pick, best_cost = pick, sum(weights[i] for i in range(len(names)) if pick >> i & 1)
+
+    min_weight = min(weights) if weights else 1.0
+    nodes = 0
+    exhausted = False
+
+    def search(pick, cost, open_masks):
+        nonlocal best_pick, best_cost, nodes, exhausted
+        if not open_masks:
+            if cost < best_cost - 1e-9:
+                best_pick, best_cost = pick, cost
+            return
+        nodes += 1
+        if nodes > node_limit:
+            exhausted = True
+            return
+        hits = [sum(1 for m in open_masks if m >> i & 1) for i in range(len(names))]
+        # 下界：每个字体最多覆盖 max(hits) 组，剩下的组至少还要这么多个字体
+        need = -(-len(open_masks) // max(hits))
+        if cost + min_weight * need >= best_cost - 1e-9:
+            return
+        # 选可选字体最少的一组字符来分支
+        branch = min(open_masks, key=lambda m: bin(m).count('1'))
+        options = [i for i in range(len(names)) if branch >> i & 1]
+        options.sort(key=lambda i: (-hits[i] / weights[i], i))
+        for i in options:
+            bit = 1 << i
+            search(pick | bit, cost + weights[i], [m for m in open_masks if not m & bit])
+            if exhausted:
+                return
+
+    search(0, 0.0, masks)
+    if best_pick is None:
+        return [], False
+    return [n for i, n in enumerate(names) if best_pick >> i & 1], not exhausted
+
+
+def plan_cover(target, candidates, costs=None, exact_limit=EXACT_LIMIT):
+    """为 target 中的字符选出补全字体并分配来源。
+
+    返回 (计划, 信息)：计划为 [(名称, 分到的 Charset)]，覆盖多的字体在前；
+    信息含 greedy (贪心选中的字体数)、exact (是否运行了精确搜索)、optimal (是否已证明最优)。"""
+    candidates = {n: cs for n, cs in candidates.items() if cs & target}
+    chosen = greedy_cover(target, candidates, costs)
+    info = {'greedy': len(chosen), 'exact': False, 'optimal': False}
+
+    if (len(chosen) > 1 or costs) and len(candidates) <= exact_limit:
+        picked, optimal = exact_cover(target, candidates, costs, upper_bound=chosen)
+        info['exact'] = True
+        info['optimal'] = optimal
+        if picked:
+            chosen = picked
+
+    # 覆盖多的字体优先分配，其余字体只补剩下的字符
+    chosen.sort(key=lambda n: (-len(candidates[n] & target), n))
+    plan = []
+    remaining = target.copy()
+    for name in chosen:
+        assigned = candidates[name] & remaining
+        if assigned:
+            plan.append((name, assigned))
+            remaining -= assigned
+    return plan, info
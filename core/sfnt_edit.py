@@ -0,0 +1,206 @@
+import os
+import struct
+import tempfile
+
+import numpy as np
+from fontTools.ttLib import getSearchRange
+from fontTools.misc.textTools import tobytes
+
+_CHECKSUM_MAGIC = 0xB1B0AFBA
+
+# 表改动后需要一并重新编译的关联表 (loca 偏移、maxp/head/hhea 统计值、OS/2 首末字符)
+_DEPENDENTS = {
+    'glyf': ('loca', 'maxp', 'head', 'hhea'),
+    'hmtx': ('hhea',),
+    'vmtx': ('vhea',),
+    'cmap': ('OS/2',),
+}
+# 编译顺序：被依赖的表先编译，它会顺带更新后面表里的字段
+_COMPILE_ORDER = ('glyf', 'hmtx', 'vmtx', 'loca', 'maxp', 'head', 'hhea', 'vhea', 'cmap', 'OS/2')
+
+
+def _pad4(data):
+    return data + b"\0" * (-len(data) % 4)
+
+
+def _checksum(padded):
+    return int(np.frombuffer(padded, dtype='>u4').sum(dtype=np.uint64)) & 0xFFFFFFFF
+
+
+class SfntEditor:
+    """直接在 sfnt 表目录层面替换/删除表，未改动的表按原始字节拷贝，不经过 fontTools 的反编译。"""
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.sfnt_version = tobytes(reader.sfntVersion, 'latin-1')
+        entries = reader.tables
+        self.order = sorted(entries, key=lambda tag: getattr(entries[tag], 'offset', 0))
+        self.replaced = {}
+        self.removed = set()
+
+    @classmethod
+    def from_font(cls, font):
+        if getattr(font, 'reader', None) is None:
+            raise ValueError("字体不是从文件读取的，无法按表编辑")
+        return cls(font.reader)
+
+    def __contains__(self, tag):
+        return tag not in self.removed and (tag in self.replaced or tag in self.reader.tables)
+
+    def tags(self):
+        return [t for t in self.order if t not in self.removed] + \
+               [t for t in self.replaced if t not in self.reader.tables and t not in self.removed]
+
+    def get(self, tag):
+        if tag in self.removed:
+            raise KeyError(tag)
+        if tag in self.replaced:
+            return self.replaced[tag]
+        return self.reader[tag]
+
+    def set(self, tag, data):
+        self.replaced[tag] = bytes(data)
+        self.removed.discard(tag)
+
+    def remove(self, tag):
+        if tag in self:
+            self.removed.add(tag)
+            return True
+        return False
+
+    def write(self, out_file):
+        tags = self.tags()
+        num_tables = len(tags)
+        header_size = 12 + 16 * num_tables
+
+        blobs = []
+        offset = header_size
+        head_offset = None
+        for tag in tags:
+            data = self.get(tag)
+            if tag == 'head' and len(data) >= 12:
+                data = data[:8] + b"\0\0\0\0" + data[12:]
+                head_offset = offset
+            padded = _pad4(data)
+            blobs.append((tag, offset, len(data), _checksum(padded), padded))
+            offset += len(padded)
+
+        header = struct.pack(">4sHHHH", self.sfnt_version, num_tables, *getSearchRange(num_tables, 16))
+        directory = b"".join(struct.pack(">4sLLL", tobytes(tag, 'latin-1'), checksum, table_offset, length)
+                             for tag, table_offset, length, checksum, _ in sorted(blobs))
+        total = _checksum(header + directory)
+        for _, _, _, checksum, _ in blobs:
+            total += checksum
+
+        out_file.write(header)
+        out_file.write(directory)
+        for _, _, _, _, padded in blobs:
+            out_file.write(padded)
+
+        if head_offset is not None:
+            out_file.seek(head_offset + 8)
+            out_file.write(struct.pack(">L", (_CHECKSUM_MAGIC - total) & 0xFFFFFFFF))
+            out_file.seek(0, os.SEEK_END)
+
+
+def save_font_tables(font, out_path, tags=(), drop=(), recalc_bboxes=False):
+    """只重新编译 tags 中的表、删除 drop 中的表，其余表原样拷贝，然后写出到 out_path。
+
+    写入完成后会关闭 font（out_path 可以与源文件相同）。"""
+    reader = getattr(font, 'reader', None)
+    extra = [t for t in font.tables if t != 'GlyphOrder' and (reader is None or t not in reader.tables)]
+    if reader is None or font.flavor or font.sfntVersion != reader.sfntVersion or any(t not in tags for t in extra):
+        for tag in drop:
+            if tag in font:
+                del font[tag]
+        font.save(out_path)
+        font.close()
+        return
+
+    editor = SfntEditor.from_font(font)
+    recalc = font.recalcBBoxes
+    font.recalcBBoxes = recalc_bboxes
+    try:
+        for tag in tags:
+            if tag in font and tag not in drop:
+                editor.set(tag, font.getTableData(tag))
+    finally:
+        font.recalcBBoxes = recalc
+    for tag in drop:
+        editor.remove(tag)
+
+    out_dir = os.path.dirname(os.path.abspath(out_path))
+    fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=out_dir)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            editor.write(f)
+        font.close()
+        os.replace(tmp_path, out_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def mark_dirty(font, *tags):
+    """登记被修改过的表：save_font 直接重新编译这些表 (及其关联表)，不再与源文件字节比较。"""
+    dirty = getattr(font, '_dirty_tables', None)
+    if dirty is None:
+        dirty = font._dirty_tables = set()
+    dirty.update(tags)
+
+
+def _source_glyph_count(reader):
+    if 'maxp' not in reader.tables:
+        return None
+    return struct.unpack(">H", reader['maxp'][4:6])[0]
+
+
+def _compile_rank(tag):
+    return (_COMPILE_ORDER.index(tag) if tag in _COMPILE_ORDER else len(_COMPILE_ORDER), tag)
+
+
+def _modified_tables(font, reader, skip):
+    """反编译过的表逐个编译后与源文件字节比较，返回内容有变化的表 (head 的修改时间不算变化)。"""
+    modified = set()
+    stamp = font.recalcTimestamp
+    font.recalcTimestamp = False
+    try:
+        done = set(skip)
+        while True:
+            # 编译一张表可能顺带载入别的表 (如 glyf 会更新 loca)，所以每轮重新取已载入的表
+            pending = sorted((t for t in font.tables if t != 'GlyphOrder' and t in reader.tables and t not in done),
+                             key=_compile_rank)
+            if not pending:
+                break
+            tag = pending[0]
+            done.add(tag)
+            if font.getTableData(tag) != reader[tag]:
+                modified.add(tag)
+    finally:
+        font.recalcTimestamp = stamp
+    return modified
+
+
+def save_font(font, out_path):
+    """保存字体：内容有变化的表 (mark_dirty 登记过的、编译后与源文件字节不同的) 和新增的表重新编译，
+    未反编译过的表直接拷贝源文件字节。
+
+    字形数量变化、输出 WOFF/WOFF2 或字体不是从文件读取时退回完整保存。写入完成后会关闭 font。"""
+    reader = getattr(font, 'reader', None)
+    if reader is None or font.flavor or len(font.getGlyphOrder()) != _source_glyph_count(reader):
+        font.save(out_path)
+        font.close()
+        return
+
+    dirty = set(getattr(font, '_dirty_tables', ()))
+    dirty |= _modified_tables(font, reader, dirty)
+    for tag in list(dirty):
+        dirty.update(_DEPENDENTS.get(tag, ()))
+    dirty.update(t for t in font.tables if t != 'GlyphOrder' and t not in reader.tables)
+
+    tags = sorted((t for t in dirty if t in font), key=_compile_rank)
+    for tag in tags:
+        # 关联表要先载入，否则只会拷贝原始字节，统计值不会随之更新
+        font[tag]
+    save_font_tables(font, out_path, tags, recalc_bboxes=font.recalcBBoxes)
@@ -0,0 +1,166 @@
+import os
+
+from core.error_handler import TaskCancelled
+from core.cancellation import CancelToken, OutputGuard
+from core.history_manager import get_history_manager
+from core.tasks import image_tasks, font_tasks, text_tasks, modify_tasks, info_tasks, pipeline_tasks
+
+TASKS = {
+    "font": font_tasks.build_font,
+    "subset": font_tasks.subset_font,
+    "woff2": font_tasks.gen_woff2,
+    "transplant": font_tasks.apply_fallback_plan,
+
+    "pic": image_tasks.gen_pic,
+    "tga": image_tasks.gen_tga,
+    "bmp": image_tasks.gen_bmp,
+    "bmfont": image_tasks.gen_bmfont,
+
+    "map": text_tasks.gen_mapping,
+    "smart_fallback": text_tasks.smart_fallback_scan,
+
+    "tweak_width": modify_tasks.tweak_font_width,
+    "cleanup": modify_tasks.clean_font_tables,
+    "unified_fix": modify_tasks.gen_unified_fix,
+    "apply_metrics": modify_tasks.apply_font_metrics,
+    "save_info": modify_tasks.save_font_info,
+    "merge": modify_tasks.merge_fonts,
+    "convert": modify_tasks.convert_format,
+
+    "read_unified_metrics": info_tasks.read_unified_metrics,
+    "read_metrics": info_tasks.read_font_metrics,
+    "read_info": info_tasks.read_font_info,
+    "coverage": info_tasks.coverage_analysis,
+    "compare": info_tasks.compare_fonts,
+    "checkup": info_tasks.checkup,
+
+    "pipeline": pipeline_tasks.run_pipeline,
+}
+
+
+def _keys(*keys):
+    return lambda conf: [conf.get(k) for k in keys]
+
+
+def _beside(src_key, name_key, dir_key=None, suffix=''):
+    """输出文件写在源文件同目录 (或指定的输出目录)。"""
+    def paths(conf):
+        src = conf.get(src_key) or ''
+        out_dir = conf.get(dir_key) if dir_key else ''
+        name = conf.get(name_key) or ''
+        if suffix and not name.lower().endswith(suffix):
+            name += suffix
+        return [os.path.join(out_dir if out_dir and os.path.isdir(out_dir) else os.path.dirname(src), name)]
+    return paths
+
+
+def _replaced(key, *pairs):
+    def paths(conf):
+        path = conf.get(key) or ''
+        for old, new in pairs:
+            path = path.replace(old, new)
+        return [path]
+    return paths
+
+
+def _with_png(key):
+    return lambda conf: [conf.get(key), os.path.splitext(conf.get(key) or '')[0] + ".png"]
+
+
+_NONE = lambda conf: []
+
+
+def _steps(index):
+    """工作流读写其所有步骤读写的路径。"""
+    return lambda conf: [p for s in conf.get('steps', []) for p in task_paths(s['task'], s['conf'])[index]]
+
+# 每个任务读写哪些路径：(读取, 写入)，供调度器判断两个任务能否并行
+TASK_PATHS = {
+    "font": (_keys('src', 'fallback', 'json'), _beside('src', 'file_name', 'output_dir', '.ttf')),
+    "subset": (_keys('font_path', 'txt_dir', 'json_path'), _keys('out_path')),
+    "woff2": (_keys('src'), _keys('out_path')),
+    "transplant": (lambda conf: [conf.get('primary'), conf.get('fb_dir')], _keys('out_path')),
+
+    "pic": (_keys('font'), _keys('folder')),
+    "tga": (_keys('font'), _keys('folder')),
+    "bmp": (_keys('font'), _keys('folder')),
+    "bmfont": (_keys('font_path'), _with_png('out_fnt')),
+
+    "map": (_keys('src_dir', 'limit_font'), lambda conf: [conf.get('out_dir'), conf.get('out_json'),
+                                                          text_tasks.manifest_path(conf)]),
+    "smart_fallback": (_keys('primary', 'txt_dir', 'fb_dir'), _NONE),
+
+    "tweak_width": (_keys('src'), _beside('src', 'out_name')),
+    "cleanup": (_keys('src'), _keys('out_path')),
+    "unified_fix": (_keys('src'), _keys('out_path')),
+    "apply_metrics": (_keys('path'), _replaced('path', (".ttf", "_fix.ttf"))),
+    "save_info": (_keys('path'), _replaced('path', ('.ttf', '_mod.ttf'), ('.otf', '_mod.otf'))),
+    "merge": (_keys('base', 'add'), _keys('out_path')),
+    "convert": (_keys('src'), _keys('out_path')),
+
+    "read_unified_metrics": (_keys('src', 'ref'), _NONE),
+    "read_metrics": (_keys('path', 'ref'), _NONE),
+    "read_info": (_keys('path'), _NONE),
+    "coverage": (_keys('path'), _NONE),
+    "compare": (_keys('path1', 'path2'), _NONE),
+    "checkup": (_keys('txt_dir', 'font_path', 'json_path'), _NONE),
+
+    "pipeline": (_steps(0), _steps(1)),
+}
+
+
+# 工作流中可以直接在内存里交接的产物：任务 → {路径: 类型}
+# 'font' 是 TTFont，只能交给一个下游步骤；'mapping' 是映射表 dict，可以被多个步骤读取
+HANDOFF_OUTPUTS = {
+    "map": lambda conf: {conf.get('out_json'): 'mapping'},
+    "font": lambda conf: {p: 'font' for p in TASK_PATHS['font'][1](conf)},
+    "subset": lambda conf: {conf.get('out_path'): 'font'},
+}
+
+HANDOFF_INPUTS = {
+    "font": lambda conf: {conf.get('json'): 'mapping'} if conf.get('mode') in (1, 2) else {},
+    "subset": lambda conf: {conf.get('font_path'): 'font', conf.get('json_path'): 'mapping'},
+    "woff2": lambda conf: {conf.get('src'): 'font'},
+}
+
+
+def handoff_paths(table, task_type, conf):
+    """返回任务在 table (HANDOFF_OUTPUTS / HANDOFF_INPUTS) 中声明的 {路径: 类型}，空路径已剔除。"""
+    paths = table[task_type](conf) if task_type in table else {}
+    return {p: kind for p, kind in paths.items() if p}
+
+
+# 只为界面填表的轻量只读任务：直接在线程里跑，省掉启动子进程的开销 (约 0.7 秒)；
+# 其余任务在子进程中执行，结束后占用的内存全部归还系统
+THREAD_TASKS = {"read_unified_metrics", "read_metrics", "read_info", "coverage", "compare", "checkup"}
+
+
+def task_backend(task_type):
+    """任务的执行方式：'thread' 或 'process'。"""
+    return 'thread' if task_type in THREAD_TASKS else 'process'
+
+
+def task_paths(task_type, conf):
+    """返回任务声明的 (读取路径列表, 写入路径列表)，空路径已剔除。"""
+    reads, writes = TASK_PATHS.get(task_type, (_NONE, _NONE))
+    return [p for p in reads(conf) if p], [p for p in writes(conf) if p]
+
+
+def run_task(task_type, conf, log_signal, prog_signal, cancel_token=None):
+    func = TASKS.get(task_type)
+    if func is None:
+        raise ValueError(f"未知的任务类型: {task_type}")
+    if cancel_token is None:
+        cancel_token = CancelToken()
+
+    guard = OutputGuard(task_paths(task_type, conf)[1], get_history_manager())
+    try:
+        result = func(conf, log_signal, prog_signal, cancel_token)
+        # 任务自己吞掉了取消异常时也按取消处理
+        cancel_token.check()
+        return result
+    except TaskCancelled:
+        undone, removed = guard.rollback()
+        if undone or removed:
+            log_signal(f"🧹 已撤回 {undone} 条历史记录，清理 {removed} 个未完成的输出文件")
+        raise
@@ -1,14 +1,28 @@
 import os
 import json
-import glob
 import traceback
-from fontTools.ttLib import TTFont
 from fontTools import subset
-from core.utils import ensure_ttf
+from core.utils import open_ttf
+from core.glyph_transplant import transplant_glyphs
+from core.sfnt_edit import mark_dirty, save_font
+from core.opencc_table import load_char_table, remap_cmap_tables
+from core.text_scanner import find_files, scan_files
+from core.charset import Charset
 from core.history_manager import get_history_manager
+from core.error_handler import TaskCancelled
+from core import artifacts
 
 
-def build_font(conf, log_signal, prog_signal):
+def _load_mapping(json_path):
+    """读取映射表；工作流中上游步骤留在内存里的映射表优先。"""
+    mapping = artifacts.get(json_path)
+    if mapping is None:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            mapping = json.load(f)
+    return mapping
+
+
+def build_font(conf, log_signal, prog_signal, cancel_token):
     src = conf['src']
     fallback = conf.get('fallback', '')
     json_path = conf['json']
@@ -25,7 +39,7 @@ def build_font(conf, log_signal, prog_signal):
         log_signal("❌ <font color='red'>错误：未找到源字体文件</font>")
         return None
 
-    if mode not in [3, 4, 5] and not os.path.exists(json_path):
+    if mode not in [3, 4, 5] and not artifacts.exists(json_path):
         log_signal("❌ <font color='red'>错误：未找到映射 JSON 文件</font>")
         return None
 
@@ -40,8 +54,7 @@ def build_font(conf, log_signal, prog_signal):
     prog_signal(10)
 
     try:
-        font = TTFont(src)
-        ensure_ttf(font, log_signal, "主字体")
+        font = open_ttf(src, log_signal, "主字体")
     except Exception as e:
         log_signal(f"❌ 字体读取失败: {str(e)}")
         return None
@@ -49,72 +62,18 @@ def build_font(conf, log_signal, prog_signal):
     if mode in [1, 2] and fallback and os.path.exists(fallback):
         log_signal(f"🔧 检测到补全字体: {os.path.basename(fallback)}")
         try:
-            fb_font = TTFont(fallback)
-            ensure_ttf(fb_font, log_signal, "补全字体")
-
-            upm_main = font['head'].unitsPerEm
-            upm_fb = fb_font['head'].unitsPerEm
-            scale_factor = upm_main / upm_fb
-
-            need_scale = abs(scale_factor - 1.0) > 0.01
-            if need_scale:
-                log_signal(f"⚖️ 检测到UPM差异 (主:{upm_main} vs 补:{upm_fb})，缩放倍率: {scale_factor:.2f}")
-
-            target_chars_needed = set()
-            with open(json_path, 'r', encoding='utf-8') as f:
-                raw_json = json.load(f)
-                if mode == 1:
-                    target_chars_needed = set(raw_json.keys())
-                elif mode == 2:
-                    target_chars_needed = set(raw_json.values())
-
-            main_cmap = font.getBestCmap()
-            fb_cmap = fb_font.getBestCmap()
-            injected_count = 0
-
-            if 'glyf' not in font or 'glyf' not in fb_font:
+            raw_json = _load_mapping(json_path)
+            target_chars_needed = set(raw_json.keys()) if mode == 1 else set(raw_json.values())
+
+            if 'glyf' not in font:
                 log_signal("⚠️ 补全警告：非 TrueType 格式，跳过。")
             else:
-                for char in target_chars_needed:
-                    code = ord(char)
-                    if code not in main_cmap and code in fb_cmap:
-                        fb_glyph_name = fb_cmap[code]
-                        fb_glyph = fb_font['glyf'][fb_glyph_name]
-
-                        if need_scale:
-                            if fb_glyph.isComposite():
-                                for comp in fb_glyph.components:
-                                    comp.x = int(comp.x * scale_factor)
-                                    comp.y = int(comp.y * scale_factor)
-                            elif hasattr(fb_glyph, 'coordinates'):
-                                coords = fb_glyph.coordinates
-                                for i in range(len(coords)):
-                                    x, y = coords[i]
-                                    coords[i] = (int(x * scale_factor), int(y * scale_factor))
-                                try:
-                                    fb_glyph.recalcBounds(fb_font['glyf'])
-                                except:
-                                    pass
-
-                            width, lsb = fb_font['hmtx'][fb_glyph_name]
-                            if need_scale:
-                                width = int(width * scale_factor)
-                                lsb = int(lsb * scale_factor)
-                        else:
-                            width, lsb = fb_font['hmtx'][fb_glyph_name]
-
-                        new_glyph_name = f"uni{code:04X}_fb"
-                        font['glyf'][new_glyph_name] = fb_glyph
-                        font['hmtx'][new_glyph_name] = (width, lsb)
-
-                        for t in font['cmap'].tables:
-                            if t.platformID == 3:
-                                t.cmap[code] = new_glyph_name
-
-                        injected_count += 1
-
-                log_signal(f"💉 <b>自动补全:</b> 注入 {injected_count} 个汉字 (已修正大小)")
+                counts = transplant_glyphs(font, [(fallback, target_chars_needed)], log_signal,
+                                           cancel_token=cancel_token)
+                log_signal(f"💉 <b>自动补全:</b> 注入 {counts[fallback]} 个汉字 (已修正大小)")
 
+        except TaskCancelled:
+            raise
         except Exception as e:
             log_signal(f"⚠️ 补全出错: {str(e)}")
             traceback.print_exc()
@@ -136,31 +95,18 @@ def build_font(conf, log_signal, prog_signal):
         config_file = 't2s' if mode == 4 else 's2t'
         log_signal(f"🔄 字形转换 ({config_file})...")
         try:
-            cc = opencc.OpenCC(config_file)
-            mapped_count = 0
+            char_table = load_char_table(config_file, log_signal)
             cmap_tables = [t for t in font['cmap'].tables if t.platformID == 3]
-            for table in cmap_tables:
-                existing = list(table.cmap.keys())
-                for code in existing:
-                    try:
-                        s_char = cc.convert(chr(code))
-                        if s_char != chr(code):
-                            s_code = ord(s_char)
-                            if s_code in table.cmap:
-                                table.cmap[code] = table.cmap[s_code]
-                                mapped_count += 1
-                    except:
-                        pass
-            ok_count = mapped_count
+            ok_count = remap_cmap_tables(cmap_tables, char_table)
+            mark_dirty(font, 'cmap')
         except Exception as e:
             log_signal(f"❌ OpenCC 失败: {e}")
             return None
 
     else:
         try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                raw = json.load(f)
-                mapping = {v: k for k, v in raw.items()} if mode == 1 else raw
+            raw = _load_mapping(json_path)
+            mapping = {v: k for k, v in raw.items()} if mode == 1 else raw
         except Exception as e:
             log_signal(f"❌ JSON 读取失败: {e}")
             return None
@@ -172,6 +118,7 @@ def build_font(conf, log_signal, prog_signal):
         target_tables = [t for t in font['cmap'].tables if t.platformID == 3]
 
         for table in target_tables:
+            cancel_token.check()
             for target_char, source_char in mapping.items():
                 if target_char == source_char:
                     continue
@@ -185,6 +132,7 @@ def build_font(conf, log_signal, prog_signal):
 
         if target_tables:
             ok_count //= len(target_tables)
+            mark_dirty(font, 'cmap')
         missing_list = list(missing_set)
 
     prog_signal(60)
@@ -207,22 +155,30 @@ def build_font(conf, log_signal, prog_signal):
         font['OS/2'].ulCodePageRange1 |= (1 << 0)
     except:
         pass
+    mark_dirty(font, 'name', 'OS/2')
 
     if output_dir and os.path.isdir(output_dir):
         out_path = os.path.join(output_dir, out_name)
     else:
         out_path = os.path.join(os.path.dirname(src), out_name)
 
+    cancel_token.check()
+    handoff = artifacts.is_handoff(out_path)
     history = get_history_manager()
     file_existed = os.path.exists(out_path)
-    if file_existed:
+    if file_existed and not handoff:
         history.record_before_overwrite("生成字体", out_path, f"模式{mode}")
 
     try:
-        font.save(out_path)
+        if handoff:
+            artifacts.put(out_path, font)
+        else:
+            save_font(font, out_path)
         prog_signal(100)
 
         msg = f"<br><b style='color:#4CAF50'>✅ 成功: {out_path}</b><br>"
+        if handoff:
+            msg += "&nbsp;&nbsp;-> 字体保留在内存中，直接交给后续步骤<br>"
         if mode in [1, 2]:
             msg += f"&nbsp;&nbsp;-> 成功映射: {ok_count} 个<br>"
             msg += f"&nbsp;&nbsp;-> 缺失汉字: {len(missing_list)} 个<br>"
@@ -236,7 +192,7 @@ def build_font(conf, log_signal, prog_signal):
 
         log_signal(msg)
         
-        if not file_existed and os.path.exists(out_path):
+        if not handoff and not file_existed and os.path.exists(out_path):
             history.record_new_file("生成字体", out_path, f"模式{mode}")
         
         return out_path
@@ -247,16 +203,16 @@ def build_font(conf, log_signal, prog_signal):
         return None
 
 
-def subset_font(conf, log_signal, prog_signal):
+def subset_font(conf, log_signal, prog_signal, cancel_token):
     font_path = conf['font_path']
     txt_dir = conf.get('txt_dir', '')
     json_path = conf.get('json_path', '')
     out_path = conf['out_path']
-    exts = conf.get('exts', '.txt;.json').split(';')
+    exts = conf.get('exts', '.txt;.json')
     history = get_history_manager()
     file_existed = os.path.exists(out_path)
 
-    if not os.path.exists(font_path):
+    if not artifacts.exists(font_path):
         log_signal("❌ 字体文件不存在！")
         return None
 
@@ -264,36 +220,24 @@ def subset_font(conf, log_signal, prog_signal):
     log_signal(f"   源字体: {os.path.basename(font_path)}")
     prog_signal(5)
 
-    all_chars = set()
+    all_chars = Charset()
 
     if txt_dir and os.path.exists(txt_dir):
-        all_files = []
-        for ext in exts:
-            ext = ext.strip()
-            if not ext: continue
-            if not ext.startswith('.'): ext = '.' + ext
-            all_files.extend(glob.glob(os.path.join(txt_dir, '**', f'*{ext}'), recursive=True))
-        
+        all_files = find_files(txt_dir, exts)
         log_signal(f"   扫描文本: {len(all_files)} 个文件")
-        
-        for fpath in all_files:
-            try:
-                with open(fpath, 'r', encoding='utf-8') as f:
-                    all_chars.update(f.read())
-            except:
-                pass
-
-    if json_path and os.path.exists(json_path):
+        all_chars |= scan_files(all_files, log_signal, prog_signal, prog_range=(5, 25),
+                                use_index=conf.get('use_index', True), root=txt_dir, cancel_token=cancel_token)
+
+    if json_path and artifacts.exists(json_path):
         try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                mapping = json.load(f)
-                all_chars.update(mapping.keys())
-                all_chars.update(mapping.values())
+            mapping = _load_mapping(json_path)
+            all_chars.update(mapping.keys())
+            all_chars.update(mapping.values())
             log_signal(f"   映射表: {len(mapping)} 条")
         except:
             pass
 
-    all_chars = {c for c in all_chars if c.isprintable() or c in ['\n', '\r', '\t']}
+    all_chars = all_chars.select(lambda c: c.isprintable() or c in ['\n', '\r', '\t'])
     log_signal(f"   需要保留: {len(all_chars)} 个字符")
     
     prog_signal(30)
@@ -303,8 +247,10 @@ def subset_font(conf, log_signal, prog_signal):
         return None
 
     try:
-        font = TTFont(font_path)
-        ensure_ttf(font, log_signal, "源字体")
+        font = artifacts.take(font_path)
+        in_memory = font is not None
+        if not in_memory:
+            font = open_ttf(font_path, log_signal, "源字体")
         
         options = subset.Options()
         options.name_IDs = ['*']
@@ -323,6 +269,14 @@ def subset_font(conf, log_signal, prog_signal):
         subsetter.subset(font)
         
         prog_signal(80)
+        cancel_token.check()
+
+        if artifacts.is_handoff(out_path):
+            artifacts.put(out_path, font)
+            prog_signal(100)
+            log_signal(f"✅ <b>精简完成！</b>")
+            log_signal(f"   字体保留在内存中，直接交给后续步骤: {out_path}")
+            return out_path
         
         if file_existed:
             history.record_before_overwrite("精简字体", out_path, f"保留{len(all_chars)}字符")
@@ -330,9 +284,7 @@ def subset_font(conf, log_signal, prog_signal):
         font.save(out_path)
         font.close()
         
-        original_size = os.path.getsize(font_path) / 1024
         new_size = os.path.getsize(out_path) / 1024
-        reduction = (1 - new_size / original_size) * 100
         
         if not file_existed and os.path.exists(out_path):
             history.record_new_file("精简字体", out_path, f"保留{len(all_chars)}字符")
@@ -341,25 +293,31 @@ def subset_font(conf, log_signal, prog_signal):
         
         prog_signal(100)
         log_signal(f"✅ <b>精简完成！</b>")
-        log_signal(f"   原始大小: {original_size:.1f} KB")
+        # 源字体来自上游步骤的内存产物时没有可对比的原始文件
+        if not in_memory:
+            original_size = os.path.getsize(font_path) / 1024
+            log_signal(f"   原始大小: {original_size:.1f} KB")
         log_signal(f"   精简后: {new_size:.1f} KB")
-        log_signal(f"   体积减少: {reduction:.1f}%")
+        if not in_memory:
+            log_signal(f"   体积减少: {(1 - new_size / original_size) * 100:.1f}%")
         log_signal(f"   输出: {out_path}")
         return out_path
 
+    except TaskCancelled:
+        raise
     except Exception as e:
         log_signal(f"❌ 精简失败: {e}")
         traceback.print_exc()
         return None
 
 
-def gen_woff2(conf, log_signal, prog_signal):
+def gen_woff2(conf, log_signal, prog_signal, cancel_token):
     src = conf['src']
     out_path = conf['out_path']
     history = get_history_manager()
     file_existed = os.path.exists(out_path)
 
-    if not os.path.exists(src):
+    if not artifacts.exists(src):
         log_signal("❌ 源字体不存在！")
         return None
 
@@ -368,10 +326,13 @@ def gen_woff2(conf, log_signal, prog_signal):
     prog_signal(10)
 
     try:
-        font = TTFont(src)
-        ensure_ttf(font, log_signal, "源字体")
+        font = artifacts.take(src)
+        in_memory = font is not None
+        if not in_memory:
+            font = open_ttf(src, log_signal, "源字体")
         
         prog_signal(50)
+        cancel_token.check()
         
         if file_existed:
             history.record_before_overwrite("WOFF2转换", out_path, os.path.basename(src))
@@ -380,9 +341,7 @@ def gen_woff2(conf, log_signal, prog_signal):
         font.save(out_path)
         font.close()
         
-        original_size = os.path.getsize(src) / 1024
         new_size = os.path.getsize(out_path) / 1024
-        reduction = (1 - new_size / original_size) * 100
         
         if not file_existed and os.path.exists(out_path):
             history.record_new_file("WOFF2转换", out_path, os.path.basename(src))
@@ -391,13 +350,78 @@ def gen_woff2(conf, log_signal, prog_signal):
         
         prog_signal(100)
         log_signal(f"✅ <b>WOFF2 转换完成！</b>")
-        log_signal(f"   原始大小: {original_size:.1f} KB")
+        if not in_memory:
+            original_size = os.path.getsize(src) / 1024
+            log_signal(f"   原始大小: {original_size:.1f} KB")
         log_signal(f"   WOFF2: {new_size:.1f} KB")
-        log_signal(f"   压缩率: {reduction:.1f}%")
+        if not in_memory:
+            log_signal(f"   压缩率: {(1 - new_size / original_size) * 100:.1f}%")
         log_signal(f"   输出: {out_path}")
         return out_path
 
+    except TaskCancelled:
+        raise
     except Exception as e:
         log_signal(f"❌ 转换失败: {e}")
         traceback.print_exc()
+        return None
+
+
+def apply_fallback_plan(conf, log_signal, prog_signal, cancel_token):
+    primary = conf['primary']
+    plan = conf['plan']
+    fb_dir = conf.get('fb_dir', '')
+    out_path = conf['out_path']
+    history = get_history_manager()
+
+    if not os.path.exists(primary):
+        log_signal("❌ 主字体不存在")
+        return None
+
+    sources = []
+    for name, chars in plan.items():
+        path = name if os.path.isabs(name) else os.path.join(fb_dir, name)
+        if not os.path.exists(path):
+            log_signal(f"⚠️ 来源字体不存在，跳过: {name}")
+            continue
+        sources.append((path, chars))
+
+    total = sum(len(set(chars)) for _, chars in sources)
+    log_signal(f"💉 <b>开始批量补字...</b>")
+    log_signal(f"   主字体: {os.path.basename(primary)}")
+    log_signal(f"   来源字体: {len(sources)} 个，计划补入 {total} 个字符")
+    prog_signal(5)
+
+    try:
+        font = open_ttf(primary, log_signal, "主字体")
+        counts = transplant_glyphs(font, sources, log_signal, prog_signal, prog_range=(10, 80),
+                                   cancel_token=cancel_token)
+        for path, count in counts.items():
+            log_signal(f"   📦 {os.path.basename(path)}: 移植 {count} 个字符")
+
+        cancel_token.check()
+        file_existed = os.path.exists(out_path)
+        if file_existed:
+            history.record_before_overwrite("批量补字", out_path, f"{len(sources)}个来源")
+
+        save_font(font, out_path)
+
+        done = sum(counts.values())
+        if not file_existed and os.path.exists(out_path):
+            history.record_new_file("批量补字", out_path, f"补入{done}字符")
+        elif os.path.exists(out_path):
+            history.record("批量补字", out_path, f"补入{done}字符")
+
+        prog_signal(100)
+        log_signal(f"✅ <b>补字完成！</b> 共补入 {done} 个字符")
+        if done < total:
+            log_signal(f"   ⚠️ 有 {total - done} 个字符已存在于主字体或来源字体中未找到")
+        log_signal(f"   输出: {out_path}")
+        return out_path
+
+    except TaskCancelled:
+        raise
+    except Exception as e:
+        log_signal(f"❌ 补字失败: {e}")
+        traceback.print_exc()
         return None
\ No newline at end of file
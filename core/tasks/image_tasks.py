@@ -1,13 +1,17 @@
 import os
 import struct
+import traceback
 from PIL import Image, ImageDraw, ImageFont
+from core.error_handler import TaskCancelled
+from core import codepage_index
 
-def _get_jp_chars():
-    fl = list(range(0x81, 0xA0)) + list(range(0xE0, 0xF0)) + list(range(0xFA, 0xFD))
-    sl = list(range(0x40, 0x7F)) + list(range(0x80, 0xFD))
-    return fl, sl
+# TGA 引擎的 CP932 索引只收录到 0xEA 区 (不含 NEC/IBM 扩展)
+_TGA_LEADS = {'cp932': list(range(0x81, 0xA0)) + list(range(0xE0, 0xEB)) + list(range(0xFA, 0xFD))}
 
-def gen_pic(conf, log_signal, prog_signal):
+def _get_page(conf):
+    return codepage_index.load(conf.get('codepage', 'cp932'))
+
+def gen_pic(conf, log_signal, prog_signal, cancel_token):
     if not os.path.exists(conf['font']): 
         log_signal("❌ 字体文件不存在！")
         return None
@@ -16,20 +20,15 @@ def gen_pic(conf, log_signal, prog_signal):
     if not os.path.exists(conf['folder']): os.makedirs(conf['folder'])
 
     font = ImageFont.truetype(conf['font'], conf['fsize'])
-    fl, sl = _get_jp_chars()
+    page = _get_page(conf)
+    fl = page.grid_leads
     total_blocks = len(fl)
     seq = 0
 
     for idx, i in enumerate(fl):
+        cancel_token.check()
         prog_signal(int((idx / total_blocks) * 100))
-        text_buf = ""
-        valid = 0
-        for j in sl:
-            try:
-                text_buf += (i * 0x100 + j).to_bytes(2, 'big').decode('cp932')
-                valid += 1
-            except:
-                text_buf += '･'
+        text_buf, valid = page.row(i, page.trails, '･')
 
         if valid == 0: continue
 
@@ -56,7 +55,7 @@ def gen_pic(conf, log_signal, prog_signal):
     log_signal("✅ 图片字库生成完成。")
     return None
 
-def gen_tga(conf, log_signal, prog_signal):
+def gen_tga(conf, log_signal, prog_signal, cancel_token):
     if not os.path.exists(conf['font']): 
         log_signal("❌ 字体文件不存在！")
         return None
@@ -68,15 +67,8 @@ def gen_tga(conf, log_signal, prog_signal):
     text_items = []
     for code in range(0x20, 0x7F): text_items.append((chr(code), code))
 
-    fl = list(range(0x81, 0xA0)) + list(range(0xE0, 0xEB)) + list(range(0xFA, 0xFD))
-    sl = list(range(0x40, 0x80)) + list(range(0x80, 0x100))
-    for i in fl:
-        for j in sl:
-            code = i * 0x100 + j
-            try:
-                text_items.append(((code).to_bytes(2, 'big').decode('cp932'), code))
-            except:
-                pass
+    page = _get_page(conf)
+    text_items.extend(page.items(_TGA_LEADS.get(page.name, page.grid_leads)))
 
     img = Image.new('RGBA', (conf['img_w'], conf['img_h']))
     font = ImageFont.truetype(conf['font'], conf['fsize'])
@@ -87,6 +79,7 @@ def gen_tga(conf, log_signal, prog_signal):
     total = len(text_items)
 
     for idx, (char, code) in enumerate(text_items):
+        cancel_token.check()
         if idx % 500 == 0: prog_signal(int((idx / total) * 100))
 
         bbox = font.getbbox(char)
@@ -104,6 +97,7 @@ def gen_tga(conf, log_signal, prog_signal):
         info_map[code] = {'box': (px, py, px + cw, py + ch), 'code': code}
         px += cw + conf['iw']
 
+    cancel_token.check()
     tga_path = os.path.join(out_dir, f"{conf['dat']}.tga")
     img.save(tga_path)
 
@@ -124,7 +118,7 @@ def gen_tga(conf, log_signal, prog_signal):
     log_signal(f"✅ TGA 字库完成，索引: {conf['dat']}.txt")
     return None
 
-def gen_bmp(conf, log_signal, prog_signal):
+def gen_bmp(conf, log_signal, prog_signal, cancel_token):
     if not os.path.exists(conf['font']): 
         log_signal("❌ 字体文件不存在！")
         return None
@@ -132,7 +126,8 @@ def gen_bmp(conf, log_signal, prog_signal):
     if not os.path.exists(conf['folder']): os.makedirs(conf['folder'])
 
     font = ImageFont.truetype(conf['font'], conf['fsize'])
-    fl, sl = _get_jp_chars()
+    page = _get_page(conf)
+    fl = page.grid_leads
 
     palette = []
     if conf['depth'] <= 8:
@@ -149,12 +144,9 @@ def gen_bmp(conf, log_signal, prog_signal):
     total_fl = len(fl)
 
     for idx, i in enumerate(fl):
+        cancel_token.check()
         prog_signal(int((idx / total_fl) * 100))
-        for j in sl:
-            try:
-                text_buf += (i * 0x100 + j).to_bytes(2, 'big').decode('cp932')
-            except:
-                text_buf += '　'
+        text_buf += page.row(i, page.trails, '　')[0]
 
         count += 1
         if count == page_limit or i == fl[-1]:
@@ -192,7 +184,7 @@ def gen_bmp(conf, log_signal, prog_signal):
     log_signal("✅ BMP 长图字库生成完成。")
     return None
 
-def gen_bmfont(conf, log_signal, prog_signal):
+def gen_bmfont(conf, log_signal, prog_signal, cancel_token):
     font_path = conf['font_path']
     chars = conf['chars']
     tex_size = conf['tex_size']
@@ -229,6 +221,7 @@ def gen_bmfont(conf, log_signal, prog_signal):
         total_chars = len(chars)
         
         for char in chars:
+            cancel_token.check()
             adv = pil_font.getlength(char)
             bbox = pil_font.getbbox(char)
             
@@ -293,6 +286,7 @@ def gen_bmfont(conf, log_signal, prog_signal):
             if img_map[char]:
                 atlas.paste(img_map[char], (g['x'], g['y']))
         
+        cancel_token.check()
         log_signal(f"💾 保存纹理: {out_png}")
         atlas.save(out_png)
         
@@ -315,6 +309,8 @@ def gen_bmfont(conf, log_signal, prog_signal):
         log_signal(f"✅ <b>BMFont 生成完毕!</b>")
         return out_fnt
 
+    except TaskCancelled:
+        raise
     except Exception as e:
         log_signal(f"❌ 生成失败: {e}")
         traceback.print_exc()
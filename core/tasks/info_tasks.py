@@ -0,0 +1,269 @@
+import os
+import json
+import traceback
+from fontTools.ttLib import TTFont
+from core import font_cache
+from core.charset import Charset
+from core.text_scanner import find_files, scan_files
+
+COVERAGE_BLOCKS = {
+    "ASCII (基础拉丁)": (0x0020, 0x007E),
+    "日文平假名": (0x3040, 0x309F),
+    "日文片假名": (0x30A0, 0x30FF),
+    "CJK 基本 (常用汉字)": (0x4E00, 0x9FFF),
+    "全角ASCII": (0xFF01, 0xFF5E),
+    "CJK 标点符号": (0x3000, 0x303F),
+}
+
+NAME_LABELS = {
+    0: "Copyright (版权)", 1: "Family Name (族名)", 2: "Subfamily (子族)",
+    3: "Unique ID (唯一ID)", 4: "Full Name (完整名)", 5: "Version (版本)",
+    6: "PostScript Name", 7: "Trademark (商标)", 8: "Manufacturer (厂商)",
+    9: "Designer (设计师)", 10: "Description (描述)", 11: "Vendor URL (厂商链接)",
+    12: "Designer URL (设计师链接)", 13: "License (许可证)", 14: "License URL",
+    16: "Typographic Family", 17: "Typographic Subfamily"
+}
+
+
+def _open_lazy(path):
+    return TTFont(path, lazy=True)
+
+
+def read_unified_metrics(conf, log_signal, prog_signal, cancel_token):
+    src_path = conf['src']
+    ref_path = conf['ref']
+
+    try:
+        src_font = _open_lazy(src_path)
+        ref_font = _open_lazy(ref_path)
+        prog_signal(50)
+
+        src_upm = src_font['head'].unitsPerEm
+        ref_upm = ref_font['head'].unitsPerEm
+        ratio = src_upm / ref_upm
+
+        ref_hhea = ref_font['hhea']
+        result = {
+            'asc': int(ref_hhea.ascent * ratio),
+            'desc': int(ref_hhea.descent * ratio),
+            'gap': int(ref_hhea.lineGap * ratio),
+        }
+        src_font.close()
+        ref_font.close()
+
+        log_signal("="*40)
+        log_signal("🪄 <b>自动计算完成</b>")
+        log_signal(f"   目标字体 UPM: {src_upm}")
+        log_signal(f"   参考字体 UPM: {ref_upm}")
+        log_signal(f"   计算倍率: {ratio:.4f}x")
+        log_signal("-" * 20)
+        log_signal(f"   原版 Asc: {ref_hhea.ascent} -> 新 Asc: {result['asc']}")
+        log_signal(f"   原版 Desc: {ref_hhea.descent} -> 新 Desc: {result['desc']}")
+        log_signal("="*40)
+        prog_signal(100)
+        return result
+
+    except Exception as e:
+        log_signal(f"❌ 计算失败: {e}")
+        traceback.print_exc()
+        return None
+
+
+def read_font_metrics(conf, log_signal, prog_signal, cancel_token):
+    path = conf['path']
+    ref = conf.get('ref', '')
+
+    try:
+        target_font = _open_lazy(path)
+        tgt_upm = target_font['head'].unitsPerEm
+
+        if ref and os.path.exists(ref):
+            ref_font = _open_lazy(ref)
+            ref_upm = ref_font['head'].unitsPerEm
+            hhea = ref_font['hhea']
+
+            ratio = tgt_upm / ref_upm
+
+            asc = int(hhea.ascent * ratio)
+            desc = int(hhea.descent * ratio)
+            gap = int(hhea.lineGap * ratio)
+            ref_font.close()
+
+            log_signal(f"📐 <b>智能缩放计算:</b>")
+            log_signal(f"&nbsp;&nbsp;参考UPM: {ref_upm} | 目标UPM: {tgt_upm}")
+            log_signal(f"&nbsp;&nbsp;缩放倍率: {ratio:.2f}")
+            log_signal(f"&nbsp;&nbsp;原始Asc: {hhea.ascent} -> 修正后: {asc}")
+        else:
+            hhea = target_font['hhea']
+            asc = hhea.ascent
+            desc = hhea.descent
+            gap = hhea.lineGap
+            log_signal(f"⚠️ 未提供参考字体，读取目标原始数值 (UPM: {tgt_upm})")
+
+        target_font.close()
+        prog_signal(100)
+        return {'asc': asc, 'desc': desc, 'gap': gap}
+
+    except Exception as e:
+        log_signal(f"❌ 读取失败: {e}")
+        traceback.print_exc()
+        return None
+
+
+def read_font_info(conf, log_signal, prog_signal, cancel_token):
+    """返回 Windows 平台 name 记录 [(nameID, 说明, 值)]，按 nameID 排序。"""
+    font_path = conf['path']
+
+    try:
+        font = _open_lazy(font_path)
+        records = [r for r in font['name'].names if r.platformID == 3]
+        records.sort(key=lambda x: x.nameID)
+
+        rows = []
+        for record in records:
+            desc = NAME_LABELS.get(record.nameID, f"Unknown ID {record.nameID}")
+            if record.langID == 1041: desc += " [🇯🇵 JP]"
+            elif record.langID == 2052: desc += " [🇨🇳 CN]"
+            elif record.langID == 1033: desc += " [🇺🇸 EN]"
+
+            try:
+                value = record.toUnicode()
+            except:
+                value = "<无法解码的数据>"
+            rows.append((record.nameID, desc, value))
+        font.close()
+
+        log_signal(f"📖 成功读取 {len(rows)} 条元数据。")
+        prog_signal(100)
+        return rows
+
+    except Exception as e:
+        log_signal(f"❌ 读取失败: 无法读取字体: {e}")
+        traceback.print_exc()
+        return None
+
+
+def coverage_analysis(conf, log_signal, prog_signal, cancel_token):
+    font_path = conf['path']
+
+    try:
+        font_chars = font_cache.get_charset(font_path)
+        prog_signal(50)
+
+        results = []
+        results.append(f"📂 字体: {os.path.basename(font_path)}")
+        results.append(f"📊 总字符数: {len(font_chars)}\n")
+        results.append("=" * 50)
+
+        for name, (start, end) in COVERAGE_BLOCKS.items():
+            total = end - start + 1
+            covered = font_chars.count_range(start, end)
+            percent = (covered / total) * 100
+
+            bar_len = 20
+            filled = int(bar_len * percent / 100)
+            bar = "█" * filled + "░" * (bar_len - filled)
+
+            results.append(f"{name}")
+            results.append(f"  [{bar}] {percent:.1f}% ({covered}/{total})")
+            results.append("")
+
+        log_signal(f"📊 覆盖率分析完成: {os.path.basename(font_path)}")
+        prog_signal(100)
+        return "\n".join(results)
+
+    except Exception as e:
+        log_signal(f"❌ 分析失败: {e}")
+        return None
+
+
+def compare_fonts(conf, log_signal, prog_signal, cancel_token):
+    path1 = conf['path1']
+    path2 = conf['path2']
+
+    try:
+        chars1 = font_cache.get_charset(path1)
+        prog_signal(40)
+        chars2 = font_cache.get_charset(path2)
+        prog_signal(80)
+
+        common = chars1 & chars2
+        only_a = chars1 - chars2
+        only_b = chars2 - chars1
+
+        lines = []
+        lines.append(f"📊 字符集对比结果")
+        lines.append(f"{'=' * 40}")
+        lines.append(f"字体 A: {os.path.basename(path1)} ({len(chars1)} 字符)")
+        lines.append(f"字体 B: {os.path.basename(path2)} ({len(chars2)} 字符)")
+        lines.append(f"{'=' * 40}")
+        lines.append(f"✅ 共有字符: {len(common)}")
+        lines.append(f"🅰️ A 独有: {len(only_a)}")
+        lines.append(f"🅱️ B 独有: {len(only_b)}")
+        lines.append("")
+
+        if only_a:
+            lines.append("─── A 独有的字符 (前100个) ───")
+            sample_a = only_a.codes()[:100].tolist()
+            lines.append(''.join(chr(c) for c in sample_a if c < 0x10000))
+            lines.append("")
+
+        if only_b:
+            lines.append("─── B 独有的字符 (前100个) ───")
+            sample_b = only_b.codes()[:100].tolist()
+            lines.append(''.join(chr(c) for c in sample_b if c < 0x10000))
+
+        log_signal(f"🔍 对比完成: A独有 {len(only_a)}, B独有 {len(only_b)}, 共有 {len(common)}")
+        prog_signal(100)
+        return {'text': "\n".join(lines), 'only_a': only_a, 'only_b': only_b, 'common': common}
+
+    except Exception as e:
+        log_signal(f"❌ 对比失败: 无法对比字体: {e}")
+        return None
+
+
+def checkup(conf, log_signal, prog_signal, cancel_token):
+    """返回 {'checked': 需要检查的可见字符数, 'missing': 按码位排序的缺失字符列表}。"""
+    txt_dir = conf.get('txt_dir', '')
+    exts = conf.get('exts', '.txt;.json')
+    font_path = conf['font_path']
+    json_path = conf.get('json_path', '')
+
+    log_signal("🩺 <b>开始体检...</b>")
+
+    all_chars = Charset()
+
+    if txt_dir and os.path.exists(txt_dir):
+        all_files = find_files(txt_dir, exts)
+        log_signal(f"   扫描文本目录: {len(all_files)} 个文件")
+        all_chars |= scan_files(all_files, log_signal, prog_signal, prog_range=(0, 70), use_index=True,
+                                root=txt_dir, cancel_token=cancel_token)
+    else:
+        log_signal("   ⚠️ 文本目录不存在，跳过")
+
+    if json_path and os.path.exists(json_path):
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+                all_chars.update(data.keys())
+                all_chars.update(data.values())
+                log_signal(f"   读取映射表: {len(data)} 条映射")
+        except Exception as e:
+            log_signal(f"   ⚠️ 映射表读取失败: {e}")
+    else:
+        log_signal("   ⚠️ 映射表不存在，跳过")
+
+    try:
+        font_chars = font_cache.get_charset(font_path)
+        log_signal(f"   字体包含 {len(font_chars)} 个字符")
+    except Exception as e:
+        log_signal(f"❌ 字体读取失败: 无法读取字体: {e}")
+        return None
+
+    text_chars = all_chars.select(lambda c: c.isprintable() and not c.isspace())
+    missing = text_chars - font_chars
+
+    log_signal(f"   需要检查的可见字符: {len(text_chars)}")
+    log_signal(f"   缺失字符: <b style='color:#F44336'>{len(missing)}</b>")
+    prog_signal(100)
+    return {'checked': len(text_chars), 'missing': list(missing)}
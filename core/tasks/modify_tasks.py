@@ -1,13 +1,17 @@
 import os
+import tempfile
 import traceback
 from fontTools.ttLib import TTFont
-from core.utils import ensure_ttf
+from fontTools import subset
+from core.utils import open_ttf
+from core.outline_convert import convert_cff_to_glyf
+from core.glyph_transform import transform_glyphs
+from core.sfnt_edit import mark_dirty, save_font
 from core.history_manager import get_history_manager
+from core.error_handler import TaskCancelled
 
 
-def tweak_font_width(conf, log_signal, prog_signal):
-    from fontTools.ttLib.tables._g_l_y_f import GlyphCoordinates
-    
+def tweak_font_width(conf, log_signal, prog_signal, cancel_token):
     src = conf['src']
     scale = conf['scale']
     dx = conf['dx']
@@ -27,58 +31,15 @@ def tweak_font_width(conf, log_signal, prog_signal):
     prog_signal(5)
 
     try:
-        font = TTFont(src)
-        ensure_ttf(font, log_signal, "目标字体")
+        font = open_ttf(src, log_signal, "目标字体")
         
         if 'glyf' not in font or 'hmtx' not in font:
             log_signal("❌ 字体格式异常，未找到glyf或hmtx表")
             return None
 
-        glyf = font['glyf']
-        hmtx = font['hmtx']
-        metrics = hmtx.metrics
-        glyph_order = font.getGlyphOrder()
-        
-        total = len(glyph_order)
-        processed = 0
-
         log_signal("🔨 正在重塑字形...")
-
-        scale_t = (scale, 1.0)
-
-        for name in glyph_order:
-            if name in glyf:
-                g = glyf[name]
-                modified = False
-                
-                if g.isComposite():
-                    for comp in g.components:
-                        comp.x = int(comp.x * scale)
-                    modified = True
-                elif g.numberOfContours > 0:
-                    if hasattr(g, 'coordinates'):
-                        g.coordinates.scale(scale_t)
-                        g.coordinates.toInt()
-                        modified = True
-                
-                if modified:
-                    if hasattr(g, 'xMin'): g.xMin = int(g.xMin * scale)
-                    if hasattr(g, 'xMax'): g.xMax = int(g.xMax * scale)
-
-            if name in metrics:
-                old_w, old_lsb = metrics[name]
-                new_w = int(old_w * scale) + dx
-                new_lsb = int(old_lsb * scale)
-                metrics[name] = (max(0, new_w), new_lsb)
-
-            processed += 1
-            if processed % 2000 == 0:
-                prog_signal(5 + int(90 * processed / total))
-
-        log_signal("🔄 修正全局 Head 表...")
-        head = font['head']
-        head.xMin = int(head.xMin * scale)
-        head.xMax = int(head.xMax * scale)
+        transform_glyphs(font, sx=scale, sy=1.0, spacing=dx,
+                         prog_signal=prog_signal, prog_range=(5, 95), cancel_token=cancel_token)
 
         prog_signal(95)
         log_signal("💾 正在保存...")
@@ -89,7 +50,9 @@ def tweak_font_width(conf, log_signal, prog_signal):
                     s = record.toUnicode()
                     record.string = (s + " Condensed").encode('utf-16-be')
                 except: pass
+        mark_dirty(font, 'name')
 
+        cancel_token.check()
         save_path = os.path.join(os.path.dirname(src), out_name)
         
         history = get_history_manager()
@@ -97,7 +60,7 @@ def tweak_font_width(conf, log_signal, prog_signal):
         if file_existed:
             history.record_before_overwrite("调整字宽", save_path, f"缩放{scale:.2f} 间距{dx:+}")
         
-        font.save(save_path)
+        save_font(font, save_path)
         if not file_existed and os.path.exists(save_path):
             history.record_new_file("调整字宽", save_path, f"缩放{scale:.2f} 间距{dx:+}")
         elif os.path.exists(save_path):
@@ -108,13 +71,15 @@ def tweak_font_width(conf, log_signal, prog_signal):
         log_signal(f"   已输出: {out_name}")
         return save_path
 
+    except TaskCancelled:
+        raise
     except Exception as e:
         log_signal(f"❌ 调整失败: {e}")
         traceback.print_exc()
         return None
 
 
-def clean_font_tables(conf, log_signal, prog_signal):
+def clean_font_tables(conf, log_signal, prog_signal, cancel_token):
     src = conf['src']
     out_path = conf['out_path']
     tables_to_remove = conf['tables'] 
@@ -129,8 +94,7 @@ def clean_font_tables(conf, log_signal, prog_signal):
     prog_signal(10)
 
     try:
-        font = TTFont(src)
-        ensure_ttf(font, log_signal, "源字体") 
+        font = open_ttf(src, log_signal, "源字体")
         
         removed_count = 0
         for tag in tables_to_remove:
@@ -148,15 +112,17 @@ def clean_font_tables(conf, log_signal, prog_signal):
                 keep_ids = [1, 2, 3, 4, 5, 6]
                 new_names = [r for r in names if r.nameID in keep_ids]
                 font['name'].names = new_names
+                mark_dirty(font, 'name')
                 log_signal("   - 已精简 Name 表 (仅保留基本信息)")
 
         if 'HINTING' in tables_to_remove:
             for hint_tag in ['fpgm', 'prep', 'cvt ', 'hdmx', 'VDMX', 'LTSH']:
-                if hint_tag.strip() in font:
-                    del font[hint_tag.strip()]
+                if hint_tag in font:
+                    del font[hint_tag]
                     log_signal(f"   - 已移除提示表: {hint_tag}")
         
         prog_signal(80)
+        cancel_token.check()
         log_signal("💾 正在保存...")
         
         history = get_history_manager()
@@ -164,7 +130,7 @@ def clean_font_tables(conf, log_signal, prog_signal):
         if file_existed:
             history.record_before_overwrite("清理字体表", out_path, f"移除{removed_count}个表")
         
-        font.save(out_path)
+        save_font(font, out_path)
         if not file_existed and os.path.exists(out_path):
             history.record_new_file("清理字体表", out_path, f"移除{removed_count}个表")
         elif os.path.exists(out_path):
@@ -175,15 +141,15 @@ def clean_font_tables(conf, log_signal, prog_signal):
         log_signal(f"   输出: {out_path}")
         return out_path
 
+    except TaskCancelled:
+        raise
     except Exception as e:
         log_signal(f"❌ 清理失败: {e}")
         traceback.print_exc()
         return None
 
 
-def gen_unified_fix(conf, log_signal, prog_signal):
-    from fontTools.ttLib.tables._g_l_y_f import GlyphCoordinates
-    
+def gen_unified_fix(conf, log_signal, prog_signal, cancel_token):
     src = conf['src']
     out_path = conf['out_path']
     sx = conf['scale_x']
@@ -203,50 +169,14 @@ def gen_unified_fix(conf, log_signal, prog_signal):
     prog_signal(5)
 
     try:
-        font = TTFont(src)
-        ensure_ttf(font, log_signal, "目标字体")
-        
-        glyf = font['glyf']
-        hmtx = font['hmtx']
-        metrics = hmtx.metrics
-        scale_t = (sx, sy) 
+        font = open_ttf(src, log_signal, "目标字体")
         
-        log_signal("🔨 正在重塑字形结构...")
-        
-        glyph_order = font.getGlyphOrder()
-        total_g = len(glyph_order)
-        
-        for idx, name in enumerate(glyph_order):
-            if name in glyf:
-                g = glyf[name]
-                if g.isComposite():
-                    for comp in g.components:
-                        comp.x = int(comp.x * sx)
-                        comp.y = int(comp.y * sy)
-                elif g.numberOfContours > 0:
-                    if hasattr(g, 'coordinates'):
-                        g.coordinates.scale(scale_t)
-                        g.coordinates.toInt()
-                
-                if hasattr(g, 'xMin'): g.xMin = int(g.xMin * sx)
-                if hasattr(g, 'yMin'): g.yMin = int(g.yMin * sy)
-                if hasattr(g, 'xMax'): g.xMax = int(g.xMax * sx)
-                if hasattr(g, 'yMax'): g.yMax = int(g.yMax * sy)
-
-            if name in metrics:
-                old_w, old_lsb = metrics[name]
-                new_w = int(old_w * sx) + spacing
-                new_lsb = int(old_lsb * sx)
-                metrics[name] = (max(0, new_w), new_lsb)
-            
-            if idx % 1000 == 0:
-                prog_signal(5 + int(50 * idx / total_g))
-
-        head = font['head']
-        head.xMin = int(head.xMin * sx)
-        head.yMin = int(head.yMin * sy)
-        head.xMax = int(head.xMax * sx)
-        head.yMax = int(head.yMax * sy)
+        if sx == 1.0 and sy == 1.0 and spacing == 0:
+            log_signal("⏩ 未设置变形，仅改写度量表...")
+        else:
+            log_signal("🔨 正在重塑字形结构...")
+            transform_glyphs(font, sx=sx, sy=sy, spacing=spacing,
+                             prog_signal=prog_signal, prog_range=(5, 55), cancel_token=cancel_token)
 
         prog_signal(60)
 
@@ -262,16 +192,18 @@ def gen_unified_fix(conf, log_signal, prog_signal):
             font['OS/2'].sTypoLineGap = gap
             font['OS/2'].usWinAscent = asc
             font['OS/2'].usWinDescent = abs(desc)
+        mark_dirty(font, 'hhea', 'OS/2')
 
         for tag in ['EBDT', 'EBLC', 'EBSC', 'CBDT', 'CBLC', 'VDMX', 'hdmx']:
             if tag in font: del font[tag]
 
+        cancel_token.check()
         history = get_history_manager()
         file_existed = os.path.exists(out_path)
         if file_existed:
             history.record_before_overwrite("度量修复", out_path, f"Asc{asc} Desc{desc}")
         
-        font.save(out_path)
+        save_font(font, out_path)
         if not file_existed and os.path.exists(out_path):
             history.record_new_file("度量修复", out_path, f"Asc{asc} Desc{desc}")
         elif os.path.exists(out_path):
@@ -281,7 +213,331 @@ def gen_unified_fix(conf, log_signal, prog_signal):
         log_signal(f"✅ <b>处理完成!</b> 已输出: {os.path.basename(out_path)}")
         return out_path
 
+    except TaskCancelled:
+        raise
     except Exception as e:
         log_signal(f"❌ 修复失败: {e}")
         traceback.print_exc()
-        return None
\ No newline at end of file
+        return None
+
+def apply_font_metrics(conf, log_signal, prog_signal, cancel_token):
+    path = conf['path']
+    asc = conf['asc']
+    desc = conf['desc']
+    gap = conf['gap']
+
+    if not os.path.exists(path):
+        log_signal("❌ 目标字体不存在")
+        return None
+
+    try:
+        history = get_history_manager()
+        font = TTFont(path)
+
+        font['hhea'].ascent = asc
+        font['hhea'].descent = desc
+        font['hhea'].lineGap = gap
+
+        font['OS/2'].sTypoAscender = asc
+        font['OS/2'].sTypoDescender = desc
+        font['OS/2'].sTypoLineGap = gap
+        font['OS/2'].usWinAscent = asc
+        font['OS/2'].usWinDescent = abs(desc)
+
+        mark_dirty(font, 'hhea', 'OS/2')
+        prog_signal(40)
+
+        removed_bitmap = False
+        for tag in ['EBDT', 'EBLC', 'EBSC', 'CBDT', 'CBLC']:
+            if tag in font:
+                del font[tag]
+                removed_bitmap = True
+
+        if removed_bitmap:
+            log_signal("🧹 已清除内嵌点阵表 (防止渲染撕裂)")
+
+        cancel_token.check()
+        save_path = path.replace(".ttf", "_fix.ttf")
+        file_existed = os.path.exists(save_path)
+        if file_existed:
+            history.record_before_overwrite("应用度量", save_path, f"Asc{asc} Desc{desc}")
+
+        save_font(font, save_path)
+
+        if not file_existed and os.path.exists(save_path):
+            history.record_new_file("应用度量", save_path, f"Asc{asc} Desc{desc}")
+        elif os.path.exists(save_path):
+            history.record("应用度量", save_path, f"Asc{asc} Desc{desc}")
+
+        prog_signal(100)
+        log_signal(f"✅ <b>修复完成!</b><br>Asc: {asc}, Desc: {desc}, Gap: {gap}<br>已保存: {os.path.basename(save_path)}")
+        return save_path
+
+    except TaskCancelled:
+        raise
+    except Exception as e:
+        log_signal(f"❌ 应用失败: {e}")
+        traceback.print_exc()
+        return None
+
+
+def save_font_info(conf, log_signal, prog_signal, cancel_token):
+    """conf['rows'] 为 [(nameID, 新值)]，依次写入所有同 nameID 的 Windows 平台记录。"""
+    font_path = conf['path']
+    rows = conf['rows']
+
+    if not os.path.exists(font_path):
+        log_signal("❌ 字体文件不存在")
+        return None
+
+    try:
+        history = get_history_manager()
+        font = TTFont(font_path)
+        name_table = font['name']
+
+        updated_count = 0
+        for nid, new_string in rows:
+            for record in name_table.names:
+                if record.platformID == 3 and record.nameID == nid:
+                    try:
+                        old_str = record.toUnicode()
+                        if old_str != new_string:
+                            record.string = new_string.encode('utf-16-be')
+                            updated_count += 1
+                    except:
+                        pass
+        prog_signal(40)
+        cancel_token.check()
+
+        out_path = font_path.replace('.ttf', '_mod.ttf').replace('.otf', '_mod.otf')
+        file_existed = os.path.exists(out_path)
+
+        if file_existed:
+            history.record_before_overwrite("修改元数据", out_path, f"更新{updated_count}条")
+
+        mark_dirty(font, 'name')
+        save_font(font, out_path)
+
+        if not file_existed and os.path.exists(out_path):
+            history.record_new_file("修改元数据", out_path, f"更新{updated_count}条")
+        elif os.path.exists(out_path):
+            history.record("修改元数据", out_path, f"更新{updated_count}条")
+
+        prog_signal(100)
+        log_signal(f"💾 已保存修改！更新了相关记录。")
+        log_signal(f"   输出文件: {out_path}")
+        return out_path
+
+    except TaskCancelled:
+        raise
+    except Exception as e:
+        log_signal(f"❌ 保存失败: {e}")
+        traceback.print_exc()
+        return None
+
+
+def _scale_vertical_metrics(font, scale):
+    if 'hhea' in font:
+        hhea = font['hhea']
+        hhea.ascent = int(hhea.ascent * scale)
+        hhea.descent = int(hhea.descent * scale)
+        hhea.lineGap = int(hhea.lineGap * scale)
+
+    if 'OS/2' in font:
+        os2 = font['OS/2']
+        if hasattr(os2, 'sTypoAscender'): os2.sTypoAscender = int(os2.sTypoAscender * scale)
+        if hasattr(os2, 'sTypoDescender'): os2.sTypoDescender = int(os2.sTypoDescender * scale)
+        if hasattr(os2, 'sTypoLineGap'): os2.sTypoLineGap = int(os2.sTypoLineGap * scale)
+        if hasattr(os2, 'usWinAscent'): os2.usWinAscent = int(os2.usWinAscent * scale)
+        if hasattr(os2, 'usWinDescent'): os2.usWinDescent = int(os2.usWinDescent * scale)
+        if hasattr(os2, 'sxHeight') and os2.sxHeight: os2.sxHeight = int(os2.sxHeight * scale)
+        if hasattr(os2, 'sCapHeight') and os2.sCapHeight: os2.sCapHeight = int(os2.sCapHeight * scale)
+
+
+def merge_fonts(conf, log_signal, prog_signal, cancel_token):
+    base_path = conf['base']
+    add_path = conf['add']
+    out_path = conf['out_path']
+    filter_text = conf.get('filter', '')
+
+    if not os.path.exists(base_path):
+        log_signal("❌ 基础字体不存在")
+        return None
+    if not os.path.exists(add_path):
+        log_signal("❌ 来源字体不存在")
+        return None
+
+    temp_paths = []
+
+    def _temp_ttf():
+        fd, path = tempfile.mkstemp(suffix='.ttf')
+        os.close(fd)
+        temp_paths.append(path)
+        return path
+
+    try:
+        history = get_history_manager()
+        log_signal("🔗 <b>开始合并字体...</b>")
+
+        base_font = open_ttf(base_path, log_signal, "基础字体")
+        base_upm = base_font['head'].unitsPerEm
+        temp_base_path = _temp_ttf()
+        save_font(base_font, temp_base_path)
+        prog_signal(15)
+
+        add_font = open_ttf(add_path, log_signal, "来源字体")
+        add_upm = add_font['head'].unitsPerEm
+        log_signal(f"   基础 UPM: {base_upm}, 来源 UPM: {add_upm}")
+
+        if base_upm != add_upm:
+            log_signal(f"   ⚠️ UPM 不一致，正在缩放来源字体...")
+            scale = base_upm / add_upm
+            add_font['head'].unitsPerEm = base_upm
+            _scale_vertical_metrics(add_font, scale)
+            transform_glyphs(add_font, sx=scale, sy=scale, scale_head=False,
+                             prog_signal=prog_signal, prog_range=(15, 45), cancel_token=cancel_token)
+            mark_dirty(add_font, 'head', 'hhea', 'OS/2')
+            log_signal("   ✓ UPM 转换完成")
+
+        temp_add_path = _temp_ttf()
+        save_font(add_font, temp_add_path)
+        prog_signal(50)
+
+        if filter_text:
+            log_signal(f"✂️ <b>正在提取指定字符...</b>")
+            log_signal(f"   目标字符: {filter_text}")
+            try:
+                tmp_font = TTFont(temp_add_path)
+                options = subset.Options()
+                options.name_IDs = []
+                options.drop_tables = []
+                options.recalc_bounds = True
+                options.notdef_glyph = False
+
+                subsetter = subset.Subsetter(options=options)
+                subsetter.populate(text=filter_text)
+                subsetter.subset(tmp_font)
+
+                subset_path = _temp_ttf()
+                tmp_font.save(subset_path)
+                tmp_font.close()
+
+                temp_add_path = subset_path
+                log_signal("   ✓ 已生成仅包含指定字符的子集")
+            except Exception as e:
+                log_signal(f"   ⚠️ 提取字符失败: {e}，将尝试合并全部...")
+        prog_signal(60)
+        cancel_token.check()
+
+        log_signal("   正在执行合并...")
+
+        file_existed = os.path.exists(out_path)
+        if file_existed:
+            history.record_before_overwrite("合并字体", out_path, "覆盖")
+
+        from fontTools.merge import Merger
+        merger = Merger()
+        merged_font = merger.merge([temp_base_path, temp_add_path])
+        prog_signal(85)
+        cancel_token.check()
+        save_font(merged_font, out_path)
+
+        if not os.path.exists(out_path):
+            return None
+        if file_existed:
+            history.record("合并字体", out_path, "合并完成")
+        else:
+            history.record_new_file("合并字体", out_path, "合并完成")
+
+        prog_signal(100)
+        log_signal(f"✅ <b>合并完成!</b>")
+        log_signal(f"   输出: {out_path}")
+        return out_path
+
+    except TaskCancelled:
+        raise
+    except Exception as e:
+        log_signal(f"❌ 合并失败: {e}")
+        traceback.print_exc()
+        return None
+
+    finally:
+        for path in temp_paths:
+            if os.path.exists(path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def convert_format(conf, log_signal, prog_signal, cancel_token):
+    src_path = conf['src']
+    out_path = conf['out_path']
+
+    src_ext = os.path.splitext(src_path)[1].lower()
+    out_ext = os.path.splitext(out_path)[1].lower()
+
+    if not os.path.exists(src_path):
+        log_signal("❌ 源字体不存在")
+        return None
+    if src_ext not in ['.ttf', '.otf'] or out_ext not in ['.ttf', '.otf']:
+        log_signal("❌ 仅支持 TTF 和 OTF 格式互转")
+        return None
+
+    try:
+        history = get_history_manager()
+
+        log_signal("🔄 <b>开始格式转换...</b>")
+        log_signal(f"   源文件: {os.path.basename(src_path)} ({src_ext.upper()})")
+        log_signal(f"   目标: {os.path.basename(out_path)} ({out_ext.upper()})")
+
+        font = TTFont(src_path)
+
+        if src_ext == '.otf' and out_ext == '.ttf':
+            if 'CFF ' in font:
+                log_signal("   ⚠️ CFF 轮廓字体，正在转换为 TrueType 轮廓...")
+                try:
+                    glyph_count = len(font.getGlyphOrder())
+                    failed_glyphs = convert_cff_to_glyf(font, prog_signal=prog_signal, prog_range=(5, 85),
+                                                        cancel_token=cancel_token)
+
+                    if failed_glyphs:
+                        log_signal(f"   ⚠️ {len(failed_glyphs)} 个字形转换失败: {', '.join(failed_glyphs[:5])}{'...' if len(failed_glyphs) > 5 else ''}")
+
+                    log_signal(f"   ✓ 轮廓转换完成 ({glyph_count - len(failed_glyphs)}/{glyph_count} 成功)")
+
+                except TaskCancelled:
+                    font.close()
+                    raise
+                except Exception as conv_err:
+                    log_signal(f"   ❌ 轮廓转换失败: {conv_err}")
+                    traceback.print_exc()
+                    font.close()
+                    return None
+
+        elif src_ext == '.ttf' and out_ext == '.otf':
+            log_signal("   TTF -> OTF: 保持 TrueType 轮廓 (仅改变容器格式)")
+
+        cancel_token.check()
+        file_existed = os.path.exists(out_path)
+        if file_existed:
+            history.record_before_overwrite("格式转换", out_path, f"{src_ext} -> {out_ext}")
+
+        save_font(font, out_path)
+
+        if not file_existed and os.path.exists(out_path):
+            history.record_new_file("格式转换", out_path, f"{src_ext} -> {out_ext}")
+        elif os.path.exists(out_path):
+            history.record("格式转换", out_path, f"{src_ext} -> {out_ext}")
+
+        prog_signal(100)
+        log_signal(f"✅ <b>转换完成!</b>")
+        log_signal(f"   输出: {out_path}")
+        return out_path
+
+    except TaskCancelled:
+        raise
+    except Exception as e:
+        log_signal(f"❌ 转换失败: {e}")
+        traceback.print_exc()
+        return None
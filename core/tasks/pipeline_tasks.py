@@ -0,0 +1,15 @@
+from core.pipeline import Step, Pipeline
+
+
+def pipeline_steps(conf):
+    return [Step(s['name'], s['task'], s['conf'], s.get('title'), s.get('keep', False)) for s in conf['steps']]
+
+
+def run_pipeline(conf, log_signal, prog_signal, cancel_token):
+    if not conf.get('steps'):
+        log_signal("⚠️ 工作流中没有任何步骤。")
+        return None
+
+    pipeline = Pipeline(pipeline_steps(conf))
+    log_signal(f"🚀 <b>开始执行工作流</b> (共 {len(pipeline.steps)} 步)")
+    return pipeline.run(log_signal, prog_signal, cancel_token, force=conf.get('force', False))
@@ -2,15 +2,97 @@ import os
 import glob
 import json
 import unicodedata
-from fontTools.ttLib import TTFont
+from datetime import datetime
+from core.text_scanner import find_files, scan_files, indexed_files
+from core.text_rewrite import rewrite_files
+from core.font_cache import get_charset
+from core.coverage_index import load_coverage
+from core.charset import Charset
+from core.set_cover import plan_cover
+from core.proxy_alloc import allocate_proxies
+from core import codepage_index
+from core.utils import write_if_changed
+from core import artifacts
+
+
+def _load_previous_mapping(path, log_signal):
+    if not os.path.exists(path):
+        log_signal("   ℹ️ 未找到上次的映射表，本次按全量分配。")
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            mapping = json.load(f)
+        if not isinstance(mapping, dict):
+            raise ValueError("格式不正确")
+    except Exception as e:
+        log_signal(f"⚠️ 读取上次的映射表失败: {e}，本次按全量分配。")
+        return None
+    return {k: v for k, v in mapping.items()
+            if isinstance(k, str) and isinstance(v, str) and len(k) == 1 and len(v) == 1}
+
+
+def _source_digests(pairs, src_dir):
+    """{相对路径: 源文件内容摘要} (取自字符索引)，记进变更清单，供下次增量判断源文件是否改过。"""
+    entries = indexed_files([src for src, _ in pairs], parse_json=True)
+    return {os.path.relpath(src, src_dir).replace(os.sep, '/'): entries[src][0] for src, _ in pairs if src in entries}
+
+
+def _stale_pairs(pairs, src_dir, affected, sources):
+    """增量模式下需要重写的文件：输出不存在、源文件内容与上次输出时记录的摘要不同、字符索引中没有记录，
+    或者含有分配发生变化的字符。sources 为上次变更清单里的 {相对路径: 摘要}。"""
+    entries = indexed_files([src for src, _ in pairs], parse_json=True)
+    stale = []
+    for src, dst in pairs:
+        entry = entries.get(src)
+        rel = os.path.relpath(src, src_dir).replace(os.sep, '/')
+        if (entry is None or not os.path.exists(dst) or sources.get(rel) != entry[0]
+                or not affected.isdisjoint(entry[1])):
+            stale.append((src, dst))
+    return stale
+
+
+def _load_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        return manifest if isinstance(manifest, dict) else None
+    except (OSError, ValueError):
+        return None
+
 
+def _save_mapping(out_json, mapping_dict):
+    """写出映射表 JSON，返回内容是否有变化。"""
+    # 与文本模式写出的内容一致 (换行随系统)
+    data = json.dumps(mapping_dict, ensure_ascii=False, indent=2).replace('\n', os.linesep)
+    return write_if_changed(out_json, data.encode('utf-8'))
 
-def gen_mapping(conf, log_signal, prog_signal):
+
+def _previous_table_digest(out_json, last_run):
+    """上次输出的映射表摘要：优先取上次变更清单里的记录，其次是磁盘上的映射表；都没有时返回 None。"""
+    if last_run is not None and isinstance(last_run.get('table'), str):
+        return last_run['table']
+    try:
+        with open(out_json, 'r', encoding='utf-8') as f:
+            return artifacts.mapping_digest(json.load(f))
+    except (OSError, ValueError):
+        return None
+
+
+def manifest_path(conf):
+    """变更清单的路径，默认放在映射表旁边 (不放进输出目录，以免被一起打包)。"""
+    if conf.get('manifest'):
+        return conf['manifest']
+    return os.path.splitext(conf['out_json'])[0] + "_changes.json" if conf.get('out_json') else ""
+
+
+def gen_mapping(conf, log_signal, prog_signal, cancel_token):
     src_dir = conf['src_dir']
     out_dir = conf['out_dir']
     out_json = conf['out_json']
-    exts = conf['exts'].split(';')
+    exts = conf['exts']
     limit_font_path = conf.get('limit_font', '')
+    incremental = conf.get('incremental', False)
+    page = codepage_index.load(conf.get('codepage', 'cp932'))
 
     if not os.path.exists(src_dir):
         log_signal("❌ 输入目录不存在！")
@@ -19,47 +101,17 @@ def gen_mapping(conf, log_signal, prog_signal):
     log_signal(f"🔍 开始扫描文本: {src_dir}")
     prog_signal(5)
 
-    all_files = []
-    for ext in exts:
-        ext = ext.strip()
-        if not ext: continue
-        if not ext.startswith('.'): ext = '.' + ext
-        all_files.extend(glob.glob(os.path.join(src_dir, '**', f'*{ext}'), recursive=True))
+    all_files = find_files(src_dir, exts)
 
     if not all_files:
         log_signal("⚠️ 未找到任何匹配的文件。")
         return None
 
-    unique_chars = set()
     total_files = len(all_files)
-
-    def extract_chars_from_obj(obj, char_set):
-        if isinstance(obj, str):
-            for char in obj:
-                char_set.add(char)
-        elif isinstance(obj, list):
-            for item in obj:
-                extract_chars_from_obj(item, char_set)
-        elif isinstance(obj, dict):
-            for value in obj.values():
-                extract_chars_from_obj(value, char_set)
-
-    for idx, fpath in enumerate(all_files):
-        try:
-            if fpath.lower().endswith('.json'):
-                with open(fpath, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    extract_chars_from_obj(data, unique_chars)
-            else:
-                with open(fpath, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    for char in content:
-                        unique_chars.add(char)
-        except Exception as e:
-            log_signal(f"⚠️ 读取失败 {os.path.basename(fpath)}: {e}")
-        
-        if idx % 10 == 0:
-            prog_signal(5 + int(15 * idx / total_files))
+    log_signal(f"   共 {total_files} 个文件，正在并行读取...")
+    unique_chars = scan_files(all_files, log_signal, prog_signal, prog_range=(5, 20),
+                              parse_json=True, report_errors=True,
+                              use_index=conf.get('use_index', True), root=src_dir, cancel_token=cancel_token)
 
     log_signal(f"📊 扫描完成，共发现 {len(unique_chars)} 个唯一字符。")
     prog_signal(20)
@@ -67,10 +119,7 @@ def gen_mapping(conf, log_signal, prog_signal):
     limit_font_chars = None
     if limit_font_path and os.path.exists(limit_font_path):
         try:
-            tmp_font = TTFont(limit_font_path)
-            tmp_cmap = tmp_font.getBestCmap()
-            limit_font_chars = set(chr(c) for c in tmp_cmap.keys())
-            tmp_font.close()
+            limit_font_chars = get_charset(limit_font_path)
         except:
             pass
 
@@ -87,16 +136,9 @@ def gen_mapping(conf, log_signal, prog_signal):
             chars_safe += 1
             continue
 
-        is_cp932 = False
-        try:
-            char.encode('cp932')
-            is_cp932 = True
-        except UnicodeEncodeError:
-            is_cp932 = False
-
         should_map = False
         
-        if not is_cp932:
+        if char not in page.encodable:
             should_map = True
         elif limit_font_chars is not None and char not in limit_font_chars:
             should_map = True
@@ -107,11 +149,11 @@ def gen_mapping(conf, log_signal, prog_signal):
             chars_safe += 1
 
     chars_to_map.sort()
-    log_signal(f"   -> 原生 CP932 且存在: {chars_safe} (保持不变)")
-    log_signal(f"   -> 需映射字符: {len(chars_to_map)} (含非CP932或缺失字符)")
+    log_signal(f"   -> 原生 {page.label} 且存在: {chars_safe} (保持不变)")
+    log_signal(f"   -> 需映射字符: {len(chars_to_map)} (含非{page.label}或缺失字符)")
 
     if len(chars_to_map) == 0:
-        log_signal("✅ 所有字符均支持 CP932 且存在于字体中，无需映射！")
+        log_signal(f"✅ 所有字符均支持 {page.label} 且存在于字体中，无需映射！")
         prog_signal(100)
         return None
 
@@ -120,21 +162,8 @@ def gen_mapping(conf, log_signal, prog_signal):
     if limit_font_path and os.path.exists(limit_font_path):
         log_signal(f"🔒 <b>启用字体限制模式</b>: {os.path.basename(limit_font_path)}")
         try:
-            font = TTFont(limit_font_path)
-            cmap = font.getBestCmap()
-            font_chars = set(chr(c) for c in cmap.keys())
-            font.close()
-            
-            for char in font_chars:
-                if char in unique_chars: continue
-                if char in ['\n', '\r', '\t']: continue
-                
-                try:
-                    b = char.encode('cp932')
-                    if len(b) == 2:
-                        available_proxies.append(char)
-                except UnicodeEncodeError:
-                    pass
+            font_chars = get_charset(limit_font_path)
+            available_proxies = list((font_chars - unique_chars) & page.double_byte)
             
             log_signal(f"   可用空位(Slot): {len(available_proxies)} 个")
 
@@ -143,112 +172,101 @@ def gen_mapping(conf, log_signal, prog_signal):
             limit_font_path = None
 
     if not limit_font_path:
-        log_signal("🌍 使用标准全量 CP932 空间")
-        def sjis_generator():
-            ranges = [(0x89, 0x9F), (0xE0, 0xEA)]
-            for h in range(ranges[0][0], ranges[0][1] + 1):
-                for l in list(range(0x40, 0x7F)) + list(range(0x80, 0xFD)):
-                    yield bytes([h, l])
-            for h in range(ranges[1][0], ranges[1][1] + 1):
-                for l in list(range(0x40, 0x7F)) + list(range(0x80, 0xFD)):
-                    yield bytes([h, l])
-
-        for proxy_bytes in sjis_generator():
-            try:
-                proxy_char = proxy_bytes.decode('cp932')
-                category = unicodedata.category(proxy_char)
-                if proxy_char not in unique_chars and not (category.startswith('C') or category.startswith('Z')):
-                    available_proxies.append(proxy_char)
-            except UnicodeDecodeError:
-                continue
-
-    if len(available_proxies) < len(chars_to_map):
+        log_signal(f"🌍 使用标准全量 {page.label} 空间")
+        available_proxies = page.proxies(exclude=unique_chars)
+
+    manifest = manifest_path(conf)
+    last_run = _load_manifest(manifest) if manifest else None
+    previous = _load_previous_mapping(out_json, log_signal) if incremental else None
+    if previous is not None and last_run is not None and last_run.get('table') != artifacts.mapping_digest(previous):
+        # 映射表被手动改过或换成了别处的文件：输出目录是按另一张表生成的，两边都不可信
+        log_signal(f"⚠️ {os.path.basename(out_json)} 与上次输出时记录的映射表不一致 (可能被修改或替换过)，"
+                   f"不沿用其中的分配，本次按全量重新分配并覆盖该文件")
+        previous = None
+    mapping_dict, changed, stats = allocate_proxies(chars_to_map, available_proxies, previous,
+                                                    conf.get('recycle', False), unique_chars)
+    if mapping_dict is None:
         log_signal(f"❌ <font color='red'><b>致命错误：可用空位不足！</b></font>")
-        log_signal(f"   需要映射: {len(chars_to_map)} 个 | 实际可用: {len(available_proxies)} 个")
+        log_signal(f"   需要映射: {len(chars_to_map)} 个 | 实际可用: {len(chars_to_map) - stats['missing']} 个")
+        if stats['retained']:
+            log_signal(f"   上次码表中有 {stats['retained']} 个已不再使用的字符仍占着空位，可启用空位回收。")
         return None
 
-    mapping_dict = {}
-    available_proxies.sort()
-    
-    for i, cn_char in enumerate(chars_to_map):
-        proxy_char = available_proxies[i]
-        mapping_dict[cn_char] = proxy_char
+    if previous is not None:
+        log_signal(f"♻️ <b>增量分配</b>: 沿用 {stats['kept']} 个，新增 {stats['added']} 个，"
+                   f"重新分配 {stats['moved']} 个")
+        if stats['retained'] or stats['recycled'] or stats['dropped']:
+            log_signal(f"   未使用字符: 保留 {stats['retained']} 个，回收 {stats['recycled']} 个，"
+                       f"移出 {stats['dropped']} 个")
 
     prog_signal(40)
 
-    try:
-        with open(out_json, 'w', encoding='utf-8') as f:
-            json.dump(mapping_dict, f, ensure_ascii=False, indent=2)
-        log_signal(f"💾 映射表已保存: {out_json}")
-    except Exception as e:
-        log_signal(f"❌ JSON 保存失败: {e}")
-        return None
-
+    cancel_token.check()
     prog_signal(50)
     log_signal("📝 正在替换并输出文本文件...")
     if not os.path.exists(out_dir): os.makedirs(out_dir)
 
-    def recursive_replace(obj, mapper):
-        if isinstance(obj, str):
-            return "".join([mapper.get(c, c) for c in obj])
-        elif isinstance(obj, list):
-            return [recursive_replace(i, mapper) for i in obj]
-        elif isinstance(obj, dict):
-            return {k: recursive_replace(v, mapper) for k, v in obj.items()}
+    all_pairs = [(fpath, os.path.join(out_dir, os.path.relpath(fpath, src_dir))) for fpath in all_files]
+    pairs = all_pairs
+    if previous is not None:
+        # 上次完整输出时记下的映射表与磁盘上的一致 (上面已核对)，才能相信输出目录里的旧文件
+        if last_run is not None:
+            sources = last_run.get('sources')
+            pairs = _stale_pairs(all_pairs, src_dir, {c for c in changed if c in unique_chars},
+                                 sources if isinstance(sources, dict) else {})
+            log_signal(f"   ♻️ 增量模式: {len(pairs)}/{total_files} 个文件需要重写，其余保持不变")
         else:
-            return obj
-
-    processed_count = 0
-    for idx, fpath in enumerate(all_files):
+            log_signal("   ⚠️ 没有上次的变更清单 (可能中途取消或失败过)，本次全部重写")
+    if manifest and os.path.exists(manifest):
+        # 重写中途取消或失败时不留下旧清单，下次增量会改为全部重写
+        os.remove(manifest)
+    processed_count, changed_files = rewrite_files(pairs, mapping_dict, log_signal, prog_signal,
+                                                   prog_range=(50, 100), cancel_token=cancel_token)
+
+    # 映射表在文本全部写完后才落盘，保证磁盘上的映射表总是与输出目录一致
+    handoff = artifacts.is_handoff(out_json)
+    if handoff:
+        artifacts.put(out_json, mapping_dict)
+        log_signal(f"🧠 映射表保留在内存中，直接交给后续步骤")
+    if handoff and not incremental:
+        mapping_changed = _previous_table_digest(out_json, last_run) != artifacts.mapping_digest(mapping_dict)
+    else:
+        # 增量模式下次运行要从磁盘读回本次的映射表，所以工作流中交接的映射表也照样落盘
         try:
-            rel_path = os.path.relpath(fpath, src_dir)
-            target_path = os.path.join(out_dir, rel_path)
-            target_folder = os.path.dirname(target_path)
-
-            if not os.path.exists(target_folder):
-                os.makedirs(target_folder)
-
-            if fpath.lower().endswith('.json'):
-                try:
-                    with open(fpath, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                    
-                    new_data = recursive_replace(data, mapping_dict)
-                    
-                    with open(target_path, 'w', encoding='utf-8') as f:
-                        json.dump(new_data, f, ensure_ascii=False, indent=2)
-                except Exception as e:
-                    log_signal(f"⚠️ JSON解析失败 ({os.path.basename(fpath)})，尝试作为纯文本处理。")
-                    with open(fpath, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    new_content = "".join([mapping_dict.get(c, c) for c in content])
-                    with open(target_path, 'w', encoding='utf-8') as f:
-                        f.write(new_content)
+            mapping_changed = _save_mapping(out_json, mapping_dict)
+            if mapping_changed:
+                log_signal(f"💾 映射表已保存: {out_json}")
             else:
-                with open(fpath, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                new_content = "".join([mapping_dict.get(c, c) for c in content])
-                with open(target_path, 'w', encoding='utf-8') as f:
-                    f.write(new_content)
-
-            processed_count += 1
-
+                log_signal(f"💾 映射表未变化，保留原文件: {out_json}")
         except Exception as e:
-            log_signal(f"⚠️ 处理失败 {os.path.basename(fpath)}: {e}")
+            log_signal(f"❌ JSON 保存失败: {e}")
+            return None
 
-        if idx % 50 == 0:
-            prog_signal(50 + int(50 * idx / total_files))
+    changed_rel = sorted(os.path.relpath(p, out_dir).replace(os.sep, '/') for p in changed_files)
+    try:
+        data = json.dumps({'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                           'mapping_changed': mapping_changed, 'changed': changed_rel,
+                           'unchanged': total_files - len(changed_rel),
+                           'table': artifacts.mapping_digest(mapping_dict),
+                           'sources': _source_digests(all_pairs, src_dir)}, ensure_ascii=False, indent=2)
+        # 每次都重新写出 (带本次运行时间)，下游可以靠清单的修改时间判断是否有新的一轮输出
+        with open(manifest, 'w', encoding='utf-8') as f:
+            f.write(data)
+        log_signal(f"🧾 变更清单: {len(changed_rel)} 个文件有变化，{total_files - len(changed_rel)} 个未变 → {manifest}")
+    except Exception as e:
+        log_signal(f"⚠️ 变更清单保存失败: {e}")
 
     prog_signal(100)
     mode_str = f"字体限制 ({os.path.basename(limit_font_path)})" if limit_font_path else "全量"
-    log_signal(f"✅ 任务完成！ (模式: {mode_str})<br>已处理文件: {processed_count}<br>映射字符数: {len(mapping_dict)}<br>生成的 JSON 可直接用于字体处理。")
+    log_signal(f"✅ 任务完成！ (模式: {mode_str})<br>已处理文件: {processed_count} (内容有变化: {len(changed_files)})<br>映射字符数: {len(mapping_dict)}<br>生成的 JSON 可直接用于字体处理。")
     return out_json
 
 
-def smart_fallback_scan(conf, log_signal, prog_signal):
+def smart_fallback_scan(conf, log_signal, prog_signal, cancel_token):
     primary = conf['primary']
     fallback_dir = conf['fb_dir']
     txt_dir = conf['txt_dir']
+    font_costs = conf.get('font_costs') or None
     
     if not os.path.exists(primary):
         log_signal("❌ 主字体不存在")
@@ -260,27 +278,17 @@ def smart_fallback_scan(conf, log_signal, prog_signal):
     log_signal(f"🔍 <b>开始智能缺字分析...</b>")
     prog_signal(5)
 
-    needed_chars = set()
+    needed_chars = Charset()
     if os.path.exists(txt_dir):
-        files = glob.glob(os.path.join(txt_dir, '**', '*.txt'), recursive=True)
-        files += glob.glob(os.path.join(txt_dir, '**', '*.json'), recursive=True)
-        total_f = len(files)
-        for i, fpath in enumerate(files):
-            try:
-                with open(fpath, 'r', encoding='utf-8') as f:
-                    needed_chars.update(f.read())
-            except: pass
-            if i % 10 == 0: prog_signal(5 + int(10 * i / total_f))
+        files = find_files(txt_dir, '.txt;.json')
+        needed_chars = scan_files(files, log_signal, prog_signal, prog_range=(5, 15), cancel_token=cancel_token)
     
-    needed_chars = {c for c in needed_chars if c.isprintable() and not c.isspace()}
+    needed_chars = needed_chars.select(lambda c: c.isprintable() and not c.isspace())
     log_signal(f"📝 文本需求字符数: {len(needed_chars)}")
 
     try:
-        font = TTFont(primary)
-        cmap = font.getBestCmap()
-        existing_chars = set(chr(c) for c in cmap.keys())
+        existing_chars = get_charset(primary)
         missing_chars = needed_chars - existing_chars
-        font.close()
     except Exception as e:
         log_signal(f"❌ 主字体读取错误: {e}")
         return None
@@ -296,32 +304,23 @@ def smart_fallback_scan(conf, log_signal, prog_signal):
 
     fb_fonts = glob.glob(os.path.join(fallback_dir, "*.ttf")) + glob.glob(os.path.join(fallback_dir, "*.otf"))
     
+    coverage = load_coverage(fb_fonts, log_signal, prog_signal, prog_range=(20, 60), cancel_token=cancel_token)
+
     font_stats = []
-    
-    total_fb = len(fb_fonts)
-    for idx, fb_path in enumerate(fb_fonts):
-        fb_name = os.path.basename(fb_path)
-        try:
-            fb_font = TTFont(fb_path, fontNumber=0)
-            fb_cmap = fb_font.getBestCmap()
-            
-            covered_in_this = set()
-            for char in missing_chars:
-                if ord(char) in fb_cmap:
-                    covered_in_this.add(char)
-            
-            if covered_in_this:
-                font_stats.append({
-                    'name': fb_name,
-                    'covered': covered_in_this,
-                    'count': len(covered_in_this)
-                })
-            
-            fb_font.close()
-        except:
-            pass
-        
-        prog_signal(20 + int(40 * idx / total_fb))
+    candidates = {}
+    for fb_path in fb_fonts:
+        charset = coverage.get(fb_path)
+        if charset is None:
+            continue
+        hit = charset & missing_chars
+        count = len(hit)
+        if count:
+            name = os.path.basename(fb_path)
+            candidates.setdefault(name, hit)
+            font_stats.append({
+                'name': name,
+                'count': count
+            })
 
     font_stats.sort(key=lambda x: x['count'], reverse=True)
     
@@ -329,21 +328,24 @@ def smart_fallback_scan(conf, log_signal, prog_signal):
     for i, stats in enumerate(font_stats):
         log_signal(f"   #{i+1} {stats['name']} (覆盖 {stats['count']} 个缺字)")
 
+    cancel_token.check()
     log_signal("🚀 正在分配最佳来源...")
 
+    plan, info = plan_cover(missing_chars, candidates, font_costs)
+    if info['exact']:
+        state = "已证明最优" if info['optimal'] else "搜索达到上限，取当前最优"
+        log_signal(f"   🧮 集合覆盖: 贪心 {info['greedy']} 个字体 → 精确搜索 {len(plan)} 个 ({state})")
+    else:
+        log_signal(f"   🧮 集合覆盖: 贪心选出 {len(plan)} 个字体")
+
     final_map = {}
     unfound_chars = missing_chars.copy()
     
-    for stats in font_stats:
-        if not unfound_chars: break
-        
-        actually_contributed = stats['covered'] & unfound_chars
-        
-        if actually_contributed:
-            for char in actually_contributed:
-                final_map[char] = stats['name']
-            
-            unfound_chars -= actually_contributed
+    for name, assigned in plan:
+        log_signal(f"   📦 {name}: 负责 {len(assigned)} 个缺字")
+        for char in assigned:
+            final_map[char] = name
+        unfound_chars -= assigned
 
     prog_signal(100)
     
@@ -0,0 +1,276 @@
+import os
+import re
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+_READ_CHUNK = 1 << 20
+_MAX_BATCH = 64
+_BATCH_BYTES = 32 << 20
+_MIN_PARALLEL_BYTES = 16 << 20
+
+# 完整的字符串字面量；后面紧跟冒号的是键名
+_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"(\s*:)?', re.S)
+_ESCAPE = re.compile(r'\\u([dD][89abAB][0-9a-fA-F]{2})\\u([dD][c-fC-F][0-9a-fA-F]{2})'
+                     r'|\\u([0-9a-fA-F]{4})|\\(["\\/bfnrt])')
+_SIMPLE_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+_worker_table = None
+
+
+def compile_table(mapping):
+    """把映射表编译成 str.translate 的查找表。
+
+    全是单字符映射时用按码位索引的字符串，比 str.maketrans 生成的 dict 快数倍；码位超出表长的字符保持不变。"""
+    if mapping and all(len(k) == 1 and len(v) == 1 for k, v in mapping.items()):
+        table = [chr(i) for i in range(max(ord(k) for k in mapping) + 1)]
+        for k, v in mapping.items():
+            table[ord(k)] = v
+        return "".join(table)
+    return str.maketrans(mapping)
+
+
+def rewrite_text(src, dst, table):
+    """按块流式替换，内存占用与文件大小无关。"""
+    with open(src, 'r', encoding='utf-8') as fin, open(dst, 'w', encoding='utf-8') as fout:
+        while True:
+            block = fin.read(_READ_CHUNK)
+            if not block:
+                break
+            fout.write(block.translate(table))
+
+
+def _escape(text):
+    parts = []
+    for c in text:
+        code = ord(c)
+        if code > 0xFFFF:
+            code -= 0x10000
+            parts.append(f"\\u{0xD800 + (code >> 10):04x}\\u{0xDC00 + (code & 0x3FF):04x}")
+        else:
+            parts.append(f"\\u{code:04x}")
+    return "".join(parts)
+
+
+def _translate_escaped(text, table):
+    """字符串内容中含转义时逐段处理：转义表示的字符 (\\uXXXX 以及 \\n、\\" 等) 也参与替换，
+    没被替换的转义原样保留，被替换的以 \\uXXXX 形式写回。"""
+    parts, pos = [], 0
+    while True:
+        cut = text.find('\\', pos)
+        if cut < 0:
+            parts.append(text[pos:].translate(table))
+            return "".join(parts)
+        parts.append(text[pos:cut].translate(table))
+        m = _ESCAPE.match(text, cut)
+        if m is None:
+            raise ValueError("无效的转义")
+        if m.group(1) is not None:
+            high, low = int(m.group(1), 16), int(m.group(2), 16)
+            char = chr(0x10000 + ((high - 0xD800) << 10) + (low - 0xDC00))
+        elif m.group(3) is not None:
+            char = chr(int(m.group(3), 16))
+        else:
+            char = _SIMPLE_ESCAPES[m.group(4)]
+        mapped = char.translate(table)
+        parts.append(m.group() if mapped == char else _escape(mapped))
+        pos = m.end()
+
+
+def _rewrite_json_block(block, table, final):
+    """替换一块文本中完整的字符串值，返回 (输出, 留到下一块的尾部)。
+
+    块尾未闭合的字符串、以及后面只剩空白 (还看不到是否跟着冒号) 的字符串留给下一块。"""
+    keep_quotes = '"'.translate(table) == '"'
+    tail_start = len(block.rstrip())
+    state = {'end': 0, 'carry': None}
+
+    def replace(m):
+        state['end'] = m.end()
+        text = m.group()
+        if m.group(1) is not None:
+            return text
+        if not final and m.end() >= tail_start:
+            state['carry'] = m.start()
+            return ""
+        if '\\' in text:
+            return '"' + _translate_escaped(text[1:-1], table) + '"'
+        if keep_quotes:
+            return text.translate(table)
+        return '"' + text[1:-1].translate(table) + '"'
+
+    out = _STRING.sub(replace, block)
+    end, cut = state['end'], state['carry']
+    if cut is None:
+        # 最后一个完整字符串之后若还有引号，那是跨块 (或未闭合) 的字符串
+        cut = end = block.find('"', end)
+        if cut < 0:
+            return out, ""
+        if final:
+            raise ValueError("字符串未闭合")
+    # end 之后的文本未经替换，原样出现在 out 末尾
+    return out[:len(out) - (len(block) - end)], block[cut:]
+
+
+def rewrite_json(src, dst, table):
+    """只替换 JSON 字符串值中的字符，其余字节 (缩进、换行、键名、数字) 与源文件完全一致。
+
+    按块流式处理，不建对象树，内存占用只与最长的字符串字面量有关；
+    不做完整的语法校验，字符串未闭合或转义无效时抛出 ValueError。"""
+    with open(src, 'r', encoding='utf-8', newline='') as fin, \
+            open(dst, 'w', encoding='utf-8', newline='') as fout:
+        carry, size = "", _READ_CHUNK
+        while True:
+            block = fin.read(size)
+            text, carry = _rewrite_json_block(carry + block, table, not block)
+            fout.write(text)
+            if not block:
+                break
+            # 跨块的超长字符串：按其长度加大读取量，避免反复扫描
+            size = max(_READ_CHUNK, len(carry))
+
+
+def _digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(_READ_CHUNK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _replace_if_changed(tmp, dst):
+    """tmp 与已有的 dst 内容相同时丢弃 tmp，dst 保持原样 (修改时间不变)；返回 dst 是否被替换。"""
+    try:
+        same = os.path.getsize(tmp) == os.path.getsize(dst) and _digest(tmp) == _digest(dst)
+    except OSError:
+        same = False
+    if same:
+        os.remove(tmp)
+        return False
+    os.replace(tmp, dst)
+    return True
+
+
+def _rewrite_batch(pairs, table=None, cancel_token=None):
+    """返回 (已处理文件数, 成功数, [(路径, 警告类型, 错误信息)], [内容有变化的目标文件])；
+    在进程池中运行时用 _init_worker 编译好的查找表。
+
+    先写到同目录的临时文件，与已有的输出内容相同时不覆盖。"""
+    table = _worker_table if table is None else table
+    done = ok = 0
+    notes = []
+    changed = []
+    for src, dst in pairs:
+        if cancel_token is not None and cancel_token.cancelled:
+            break
+        done += 1
+        tmp = f"{dst}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            if src.lower().endswith('.json'):
+                try:
+                    rewrite_json(src, tmp, table)
+                except Exception as e:
+                    notes.append((src, 'json', str(e)))
+                    rewrite_text(src, tmp, table)
+            else:
+                rewrite_text(src, tmp, table)
+            if _replace_if_changed(tmp, dst):
+                changed.append(dst)
+            ok += 1
+        except Exception as e:
+            notes.append((src, 'error', str(e)))
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return done, ok, notes, changed
+
+
+def _init_worker(mapping):
+    global _worker_table
+    _worker_table = compile_table(mapping)
+
+
+def _worker_count(max_workers=None):
+    if max_workers:
+        return max_workers
+    return max(1, min(8, (os.cpu_count() or 1)))
+
+
+def _batches(pairs, sizes, batch_bytes):
+    batch, used = [], 0
+    for pair, size in zip(pairs, sizes):
+        if batch and (len(batch) >= _MAX_BATCH or used + size > batch_bytes):
+            yield batch
+            batch, used = [], 0
+        batch.append(pair)
+        used += size
+    if batch:
+        yield batch
+
+
+def rewrite_files(pairs, mapping, log_signal=None, prog_signal=None, prog_range=(0, 100),
+                  max_workers=None, cancel_token=None):
+    """用映射表替换 pairs [(源文件, 目标文件)] 中的字符并写出，返回 (成功处理的文件数, 内容有变化的目标文件列表)。
+
+    映射表编译成 str.translate 查找表，纯文本按块流式处理；文件总量较大时按批分给进程池并行。
+    输出与磁盘上已有的文件内容相同时不覆盖，保留其修改时间。"""
+    total = len(pairs)
+    if not total:
+        return 0, []
+
+    sizes = []
+    for src, _ in pairs:
+        try:
+            sizes.append(os.path.getsize(src))
+        except OSError:
+            sizes.append(0)
+    total_bytes = sum(sizes)
+    workers = _worker_count(max_workers)
+    prog_start, prog_end = prog_range
+
+    def report(notes):
+        if not log_signal:
+            return
+        for path, kind, e in notes:
+            if kind == 'json':
+                log_signal(f"⚠️ JSON解析失败 ({os.path.basename(path)})，尝试作为纯文本处理。")
+            else:
+                log_signal(f"⚠️ 处理失败 {os.path.basename(path)}: {e}")
+
+    processed = 0
+    done = 0
+    changed = []
+    if workers < 2 or total_bytes < _MIN_PARALLEL_BYTES:
+        table = compile_table(mapping)
+        for batch in _batches(pairs, sizes, _BATCH_BYTES):
+            count, ok, notes, batch_changed = _rewrite_batch(batch, table, cancel_token)
+            processed += ok
+            changed.extend(batch_changed)
+            done += count
+            report(notes)
+            if prog_signal:
+                prog_signal(prog_start + int((prog_end - prog_start) * done / total))
+            if cancel_token is not None:
+                cancel_token.check()
+        return processed, changed
+
+    batch_bytes = max(1 << 20, min(_BATCH_BYTES, total_bytes // (workers * 4)))
+    batches = list(_batches(pairs, sizes, batch_bytes))
+    ctx = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=min(workers, len(batches)), mp_context=ctx,
+                             initializer=_init_worker, initargs=(mapping,)) as pool:
+        futures = [pool.submit(_rewrite_batch, batch) for batch in batches]
+        for future in as_completed(futures):
+            if cancel_token is not None and cancel_token.cancelled:
+                for f in futures:
+                    f.cancel()
+                cancel_token.check()
+            count, ok, notes, batch_changed = future.result()
+            processed += ok
+            changed.extend(batch_changed)
+            done += count
+            report(notes)
+            if prog_signal:
+                prog_signal(prog_start + int((prog_end - prog_start) * done / total))
+    return processed, changed
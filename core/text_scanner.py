@@ -0,0 +1,277 @@
+import os
+import json
+import codecs
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from core.char_index import CharIndex
+from core.charset import Charset
+
+_READ_CHUNK = 1 << 20
+_MAX_BATCH = 64
+# 小于这个长度的文本块直接用 set 去重，更大的块才写进位图
+_SET_LIMIT = 1 << 16
+
+
+def normalize_exts(exts):
+    if isinstance(exts, str):
+        exts = exts.split(';')
+    result = []
+    for ext in exts:
+        ext = ext.strip().lower()
+        if not ext: continue
+        if not ext.startswith('.'): ext = '.' + ext
+        if ext not in result:
+            result.append(ext)
+    return tuple(result)
+
+
+def find_files(root, exts):
+    exts = normalize_exts(exts)
+    if not exts or not os.path.isdir(root):
+        return []
+
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+        for name in filenames:
+            if not name.startswith('.') and name.lower().endswith(exts):
+                files.append(os.path.join(dirpath, name))
+    files.sort()
+    return files
+
+
+def _collect_json_strings(obj, parts):
+    if isinstance(obj, str):
+        parts.append(obj)
+    elif isinstance(obj, list):
+        for item in obj:
+            _collect_json_strings(item, parts)
+    elif isinstance(obj, dict):
+        for value in obj.values():
+            _collect_json_strings(value, parts)
+
+
+def _iter_text(path, encoding, errors, parse_json, digest):
+    if parse_json and path.lower().endswith('.json'):
+        with open(path, 'rb') as f:
+            raw = f.read()
+        if digest is not None:
+            digest.update(raw)
+        parts = []
+        _collect_json_strings(json.loads(raw.decode(encoding, errors)), parts)
+        yield "".join(parts)
+        return
+
+    decoder = codecs.getincrementaldecoder(encoding)(errors)
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(_READ_CHUNK)
+            if not block: break
+            if digest is not None:
+                digest.update(block)
+            yield decoder.decode(block)
+    yield decoder.decode(b'', final=True)
+
+
+def read_chars(path, encoding='utf-8', errors='strict', parse_json=False, digest=None):
+    chars = Charset()
+    for text in _iter_text(path, encoding, errors, parse_json, digest):
+        chars.update(text)
+    return chars
+
+
+def _unique_chars(path, encoding, errors, parse_json, digest, scratch):
+    """读取一个文件，返回其中出现的字符 (按码位排序的字符串)。scratch 为批次内复用的位图，只有大块文本才会用到。"""
+    seen = set()
+    dense = False
+    for text in _iter_text(path, encoding, errors, parse_json, digest):
+        if len(text) < _SET_LIMIT:
+            seen.update(text)
+        else:
+            scratch.update(text)
+            dense = True
+    if not dense:
+        return "".join(sorted(seen))
+    scratch.update("".join(seen))
+    result = "".join(scratch)
+    scratch.clear()
+    return result
+
+
+def _raw_digest(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(_READ_CHUNK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _scan_batch(paths, encoding, errors, parse_json, stats, hints=None, cancel_token=None):
+    chars = Charset()
+    scratch = None
+    failed = []
+    records = []
+    done = 0
+    for path in paths:
+        if cancel_token is not None and cancel_token.cancelled:
+            break
+        done += 1
+        try:
+            if stats is None:
+                chars |= read_chars(path, encoding, errors, parse_json)
+                continue
+            hint = hints.get(path) if hints else None
+            if hint is not None and _raw_digest(path) == hint[0]:
+                # 只是修改时间变了，内容与索引记录一致：沿用记录的字符，只刷新修改时间
+                chars.update(hint[1])
+                st = stats.get(path)
+                if st is not None:
+                    records.append((path, st.st_size, st.st_mtime_ns, hint[0], hint[1]))
+                continue
+            if scratch is None:
+                scratch = Charset()
+            digest = hashlib.blake2b(digest_size=16)
+            # 索引记录只保存去重后的字符串，不为每个文件留一张 139 KB 的位图
+            file_chars = _unique_chars(path, encoding, errors, parse_json, digest, scratch)
+            chars.update(file_chars)
+            st = stats.get(path)
+            if st is not None:
+                records.append((path, st.st_size, st.st_mtime_ns, digest.hexdigest(), file_chars))
+        except Exception as e:
+            failed.append((path, e))
+    return chars, failed, done, records
+
+
+def _worker_count(max_workers=None):
+    if max_workers:
+        return max_workers
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+def _index_opts(encoding, errors, parse_json):
+    return f"{encoding}|{errors}|{int(bool(parse_json))}"
+
+
+def _split_by_index(index, files, opts, chars):
+    stats = {}
+    for path in files:
+        try:
+            stats[path] = os.stat(path)
+        except OSError:
+            pass
+
+    cached = index.lookup(files, opts)
+    to_read = []
+    hints = {}
+    for path in files:
+        st = stats.get(path)
+        row = cached.get(path)
+        if st is not None and row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            chars.update(row[3])
+            continue
+        if st is not None and row and row[0] == st.st_size:
+            # 大小相同、修改时间不同：读取时先比对内容摘要
+            hints[path] = (row[2], row[3])
+        to_read.append(path)
+    return to_read, stats, hints
+
+
+def indexed_files(files, encoding='utf-8', errors='strict', parse_json=False, index_path=None):
+    """从字符索引取各文件的记录：返回 {路径: (内容摘要, 字符串)}，只包含索引记录与文件当前状态一致的文件。"""
+    index = CharIndex(index_path)
+    try:
+        cached = index.lookup(files, _index_opts(encoding, errors, parse_json))
+    finally:
+        index.close()
+    result = {}
+    for path, (size, mtime_ns, digest, chars) in cached.items():
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if st.st_size == size and st.st_mtime_ns == mtime_ns:
+            result[path] = (digest, chars)
+    return result
+
+
+def scan_files(files, log_signal=None, prog_signal=None, prog_range=(0, 100),
+               encoding='utf-8', errors='strict', parse_json=False,
+               report_errors=False, max_workers=None, use_index=False, index_path=None,
+               root=None, cancel_token=None):
+    """root: 扫描的根目录；启用索引时顺带清掉该目录下已不存在的文件的记录。"""
+    chars = Charset()
+    total = len(files)
+    if not total:
+        return chars
+
+    index = None
+    stats = None
+    hints = None
+    to_read = files
+    opts = _index_opts(encoding, errors, parse_json)
+    if use_index:
+        try:
+            index = CharIndex(index_path)
+            to_read, stats, hints = _split_by_index(index, files, opts, chars)
+            if root:
+                index.prune(root)
+            if log_signal:
+                log_signal(f"   📇 字符索引: {total - len(to_read)} 个文件未变化，{len(to_read)} 个需要读取")
+        except Exception as e:
+            if log_signal:
+                log_signal(f"⚠️ 字符索引不可用，改为全量读取: {e}")
+            if index:
+                index.close()
+            index, stats, hints, to_read = None, None, None, files
+            chars.clear()
+
+    prog_start, prog_end = prog_range
+    if not to_read:
+        if prog_signal:
+            prog_signal(prog_end)
+        if index:
+            index.close()
+        return chars
+
+    workers = _worker_count(max_workers)
+    batch_size = max(1, min(_MAX_BATCH, len(to_read) // (workers * 4)))
+    batches = [to_read[i:i + batch_size] for i in range(0, len(to_read), batch_size)]
+
+    done = total - len(to_read)
+    records = []
+    failed_paths = []
+    with ThreadPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+        futures = [pool.submit(_scan_batch, batch, encoding, errors, parse_json, stats, hints, cancel_token)
+                   for batch in batches]
+        for future in as_completed(futures):
+            if cancel_token is not None and cancel_token.cancelled:
+                for f in futures:
+                    f.cancel()
+                break
+            batch_chars, failed, count, batch_records = future.result()
+            chars |= batch_chars
+            records.extend(batch_records)
+            failed_paths.extend(path for path, _ in failed)
+            done += count
+
+            if report_errors and log_signal:
+                for path, e in failed:
+                    log_signal(f"⚠️ 读取失败 {os.path.basename(path)}: {e}")
+
+            if prog_signal:
+                prog_signal(prog_start + int((prog_end - prog_start) * done / total))
+
+    if index:
+        try:
+            # 中途取消时已读完的文件照样写进索引，下次不必重读
+            index.store(records, opts)
+            index.forget(failed_paths, opts)
+        except Exception as e:
+            if log_signal:
+                log_signal(f"⚠️ 字符索引写入失败: {e}")
+        finally:
+            index.close()
+
+    if cancel_token is not None:
+        cancel_token.check()
+    return chars
@@ -1,45 +1,137 @@
-from fontTools.ttLib import newTable
-from fontTools.pens.ttGlyphPen import TTGlyphPen
+import os
+import hashlib
+import tempfile
+from fontTools.ttLib import TTFont
+from core.outline_convert import DEFAULT_MAX_ERR, is_cff_font, convert_cff_to_glyf
 
+_CACHE_ENV = "GALFONT_CACHE_DIR"
+_CONVERTED_CACHE_LIMIT = 2 << 30
+_CONVERTED_FORMAT = 1
 
-def ensure_ttf(font, logger_func=print, name_desc="字体"):
-    if 'CFF ' not in font:
+
+def get_cache_dir(sub=""):
+    base = os.environ.get(_CACHE_ENV) or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+    path = os.path.join(base, sub) if sub else base
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def ensure_ttf(font, logger_func=print, name_desc="字体", max_err=DEFAULT_MAX_ERR, prog_signal=None, prog_range=(0, 100)):
+    if not is_cff_font(font):
         return font
 
     if logger_func:
         logger_func(f"⚙️ 检测到 {name_desc} 为 OTF 格式，正在转换为 TTF...")
-    
-    glyphOrder = font.getGlyphOrder()
-    font['maxp'] = newTable('maxp')
-    font['maxp'].tableVersion = 0x00010000
-    font['maxp'].numGlyphs = len(glyphOrder)
-    font['maxp'].maxZones = 1
-    font['maxp'].maxTwilightPoints = 0
-    font['maxp'].maxStorage = 0
-    font['maxp'].maxFunctionDefs = 0
-    font['maxp'].maxInstructionDefs = 0
-    font['maxp'].maxStackElements = 0
-    font['maxp'].maxSizeOfInstructions = 0
-    font['maxp'].maxComponentElements = 0
-
-    font['loca'] = newTable('loca')
-    font['glyf'] = newTable('glyf')
-    font['glyf'].glyphs = {}
-    font['glyf'].glyphOrder = glyphOrder
-
-    glyphSet = font.getGlyphSet()
-    for glyphName in glyphOrder:
-        pen = TTGlyphPen(glyphSet)
-        try:
-            glyphSet[glyphName].draw(pen)
-            font['glyf'][glyphName] = pen.glyph()
-        except Exception:
-            font['glyf'][glyphName] = TTGlyphPen(None).glyph()
 
-    if 'CFF ' in font: del font['CFF ']
-    if 'VORG' in font: del font['VORG']
-    font.sfntVersion = "\x00\x01\x00\x00"
-    
+    failed = convert_cff_to_glyf(font, max_err=max_err, prog_signal=prog_signal, prog_range=prog_range)
+
     if logger_func:
+        if failed:
+            logger_func(f"⚠️ {len(failed)} 个字形转换失败: {', '.join(failed[:5])}{'...' if len(failed) > 5 else ''}")
         logger_func(f"✅ {name_desc} 格式转换完成。")
     return font
+
+
+def norm_path(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+def paths_overlap(a, b):
+    """同一路径，或其中一个是另一个的上级目录 (参数需先经 norm_path 规范化)。"""
+    return a == b or a.startswith(b.rstrip(os.sep) + os.sep) or b.startswith(a.rstrip(os.sep) + os.sep)
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_if_changed(path, data):
+    """写入 data (bytes)；磁盘上已有内容相同的文件时不写，保留其修改时间。返回是否写入。"""
+    try:
+        if os.path.getsize(path) == len(data) and file_digest(path) == hashlib.sha256(data).hexdigest():
+            return False
+    except OSError:
+        pass
+    with open(path, 'wb') as f:
+        f.write(data)
+    return True
+
+
+def _evict_converted(cache_dir, keep, limit=None):
+    if limit is None:
+        limit = _CONVERTED_CACHE_LIMIT
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def open_ttf(path, logger_func=print, name_desc="字体", max_err=DEFAULT_MAX_ERR, use_cache=True):
+    """打开字体并保证为 TrueType 轮廓；OTF 的转换结果按文件内容哈希缓存到磁盘，重复使用时直接读取。"""
+    font = TTFont(path)
+    if not is_cff_font(font):
+        return font
+    if not use_cache:
+        return ensure_ttf(font, logger_func, name_desc, max_err)
+
+    try:
+        cache_dir = get_cache_dir("converted")
+        key = hashlib.sha256(f"{file_digest(path)}|{max_err!r}|{_CONVERTED_FORMAT}".encode()).hexdigest()
+        cache_path = os.path.join(cache_dir, f"{key}.ttf")
+    except OSError as e:
+        if logger_func:
+            logger_func(f"⚠️ 转换缓存不可用: {e}")
+        return ensure_ttf(font, logger_func, name_desc, max_err)
+
+    if os.path.exists(cache_path):
+        try:
+            cached = TTFont(cache_path)
+            os.utime(cache_path)
+            font.close()
+            if logger_func:
+                logger_func(f"♻️ {name_desc} 使用已缓存的 TTF 转换结果")
+            return cached
+        except Exception:
+            try:
+                os.remove(cache_path)
+            except OSError:
+                pass
+
+    ensure_ttf(font, logger_func, name_desc, max_err)
+
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=cache_dir)
+        os.close(fd)
+        font.save(tmp_path)
+        os.replace(tmp_path, cache_path)
+        _evict_converted(cache_dir, cache_path)
+        font.close()
+        return TTFont(cache_path)
+    except Exception as e:
+        if logger_func:
+            logger_func(f"⚠️ 转换结果缓存失败: {e}")
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return font
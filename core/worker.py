@@ -1,7 +1,11 @@
 import traceback
 from PyQt6.QtCore import QThread, pyqtSignal
 
-from core.tasks import image_tasks, font_tasks, text_tasks, modify_tasks
+from core.task_registry import run_task
+from core.process_runner import ProcessTask
+from core.history_manager import get_history_manager
+from core.error_handler import TaskCancelled
+from core.cancellation import CancelToken
 
 
 class Worker(QThread):
@@ -9,48 +13,35 @@ class Worker(QThread):
     prog = pyqtSignal(int)
     done = pyqtSignal(object)
 
-    def __init__(self, task_type, config):
+    def __init__(self, task_type, config, backend='process'):
         super().__init__()
         self.task = task_type
         self.c = config
+        self.backend = backend
+        self._proc_task = None
+        self.cancel_token = CancelToken()
+
+    def cancel(self):
+        self.cancel_token.cancel()
+        if self._proc_task is not None:
+            self._proc_task.cancel()
 
     def run(self):
         log_func = self.log.emit
         prog_func = self.prog.emit
 
         try:
-            result = None
-            
-            if self.task == "font":
-                result = font_tasks.build_font(self.c, log_func, prog_func)
-            elif self.task == "subset":
-                result = font_tasks.subset_font(self.c, log_func, prog_func)
-            elif self.task == "woff2":
-                result = font_tasks.gen_woff2(self.c, log_func, prog_func)
-            
-            elif self.task == "pic":
-                result = image_tasks.gen_pic(self.c, log_func, prog_func)
-            elif self.task == "tga":
-                result = image_tasks.gen_tga(self.c, log_func, prog_func)
-            elif self.task == "bmp":
-                result = image_tasks.gen_bmp(self.c, log_func, prog_func)
-            elif self.task == "bmfont":
-                result = image_tasks.gen_bmfont(self.c, log_func, prog_func)
-            
-            elif self.task == "map":
-                result = text_tasks.gen_mapping(self.c, log_func, prog_func)
-            elif self.task == "smart_fallback":
-                result = text_tasks.smart_fallback_scan(self.c, log_func, prog_func)
-            
-            elif self.task == "tweak_width":
-                result = modify_tasks.tweak_font_width(self.c, log_func, prog_func)
-            elif self.task == "cleanup":
-                result = modify_tasks.clean_font_tables(self.c, log_func, prog_func)
-            elif self.task == "unified_fix":
-                result = modify_tasks.gen_unified_fix(self.c, log_func, prog_func)
-            
+            if self.backend == 'process':
+                self._proc_task = ProcessTask(self.task, self.c)
+                if self.cancel_token.cancelled:
+                    self._proc_task.cancel()
+                result = self._proc_task.run(log_func, prog_func, get_history_manager().merge_records)
+            else:
+                result = run_task(self.task, self.c, log_func, prog_func, self.cancel_token)
             self.done.emit(result)
 
+        except TaskCancelled:
+            self.log.emit("⏹ <font color='orange'>任务已取消</font>")
         except Exception as e:
             self.log.emit(f"❌ <font color='red'>[系统异常] {str(e)}</font>")
             traceback.print_exc()
@@ -1,14 +1,16 @@
 import os
 import sys
-from PyQt6.QtWidgets import QApplication
-from PyQt6.QtGui import QFont
+import multiprocessing
 
 base_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(base_dir)
 
-from ui.main_window import GalFontTool
-
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtGui import QFont
+    from ui.main_window import GalFontTool
+
     os.environ["QT_AUTO_SCREEN_SCALE_FACTOR"] = "1"
     app = QApplication(sys.argv)
     font = QFont("Microsoft YaHei", 10)
@@ -16,4 +18,4 @@ if __name__ == "__main__":
     app.setFont(font)
     w = GalFontTool()
     w.show()
-    sys.exit(app.exec())
\ No newline at end of file
+    sys.exit(app.exec())
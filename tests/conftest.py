@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """每个测试用独立的缓存目录，不读写仓库里的 cache/。"""
+    path = tmp_path / "cache"
+    monkeypatch.setenv('GALFONT_CACHE_DIR', str(path))
+    return path
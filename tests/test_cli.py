@@ -0,0 +1,62 @@
+import pytest
+
+from core.cli import build_task_conf
+from core.error_handler import ConfigError
+
+FIX = {'src': 'a.ttf', 'ref': '', 'out': 'b.ttf', 'scale_x': '0.95', 'scale_y': '1.00', 'spacing': '2',
+       'asc': '900', 'desc': '-100', 'gap': '0'}
+
+
+def test_unified_fix_reads_exported_values():
+    conf = build_task_conf('unified_fix', {'fix': FIX})
+    assert conf == {'src': 'a.ttf', 'out_path': 'b.ttf', 'scale_x': 0.95, 'scale_y': 1.0, 'spacing': 2,
+                    'asc': 900, 'desc': -100, 'gap': 0}
+
+
+@pytest.mark.parametrize('key', ['asc', 'scale_x', 'out'])
+def test_unified_fix_requires_every_value(key):
+    fix = dict(FIX)
+    del fix[key]
+    with pytest.raises(ConfigError, match=key):
+        build_task_conf('unified_fix', {'fix': fix})
+
+
+def test_unified_fix_rejects_bad_numbers():
+    with pytest.raises(ConfigError, match='asc'):
+        build_task_conf('unified_fix', {'fix': dict(FIX, asc='abc')})
+
+
+def test_image_builders_read_exported_layout():
+    pic = {'font': 'g.ttf', 'folder': 'img', 'fmt': 'png', 'fs': '30', 'cnt': '20', 'cw': '32', 'ch': '33',
+           'iw': '2', 'ih': '3', 'imw': '2048', 'imh': '1024', 'ix': '4', 'iy': '5'}
+    tga = {'font': 'g.ttf', 'dat': 'text', 'eng_n': 'Arial', 'eng_p': 'IMG/a.tga', 'fs': '20', 'cw': '22',
+           'ch': '23', 'iw': '1', 'ih': '2', 'w': '512', 'h': '2048'}
+    bmp = {'font': 'g.ttf', 'fs': '50', 'sz': '56', 'cnt': '12', 'w': '512', 'scale': '1.5', 'depth': '8'}
+    config = {'pic': pic, 'tga': tga, 'bmp': bmp}
+
+    conf = build_task_conf('pic', config)
+    assert (conf['fsize'], conf['count'], conf['cw'], conf['ch'], conf['iw'], conf['ih']) == (30, 20, 32, 33, 2, 3)
+    assert (conf['img_w'], conf['img_h'], conf['ix'], conf['iy']) == (2048, 1024, 4, 5)
+
+    conf = build_task_conf('tga', config)
+    assert (conf['eng_name'], conf['eng_path'], conf['fsize']) == ('Arial', 'IMG/a.tga', 20)
+    assert (conf['cw'], conf['ch'], conf['iw'], conf['ih'], conf['img_w'], conf['img_h']) == (22, 23, 1, 2, 512, 2048)
+
+    conf = build_task_conf('bmp', config)
+    assert (conf['fsize'], conf['cw'], conf['ch'], conf['count']) == (50, 56, 56, 12)
+    assert (conf['img_w'], conf['scale'], conf['depth']) == (512, 1.5, 8)
+
+
+def test_image_builders_require_layout():
+    with pytest.raises(ConfigError, match='cw'):
+        build_task_conf('pic', {'pic': {'fs': '30', 'cnt': '20'}})
+
+
+def test_map_reads_limit_font():
+    conf = build_task_conf('map', {'mapping': {'src': 's', 'out': 'o', 'limit_font': 'limit.ttf'}})
+    assert conf['limit_font'] == 'limit.ttf'
+
+
+def test_image_builders_read_codepage():
+    bmp = {'fs': '50', 'sz': '56', 'cnt': '12', 'w': '512', 'scale': '1', 'depth': '8', 'codepage': 'gbk'}
+    assert build_task_conf('bmp', {'bmp': bmp})['codepage'] == 'gbk'
@@ -0,0 +1,63 @@
+import random
+
+import pytest
+from fontTools.fontBuilder import FontBuilder
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+from fontTools.ttLib import TTFont
+
+from core.cmap_reader import read_codepoints, CmapReadError
+
+
+def _build_font(path, codes, shuffle=True, flavor=None):
+    rng = random.Random(len(codes))
+    names = [f"g{i}" for i in range(len(codes))]
+    if shuffle:
+        # 打乱字形顺序，让 format 4 同时用到 idDelta 和 idRangeOffset 两种段
+        rng.shuffle(names)
+    glyph_order = ['.notdef'] + sorted(names, key=lambda n: int(n[1:]))
+    fb = FontBuilder(1000, isTTF=True)
+    fb.setupGlyphOrder(glyph_order)
+    fb.setupCharacterMap(dict(zip(codes, names)))
+    empty = TTGlyphPen(None).glyph()
+    fb.setupGlyf({name: empty for name in glyph_order})
+    fb.setupHorizontalMetrics({name: (500, 0) for name in glyph_order})
+    fb.setupHorizontalHeader(ascent=800, descent=-200)
+    fb.setupNameTable({'familyName': 'Test', 'styleName': 'Regular'})
+    fb.setupOS2()
+    fb.setupPost()
+    if flavor:
+        fb.font.flavor = flavor
+    fb.save(str(path))
+    return str(path)
+
+
+def _best_cmap(path):
+    font = TTFont(path)
+    try:
+        return sorted(font.getBestCmap())
+    finally:
+        font.close()
+
+
+def _random_codes(seed, supplementary):
+    rng = random.Random(seed)
+    codes = set(range(0x20, 0x7F)) | set(range(0x4E00, 0x4E00 + 300))
+    codes |= {rng.randrange(0xA0, 0xFFFE) for _ in range(1500)}
+    if supplementary:
+        codes |= {rng.randrange(0x10000, 0x2FFFF) for _ in range(300)} | {0x10FFFD}
+    return sorted(c for c in codes if not 0xD800 <= c < 0xE000)
+
+
+@pytest.mark.parametrize('supplementary', [False, True])
+@pytest.mark.parametrize('shuffle', [False, True])
+def test_matches_fonttools(tmp_path, supplementary, shuffle):
+    path = _build_font(tmp_path / "t.ttf", _random_codes(7, supplementary), shuffle)
+    # fallback=False：确认走的是直接解析，而不是退回 fontTools
+    assert read_codepoints(path, fallback=False).tolist() == _best_cmap(path)
+
+
+def test_woff_falls_back_to_fonttools(tmp_path):
+    path = _build_font(tmp_path / "t.woff", _random_codes(3, False), flavor='woff')
+    with pytest.raises(CmapReadError):
+        read_codepoints(path, fallback=False)
+    assert read_codepoints(path).tolist() == _best_cmap(path)
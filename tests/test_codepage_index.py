@@ -0,0 +1,23 @@
+import pytest
+
+from core import codepage_index
+
+
+@pytest.mark.parametrize('name', ['cp932', 'gbk'])
+def test_double_byte_matches_encoder(name):
+    page = codepage_index.load(name)
+    expected = set()
+    for code in range(0x10000):
+        if 0xD800 <= code < 0xE000:
+            continue
+        try:
+            if len(chr(code).encode(name)) == 2:
+                expected.add(chr(code))
+        except UnicodeEncodeError:
+            pass
+    assert set(page.double_byte) == expected
+
+
+def test_one_way_encodings_are_limit_font_slots():
+    # U+2212 编码成 CP932 的全角减号，字体限制模式下一直可以作为空位
+    assert '−' in codepage_index.load('cp932').double_byte
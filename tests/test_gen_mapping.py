@@ -0,0 +1,63 @@
+import json
+
+from core import artifacts
+from core.cancellation import CancelToken
+from core.tasks.text_tasks import gen_mapping
+
+
+def _run(conf, handoff=False):
+    logs = []
+    memory = artifacts.Artifacts([conf['out_json']] if handoff else [])
+    with artifacts.activate(memory):
+        gen_mapping(conf, logs.append, lambda v: None, CancelToken())
+        mapping = artifacts.get(conf['out_json'])
+    if mapping is None:
+        with open(conf['out_json'], encoding='utf-8') as f:
+            mapping = json.load(f)
+    return mapping, logs
+
+
+def _conf(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "a.txt").write_text("这个们说", encoding='utf-8')
+    (src / "b.txt").write_text("说话们", encoding='utf-8')
+    return {'src_dir': str(src), 'out_dir': str(tmp_path / "out"), 'out_json': str(tmp_path / "map.json"),
+            'exts': 'txt', 'incremental': True}
+
+
+def test_incremental_keeps_assignments_in_pipeline_mode(tmp_path):
+    conf = _conf(tmp_path)
+    first, _ = _run(conf, handoff=True)
+
+    # 新字符排在已有字符前面，只追加时已有的分配不能变
+    (tmp_path / "src" / "b.txt").write_text("说话们丢", encoding='utf-8')
+    second, logs = _run(conf, handoff=True)
+
+    assert all(second[c] == p for c, p in first.items())
+    assert '丢' in second
+    assert any("1/2 个文件需要重写" in line for line in logs)
+
+
+def test_incremental_skips_unchanged_files(tmp_path):
+    conf = _conf(tmp_path)
+    _run(conf)
+    _, logs = _run(conf)
+    assert any("0/2 个文件需要重写" in line for line in logs)
+
+
+def test_edited_mapping_is_not_used_as_base(tmp_path):
+    conf = _conf(tmp_path)
+    first, _ = _run(conf)
+
+    # 手动改掉一条分配：与变更清单记录的表对不上，不能在它的基础上追加
+    edited = dict(first)
+    char = sorted(edited)[0]
+    edited[char] = '亜'
+    with open(conf['out_json'], 'w', encoding='utf-8') as f:
+        json.dump(edited, f, ensure_ascii=False)
+
+    second, logs = _run(conf)
+    assert second == first
+    assert any("不一致" in line for line in logs)
+    assert (tmp_path / "out" / "a.txt").read_text(encoding='utf-8') == "".join(first.get(c, c) for c in "这个们说")
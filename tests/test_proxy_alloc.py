@@ -0,0 +1,71 @@
+from core.proxy_alloc import allocate_proxies
+
+PROXIES = list("一丁七万丈三上下")
+
+
+def test_fresh_allocation_follows_order():
+    mapping, changed, stats = allocate_proxies("cab", PROXIES)
+    assert mapping == {'a': '一', 'b': '丁', 'c': '七'}
+    assert changed == {'a', 'b', 'c'}
+    assert stats['added'] == 3 and stats['kept'] == 0
+
+
+def test_kept_and_added():
+    previous = {'b': '一', 'c': '丁'}
+    # 'a' 排在前面，但已有的分配不能挪动，新字符只取空位
+    mapping, changed, stats = allocate_proxies("abc", PROXIES, previous)
+    assert mapping == {'a': '七', 'b': '一', 'c': '丁'}
+    assert changed == {'a'}
+    assert (stats['kept'], stats['added'], stats['moved']) == (2, 1, 0)
+
+
+def test_invalid_proxy_is_moved():
+    # 上次的代理 '丁' 现在被文本占用 (不在可用空位中)
+    previous = {'a': '一', 'b': '丁'}
+    proxies = [p for p in PROXIES if p != '丁']
+    mapping, changed, stats = allocate_proxies("ab", proxies, previous)
+    assert mapping == {'a': '一', 'b': '七'}
+    assert changed == {'b'}
+    assert stats['moved'] == 1
+
+
+def test_unused_chars_are_retained_without_recycle():
+    previous = {'a': '一', 'z': '丁'}
+    mapping, changed, stats = allocate_proxies("ab", PROXIES, previous)
+    assert mapping == {'a': '一', 'z': '丁', 'b': '七'}
+    assert stats['retained'] == 1
+    assert changed == {'b'}
+
+
+def test_recycle_frees_slots():
+    previous = {'a': '一', 'z': '丁'}
+    mapping, changed, stats = allocate_proxies("ab", PROXIES, previous, recycle=True)
+    assert mapping == {'a': '一', 'b': '丁'}
+    assert stats['recycled'] == 1
+    assert changed == {'z', 'b'}
+
+
+def test_present_chars_are_dropped():
+    # 'z' 仍在文本里但已不需要映射 (比如换了限制字体)，总是移出映射表
+    previous = {'a': '一', 'z': '丁'}
+    mapping, changed, stats = allocate_proxies("a", PROXIES, previous, present={'a', 'z'})
+    assert mapping == {'a': '一'}
+    assert stats['dropped'] == 1
+    assert changed == {'z'}
+
+
+def test_missing_slots():
+    previous = {'x': '一', 'y': '丁'}
+    mapping, changed, stats = allocate_proxies("abc", "一丁七", previous)
+    assert mapping is None and changed == set()
+    assert stats['missing'] == 2
+
+    mapping, _, stats = allocate_proxies("abc", "一丁七", previous, recycle=True)
+    assert mapping is not None and stats['recycled'] == 2
+
+
+def test_duplicate_previous_proxy_is_reassigned():
+    previous = {'a': '一', 'b': '一'}
+    mapping, changed, stats = allocate_proxies("ab", PROXIES, previous)
+    assert mapping['a'] == '一' and mapping['b'] != '一'
+    assert changed == {'b'}
@@ -0,0 +1,12 @@
+from core.task_registry import TASKS, THREAD_TASKS, task_backend
+
+
+def test_thread_tasks_are_registered():
+    assert THREAD_TASKS <= set(TASKS)
+
+
+def test_backends():
+    assert task_backend('read_info') == 'thread'
+    assert task_backend('compare') == 'thread'
+    for task in ('font', 'subset', 'merge', 'convert', 'map'):
+        assert task_backend(task) == 'process'
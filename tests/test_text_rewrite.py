@@ -0,0 +1,84 @@
+import json
+import random
+
+import pytest
+
+from core import text_rewrite
+from core.text_rewrite import compile_table, rewrite_json
+
+MAPPING = {'\n': '亜', '"': '唖', '\\': '娃', '/': '阿', '\t': '哀', 'a': '愛', 'é': '挨', '😀': '姶', '说': '逢'}
+ALPHABET = 'ab"\\/\n\t\r\béx说😀 {}[]:,'
+
+
+def _replace(obj, mapping):
+    # 旧版 recursive_replace 的行为：只替换值，不动键名
+    if isinstance(obj, str):
+        return "".join(mapping.get(c, c) for c in obj)
+    if isinstance(obj, list):
+        return [_replace(item, mapping) for item in obj]
+    if isinstance(obj, dict):
+        return {k: _replace(v, mapping) for k, v in obj.items()}
+    return obj
+
+
+def _random_value(rng, depth=0):
+    kind = rng.randrange(5 if depth < 3 else 2)
+    if kind == 0:
+        return "".join(rng.choice(ALPHABET) for _ in range(rng.randrange(12)))
+    if kind == 1:
+        return rng.choice([1, -2.5, True, None])
+    if kind == 2:
+        return [_random_value(rng, depth + 1) for _ in range(rng.randrange(4))]
+    return {"".join(rng.choice(ALPHABET) for _ in range(rng.randrange(6))): _random_value(rng, depth + 1)
+            for _ in range(rng.randrange(4))}
+
+
+def _rewrite(tmp_path, text, mapping=MAPPING):
+    src, dst = tmp_path / "src.json", tmp_path / "dst.json"
+    with open(src, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+    rewrite_json(str(src), str(dst), compile_table(mapping))
+    with open(dst, encoding='utf-8', newline='') as f:
+        return f.read()
+
+
+def test_simple_escapes_are_mapped(tmp_path):
+    out = _rewrite(tmp_path, '{"k": "a\\nb\\"c\\\\d\\/e\\tf\\rg"}')
+    assert json.loads(out) == {"k": "愛亜b唖c娃d阿e哀f\rg"}
+    # 没有被映射的转义保持原样
+    assert '\\r' in out
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_matches_json_roundtrip(tmp_path, seed):
+    rng = random.Random(seed)
+    doc = _random_value(rng)
+    text = json.dumps(doc, ensure_ascii=rng.random() < 0.5, indent=rng.choice([None, 2]))
+    out = _rewrite(tmp_path, text)
+    assert json.loads(out) == _replace(doc, MAPPING)
+
+
+def _outside_strings(text):
+    return text_rewrite._STRING.sub('""', text)
+
+
+@pytest.mark.parametrize('chunk', [1, 3, 7, 64])
+def test_small_chunks_keep_bytes_outside_strings(tmp_path, monkeypatch, chunk):
+    monkeypatch.setattr(text_rewrite, '_READ_CHUNK', chunk)
+    rng = random.Random(chunk)
+    doc = [_random_value(rng) for _ in range(30)] + ["说" * 500 + "\\n" * 50 + "😀"]
+    # 不规则的空白、CRLF 换行和转义风格都要原样保留
+    text = json.dumps(doc, ensure_ascii=False, indent=3).replace('\n', '\r\n').replace(': ', ' :  ')
+
+    out = _rewrite(tmp_path, text)
+    assert _outside_strings(out) == _outside_strings(text)
+    assert json.loads(out) == _replace(json.loads(text), MAPPING)
+
+    # 没有需要替换的字符时整个文件逐字节不变
+    assert _rewrite(tmp_path, text, {'丂': '丄'}) == text
+
+
+def test_unterminated_string_is_rejected(tmp_path, monkeypatch):
+    monkeypatch.setattr(text_rewrite, '_READ_CHUNK', 4)
+    with pytest.raises(ValueError):
+        _rewrite(tmp_path, '{"a": "说说说说说}')
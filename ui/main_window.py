@@ -2,7 +2,7 @@ import os
 import sys
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                              QLabel, QProgressBar, QFrame, QStackedWidget, QComboBox,
-                             QGridLayout, QScrollArea, QSizePolicy, QScroller, QSplitter, QTextEdit, QMenu)
+                             QGridLayout, QScrollArea, QSizePolicy, QScroller, QSplitter, QTextEdit, QMenu, QSpinBox)
 from PyQt6.QtCore import Qt, QPoint, QRectF, QSettings
 from PyQt6.QtGui import QFont, QCloseEvent, QShortcut, QKeySequence, QAction
 
@@ -51,6 +51,7 @@ class GalFontTool(QMainWindow):
         self.default_output_dir = ""
 
         self.bind_methods()
+        ui_utils.setup_scheduler(self)
         self.setup_ui()
         self.setup_shortcuts()
         self.setAcceptDrops(True)
@@ -75,6 +76,7 @@ class GalFontTool(QMainWindow):
         QShortcut(QKeySequence("Ctrl+Z"), self, self.do_undo)
         QShortcut(QKeySequence("Ctrl+Y"), self, self.do_redo)
         QShortcut(QKeySequence("Ctrl+Shift+Z"), self, self.do_redo)
+        QShortcut(QKeySequence("Esc"), self, self.cancel_worker)
         QShortcut(QKeySequence("Ctrl+G"), self, self.do_gen_font)
         QShortcut(QKeySequence("Ctrl+1"), self, lambda: self.switch_tab(0))
         QShortcut(QKeySequence("Ctrl+2"), self, lambda: self.switch_tab(1))
@@ -178,6 +180,7 @@ class GalFontTool(QMainWindow):
         self.do_smart_fallback_scan = lambda: ui_actions.do_smart_fallback_scan(self)
         self.on_smart_scan_done = lambda result: ui_actions.on_smart_scan_done(self, result)
         self.export_smart_result = lambda: ui_actions.export_smart_result(self)
+        self.do_apply_smart_result = lambda: ui_actions.do_apply_smart_result(self)
         self.do_gen_woff2 = lambda: ui_actions.do_gen_woff2(self)
         self.do_cleanup = lambda: ui_actions.do_cleanup(self)
         self.do_gen_bmfont = lambda: ui_actions.do_gen_bmfont(self)
@@ -202,8 +205,9 @@ class GalFontTool(QMainWindow):
         self.reset_to_default = lambda: ui_utils.reset_to_default(self)
         self.save_preset = lambda: ui_utils.save_preset(self)
         self.load_preset = lambda: ui_utils.load_preset(self)
-        self.run_worker = lambda task, conf: ui_utils.run_worker(self, task, conf)
+        self.run_worker = lambda task, conf, on_done=None: ui_utils.run_worker(self, task, conf, on_done)
         self.set_ui_busy = lambda busy: ui_utils.set_ui_busy(self, busy)
+        self.cancel_worker = lambda: ui_utils.cancel_worker(self)
         self.on_worker_done = lambda result: ui_utils.on_worker_done(self, result)
         self.toggle_max = lambda: ui_utils.toggle_max(self)
         self.load_settings = lambda: ui_utils.load_settings(self)
@@ -231,8 +235,15 @@ class GalFontTool(QMainWindow):
         self.btn_min = AnimButton("min", self.showMinimized, self)
         self.btn_max = AnimButton("max", self.toggle_max, self)
         self.btn_close = AnimButton("close", self.close, self)
+        self.btn_cancel_task = QPushButton("⏹ 取消任务"); self.btn_cancel_task.setFixedHeight(26); self.btn_cancel_task.setToolTip("终止全部运行中和排队的后台任务 (Esc)")
+        self.btn_cancel_task.clicked.connect(self.cancel_worker); self.btn_cancel_task.hide()
+        self.spin_max_jobs = QSpinBox(); self.spin_max_jobs.setRange(1, max(1, os.cpu_count() or 1)); self.spin_max_jobs.setFixedHeight(26); self.spin_max_jobs.setPrefix("并行 ")
+        self.spin_max_jobs.setValue(self.scheduler.max_jobs); self.spin_max_jobs.setToolTip("同时运行的后台任务数上限；读写同一文件的任务仍会依次执行")
+        self.spin_max_jobs.valueChanged.connect(self.scheduler.set_max_jobs)
         title_bar.addWidget(self.title_label)
         title_bar.addStretch()
+        title_bar.addWidget(self.btn_cancel_task)
+        title_bar.addWidget(self.spin_max_jobs)
         title_bar.addWidget(self.btn_min)
         title_bar.addWidget(self.btn_max)
         title_bar.addWidget(self.btn_close)
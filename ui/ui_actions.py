@@ -2,13 +2,13 @@ import os
 import json
 import glob
 import traceback
-import tempfile
 from PyQt6.QtWidgets import QMessageBox, QFileDialog, QDialog, QVBoxLayout, QHBoxLayout, QLabel, QTextEdit, QPushButton, QTableWidgetItem, QTableWidget, QHeaderView
 from PyQt6.QtCore import Qt
-from fontTools.ttLib import TTFont
-from fontTools import subset
-from core.utils import ensure_ttf
-from core import font_cache
+from core.text_scanner import find_files, scan_files, read_chars
+from core.codepage_index import CODEPAGES
+
+def _codepage(combo):
+    return list(CODEPAGES)[combo.currentIndex()]
 
 def read_unified_metrics(main_window):
     src_path = main_window.fix_src.text()
@@ -18,41 +18,19 @@ def read_unified_metrics(main_window):
         QMessageBox.warning(main_window, "提示", "请先填入【目标字体】和【参考字体】")
         return
 
-    try:
-        src_font = TTFont(src_path)
-        ref_font = TTFont(ref_path)
-
-        src_upm = src_font['head'].unitsPerEm
-        ref_upm = ref_font['head'].unitsPerEm
-        
-        ratio = src_upm / ref_upm
+    main_window.run_worker('read_unified_metrics', {'src': src_path, 'ref': ref_path},
+                           lambda result: _on_unified_metrics_read(main_window, result))
 
-        ref_hhea = ref_font['hhea']
-        target_asc = int(ref_hhea.ascent * ratio)
-        target_desc = int(ref_hhea.descent * ratio)
-        target_gap = int(ref_hhea.lineGap * ratio)
+def _on_unified_metrics_read(main_window, result):
+    if not result: return
+    main_window.fix_asc.setText(str(result['asc']))
+    main_window.fix_desc.setText(str(result['desc']))
+    main_window.fix_gap.setText(str(result['gap']))
+    
+    main_window.fix_scale_x.setText("1.00") 
+    main_window.fix_scale_y.setText("1.00")
+    main_window.fix_spacing.setText("0")
 
-        main_window.fix_asc.setText(str(target_asc))
-        main_window.fix_desc.setText(str(target_desc))
-        main_window.fix_gap.setText(str(target_gap))
-        
-        main_window.fix_scale_x.setText("1.00") 
-        main_window.fix_scale_y.setText("1.00")
-        main_window.fix_spacing.setText("0")
-
-        main_window.log("="*40)
-        main_window.log("🪄 <b>自动计算完成</b>")
-        main_window.log(f"   目标字体 UPM: {src_upm}")
-        main_window.log(f"   参考字体 UPM: {ref_upm}")
-        main_window.log(f"   计算倍率: {ratio:.4f}x")
-        main_window.log("-" * 20)
-        main_window.log(f"   原版 Asc: {ref_hhea.ascent} -> 新 Asc: {target_asc}")
-        main_window.log(f"   原版 Desc: {ref_hhea.descent} -> 新 Desc: {target_desc}")
-        main_window.log("="*40)
-        
-    except Exception as e:
-        QMessageBox.critical(main_window, "错误", f"计算失败: {e}")
-        
 def do_unified_fix(main_window):
     if not main_window.fix_src.text() or not main_window.fix_out.text():
         QMessageBox.warning(main_window, "提示", "请先填写路径")
@@ -80,92 +58,36 @@ def read_font_metrics(main_window):
 
     if not os.path.exists(path): return
 
-    try:
-        target_font = TTFont(path)
-        tgt_upm = target_font['head'].unitsPerEm
-
-        if os.path.exists(ref):
-            ref_font = TTFont(ref)
-            ref_upm = ref_font['head'].unitsPerEm
-            hhea = ref_font['hhea']
+    main_window.run_worker('read_metrics', {'path': path, 'ref': ref},
+                           lambda result: _on_font_metrics_read(main_window, result))
 
-            ratio = tgt_upm / ref_upm
-
-            asc = int(hhea.ascent * ratio)
-            desc = int(hhea.descent * ratio)
-            gap = int(hhea.lineGap * ratio)
-
-            main_window.log(f"📐 <b>智能缩放计算:</b>")
-            main_window.log(f"&nbsp;&nbsp;参考UPM: {ref_upm} | 目标UPM: {tgt_upm}")
-            main_window.log(f"&nbsp;&nbsp;缩放倍率: {ratio:.2f}")
-            main_window.log(f"&nbsp;&nbsp;原始Asc: {hhea.ascent} -> 修正后: {asc}")
-        else:
-            hhea = target_font['hhea']
-            asc = hhea.ascent
-            desc = hhea.descent
-            gap = hhea.lineGap
-            main_window.log(f"⚠️ 未提供参考字体，读取目标原始数值 (UPM: {tgt_upm})")
-
-        main_window.in_ascender.setText(str(asc))
-        main_window.in_descender.setText(str(desc))
-        main_window.in_linegap.setText(str(gap))
-
-    except Exception as e:
-        main_window.log(f"❌ 读取失败: {e}")
-        traceback.print_exc()
+def _on_font_metrics_read(main_window, result):
+    if not result: return
+    main_window.in_ascender.setText(str(result['asc']))
+    main_window.in_descender.setText(str(result['desc']))
+    main_window.in_linegap.setText(str(result['gap']))
 
 def apply_font_metrics(main_window):
     path = main_window.met_font_path.text()
     if not os.path.exists(path): main_window.log("❌ 目标字体不存在"); return
 
     try:
-        from core.history_manager import get_history_manager
-        history = get_history_manager()
-        
-        asc = int(main_window.in_ascender.text())
-        desc = int(main_window.in_descender.text())
-        gap = int(main_window.in_linegap.text())
-
-        font = TTFont(path)
-
-        font['hhea'].ascent = asc
-        font['hhea'].descent = desc
-        font['hhea'].lineGap = gap
-
-        font['OS/2'].sTypoAscender = asc
-        font['OS/2'].sTypoDescender = desc
-        font['OS/2'].sTypoLineGap = gap
-        font['OS/2'].usWinAscent = asc
-        font['OS/2'].usWinDescent = abs(desc)
-
-        removed_bitmap = False
-        for tag in ['EBDT', 'EBLC', 'EBSC', 'CBDT', 'CBLC']:
-            if tag in font:
-                del font[tag]
-                removed_bitmap = True
-
-        if removed_bitmap:
-            main_window.log("🧹 已清除内嵌点阵表 (防止渲染撕裂)")
-
-        save_path = path.replace(".ttf", "_fix.ttf")
-        file_existed = os.path.exists(save_path)
-        if file_existed:
-            history.record_before_overwrite("应用度量", save_path, f"Asc{asc} Desc{desc}")
-        
-        font.save(save_path)
-        
-        if not file_existed and os.path.exists(save_path):
-            history.record_new_file("应用度量", save_path, f"Asc{asc} Desc{desc}")
-        elif os.path.exists(save_path):
-            history.record("应用度量", save_path, f"Asc{asc} Desc{desc}")
-        
-        update_history_buttons(main_window)
-        
-        main_window.log(f"✅ <b>修复完成!</b><br>Asc: {asc}, Desc: {desc}, Gap: {gap}<br>已保存: {os.path.basename(save_path)}")
-        QMessageBox.information(main_window, "成功", f"字体已保存至:\n{save_path}")
-
-    except Exception as e:
+        conf = {
+            'path': path,
+            'asc': int(main_window.in_ascender.text()),
+            'desc': int(main_window.in_descender.text()),
+            'gap': int(main_window.in_linegap.text())
+        }
+    except ValueError as e:
         main_window.log(f"❌ 应用失败: {e}")
+        return
+
+    main_window.run_worker('apply_metrics', conf, lambda result: _on_font_saved(main_window, result, "成功", "字体已保存至:\n{}"))
+
+def _on_font_saved(main_window, result, title, message):
+    update_history_buttons(main_window)
+    if result:
+        QMessageBox.information(main_window, title, message.format(result))
 
 def load_json_to_table(main_window):
     f, _ = QFileDialog.getOpenFileName(main_window, "选择映射表", "", "JSON (*.json)")
@@ -220,15 +142,17 @@ def remove_mapping_row(main_window):
     for row in rows:
         main_window.map_table.removeRow(row)
 
-def do_subset(main_window):
-    conf = {
+def _subset_conf(main_window):
+    return {
         'font_path': main_window.sub_font.text(),
         'txt_dir': main_window.sub_txt.text(),
         'json_path': main_window.sub_json.text(),
         'out_path': main_window.sub_out.text(),
         'exts': ".txt;.json"
     }
-    main_window.run_worker('subset', conf)
+
+def do_subset(main_window):
+    main_window.run_worker('subset', _subset_conf(main_window))
 
 def do_coverage_analysis(main_window):
     font_path = main_window.cov_font.text()
@@ -236,43 +160,8 @@ def do_coverage_analysis(main_window):
         QMessageBox.warning(main_window, "路径无效", "请先指定字体文件！")
         return
 
-    try:
-        cmap = font_cache.get_cmap(font_path)
-        font_chars = set(cmap.keys())
-
-        charsets = {
-            "ASCII (基础拉丁)": (0x0020, 0x007E),
-            "日文平假名": (0x3040, 0x309F),
-            "日文片假名": (0x30A0, 0x30FF),
-            "CJK 基本 (常用汉字)": (0x4E00, 0x9FFF),
-            "全角ASCII": (0xFF01, 0xFF5E),
-            "CJK 标点符号": (0x3000, 0x303F),
-        }
-
-        results = []
-        results.append(f"📂 字体: {os.path.basename(font_path)}")
-        results.append(f"📊 总字符数: {len(font_chars)}\n")
-        results.append("=" * 50)
-
-        for name, (start, end) in charsets.items():
-            total = end - start + 1
-            covered = sum(1 for c in range(start, end + 1) if c in font_chars)
-            percent = (covered / total) * 100
-
-            bar_len = 20
-            filled = int(bar_len * percent / 100)
-            bar = "█" * filled + "░" * (bar_len - filled)
-
-            results.append(f"{name}")
-            results.append(f"  [{bar}] {percent:.1f}% ({covered}/{total})")
-            results.append("")
-
-        main_window.cov_result.setPlainText("\n".join(results))
-        main_window.log(f"📊 覆盖率分析完成: {os.path.basename(font_path)}")
-
-    except Exception as e:
-        main_window.log(f"❌ 分析失败: {e}")
-        QMessageBox.critical(main_window, "分析失败", f"无法分析字体: {e}")
+    main_window.run_worker('coverage', {'path': font_path},
+                           lambda result: result and main_window.cov_result.setPlainText(result))
 
 def do_merge_fonts(main_window):
     base_path = main_window.merge_base.text()
@@ -286,314 +175,91 @@ def do_merge_fonts(main_window):
         QMessageBox.warning(main_window, "路径无效", "来源字体不存在！")
         return
 
-    try:
-        from core.history_manager import get_history_manager
-        history = get_history_manager()
-        
-        main_window.log("🔗 <b>开始合并字体...</b>")
-
-        base_font = TTFont(base_path)
-        ensure_ttf(base_font, main_window.log, "基础字体")
-        base_upm = base_font['head'].unitsPerEm
-        
-        fd_base, temp_base_path = tempfile.mkstemp(suffix='.ttf')
-        os.close(fd_base)
-        base_font.save(temp_base_path)
-        base_font.close()
-        
-        add_font = TTFont(add_path)
-        ensure_ttf(add_font, main_window.log, "来源字体")
-        add_upm = add_font['head'].unitsPerEm
-        
-        fd_add, temp_add_path = tempfile.mkstemp(suffix='.ttf')
-        os.close(fd_add)
-        add_font.save(temp_add_path)
-        add_font.close()
-        
-        base_path = temp_base_path
-        add_path = temp_add_path
-
-        main_window.log(f"   基础 UPM: {base_upm}, 来源 UPM: {add_upm}")
-        
-        if base_upm != add_upm:
-            main_window.log(f"   ⚠️ UPM 不一致，正在缩放来源字体...")
-            temp_fd, temp_add_path = tempfile.mkstemp(suffix='.ttf')
-            os.close(temp_fd)
-
-            add_font = TTFont(add_path)
-            scale = base_upm / add_upm 
-            add_font['head'].unitsPerEm = base_upm
-            
-            if 'hhea' in add_font:
-                hhea = add_font['hhea']
-                hhea.ascent = int(hhea.ascent * scale)
-                hhea.descent = int(hhea.descent * scale)
-                hhea.lineGap = int(hhea.lineGap * scale)
-
-            if 'OS/2' in add_font:
-                os2 = add_font['OS/2']
-                if hasattr(os2, 'sTypoAscender'): os2.sTypoAscender = int(os2.sTypoAscender * scale)
-                if hasattr(os2, 'sTypoDescender'): os2.sTypoDescender = int(os2.sTypoDescender * scale)
-                if hasattr(os2, 'sTypoLineGap'): os2.sTypoLineGap = int(os2.sTypoLineGap * scale)
-                if hasattr(os2, 'usWinAscent'): os2.usWinAscent = int(os2.usWinAscent * scale)
-                if hasattr(os2, 'usWinDescent'): os2.usWinDescent = int(os2.usWinDescent * scale)
-                if hasattr(os2, 'sxHeight') and os2.sxHeight: os2.sxHeight = int(os2.sxHeight * scale)
-                if hasattr(os2, 'sCapHeight') and os2.sCapHeight: os2.sCapHeight = int(os2.sCapHeight * scale)
-
-            hmtx = add_font['hmtx']
-            for name in hmtx.metrics:
-                w, lsb = hmtx.metrics[name]
-                hmtx.metrics[name] = (int(w * scale), int(lsb * scale))
-
-            if 'glyf' in add_font:
-                from fontTools.ttLib.tables._g_l_y_f import GlyphCoordinates
-                glyf = add_font['glyf']
-                for glyphName in glyf.keys():
-                    glyph = glyf[glyphName]
-                    if glyph.numberOfContours > 0:
-                        if hasattr(glyph, 'coordinates') and glyph.coordinates:
-                            coords = glyph.coordinates
-                            new_coords = GlyphCoordinates([(int(x * scale), int(y * scale)) for x, y in coords])
-                            glyph.coordinates = new_coords
-                    elif glyph.numberOfContours == -1:
-                        if hasattr(glyph, 'components'):
-                            for comp in glyph.components:
-                                comp.x = int(comp.x * scale)
-                                comp.y = int(comp.y * scale)
-
-            add_font.save(temp_add_path)
-            add_font.close()
-            main_window.log("   ✓ UPM 转换完成")
-
-        filter_text = main_window.merge_filter.text()
-        if filter_text:
-            main_window.log(f"✂️ <b>正在提取指定字符...</b>")
-            main_window.log(f"   目标字符: {filter_text}")
-            try:
-                tmp_font = TTFont(temp_add_path)
-                options = subset.Options()
-                options.name_IDs = []
-                options.drop_tables = [] 
-                options.recalc_bounds = True
-                options.notdef_glyph = False
-                
-                subsetter = subset.Subsetter(options=options)
-                subsetter.populate(text=filter_text)
-                subsetter.subset(tmp_font)
-                
-                fd_sub, subset_path = tempfile.mkstemp(suffix='.ttf')
-                os.close(fd_sub)
-                tmp_font.save(subset_path)
-                tmp_font.close()
-                
-                if temp_add_path != add_path and os.path.exists(temp_add_path):
-                    os.remove(temp_add_path)
-                    
-                temp_add_path = subset_path
-                main_window.log("   ✓ 已生成仅包含指定字符的子集")
-            except Exception as e:
-                main_window.log(f"   ⚠️ 提取字符失败: {e}，将尝试合并全部...")
-
-        main_window.log("   正在执行合并...")
-
-        if os.path.exists(out_path):
-            history.record_before_overwrite("合并字体", out_path, "覆盖")
-
-        from fontTools.merge import Merger
-        merger = Merger()
-        merged_font = merger.merge([base_path, temp_add_path])
-        merged_font.save(out_path)
-        merged_font.close()
-
-        if temp_add_path != add_path and os.path.exists(temp_add_path):
-            os.remove(temp_add_path)
-
-        if not os.path.exists(out_path):
-            return
-        history.record("合并字体", out_path, "合并完成")
-        update_history_buttons(main_window)
-        
-        main_window.log(f"✅ <b>合并完成!</b>")
-        main_window.log(f"   输出: {out_path}")
-        QMessageBox.information(main_window, "合并成功", f"合并完成！\n输出: {out_path}")
-
-    except FileNotFoundError:
-        main_window.log("❌ 缺少组件，请确保安装了 fonttools")
-    except Exception as e:
-        main_window.log(f"❌ 合并失败: {e}")
-        traceback.print_exc()
-        QMessageBox.critical(main_window, "合并失败", f"合并出错: {e}")
+    conf = {
+        'base': base_path,
+        'add': add_path,
+        'out_path': out_path,
+        'filter': main_window.merge_filter.text()
+    }
+    main_window.run_worker('merge', conf, lambda result: _on_font_saved(main_window, result, "合并成功", "合并完成！\n输出: {}"))
 
 def do_run_pipeline(main_window):
     steps = []
-    if main_window.pipe_step1.isChecked(): steps.append(('map', '动态映射'))
-    if main_window.pipe_step2.isChecked(): steps.append(('font', '字体生成'))
-    if main_window.pipe_step3.isChecked(): steps.append(('subset', '字体精简'))
-    if main_window.pipe_step4.isChecked(): steps.append(('checkup', '体检'))
+    if main_window.pipe_step1.isChecked(): steps.append(('map', '动态映射', _map_conf(main_window)))
+    if main_window.pipe_step2.isChecked(): steps.append(('font', '字体生成', _font_conf(main_window)))
+    if main_window.pipe_step3.isChecked(): steps.append(('subset', '字体精简', _subset_conf(main_window)))
+    if main_window.pipe_step4.isChecked(): steps.append(('checkup', '体检', _checkup_conf(main_window, 'subset')))
 
     if not steps:
         QMessageBox.warning(main_window, "未选择步骤", "请至少勾选一个执行步骤！")
         return
 
-    main_window.log("🚀 <b>开始执行工作流...</b>")
-    main_window.pipe_status.setText(f"⏳ 准备执行 {len(steps)} 个步骤...")
-
-    main_window._pipeline_steps = steps
-    main_window._pipeline_idx = 0
-    main_window._run_next_pipeline_step()
+    main_window.pipe_status.setText(f"⏳ 正在执行 {len(steps)} 个步骤...")
+    conf = {'steps': [{'name': task, 'task': task, 'title': title, 'conf': step_conf}
+                      for task, title, step_conf in steps]}
+    main_window.run_worker('pipeline', conf, lambda result: _on_pipeline_done(main_window, result))
 
-def _run_next_pipeline_step(main_window):
-    from PyQt6.QtCore import QTimer
-    if main_window._pipeline_idx >= len(main_window._pipeline_steps):
-        main_window.pipe_status.setText("✅ 工作流全部完成！")
-        main_window.log("✅ <b>工作流执行完毕！</b>")
-        QMessageBox.information(main_window, "完成", "工作流已全部执行完毕！")
+def _on_pipeline_done(main_window, result):
+    if not result:
+        main_window.pipe_status.setText("❌ 工作流未执行")
         return
 
-    step_type, step_name = main_window._pipeline_steps[main_window._pipeline_idx]
-    main_window.pipe_status.setText(f"⏳ [{main_window._pipeline_idx + 1}/{len(main_window._pipeline_steps)}] 正在执行: {step_name}...")
-    main_window.log(f"📌 步骤 {main_window._pipeline_idx + 1}: {step_name}")
+    outputs = result['results']
+    for name in ('map', 'font'):
+        # 只在内存中交给下游步骤的中间产物没有写盘
+        if isinstance(outputs.get(name), str) and os.path.exists(outputs[name]):
+            main_window.on_worker_done(outputs[name])
 
-    try:
-        if step_type == 'map':
-            main_window.do_gen_map()
-        elif step_type == 'font':
-            main_window.do_gen_font()
-        elif step_type == 'subset':
-            main_window.do_subset()
-        elif step_type == 'checkup':
-            main_window.do_checkup('subset')
-            main_window._pipeline_idx += 1
-            _run_next_pipeline_step(main_window)
-            return
-
-        if hasattr(main_window, 'worker') and main_window.worker:
-            main_window.worker.done.disconnect()
-            main_window.worker.done.connect(main_window._on_pipeline_step_done)
-    except Exception as e:
-        main_window.log(f"❌ 步骤失败: {e}")
-        main_window.pipe_status.setText(f"❌ 失败于步骤: {step_name}")
+    if result['failed']:
+        main_window.pipe_status.setText(f"❌ 未完成的步骤: {', '.join(result['failed'])}")
+    else:
+        main_window.pipe_status.setText(f"✅ 工作流全部完成！(沿用缓存 {len(result['skipped'])} 步)")
 
-def _on_pipeline_step_done(main_window, result):
-    from PyQt6.QtCore import QTimer
-    main_window._pipeline_idx += 1
-    QTimer.singleShot(500, lambda: _run_next_pipeline_step(main_window))
+    if 'checkup' in outputs:
+        _on_checkup_done(main_window, main_window.sub_font.text(), outputs['checkup'])
+    elif not result['failed']:
+        QMessageBox.information(main_window, "完成", "工作流已全部执行完毕！")
 
 def do_read_font_info(main_window):
-    from PyQt6.QtCore import Qt
     font_path = main_window.info_font.text()
     if not os.path.exists(font_path):
         QMessageBox.warning(main_window, "文件不存在", "请先选择有效的字体文件")
         return
 
-    try:
-        font = TTFont(font_path)
-        name_table = font['name']
-        
-        name_map = {
-            0: "Copyright (版权)", 1: "Family Name (族名)", 2: "Subfamily (子族)",
-            3: "Unique ID (唯一ID)", 4: "Full Name (完整名)", 5: "Version (版本)",
-            6: "PostScript Name", 7: "Trademark (商标)", 8: "Manufacturer (厂商)",
-            9: "Designer (设计师)", 10: "Description (描述)", 11: "Vendor URL (厂商链接)",
-            12: "Designer URL (设计师链接)", 13: "License (许可证)", 14: "License URL",
-            16: "Typographic Family", 17: "Typographic Subfamily"
-        }
+    main_window.run_worker('read_info', {'path': font_path}, lambda result: _on_font_info_read(main_window, result))
 
-        main_window.info_table.setRowCount(0)
+def _on_font_info_read(main_window, rows):
+    if rows is None: return
+    main_window.info_table.setRowCount(len(rows))
+    
+    for row, (name_id, desc, value) in enumerate(rows):
+        id_item = QTableWidgetItem(str(name_id))
+        id_item.setFlags(Qt.ItemFlag.ItemIsEnabled)
+        id_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
         
-        records = []
-        for record in name_table.names:
-            if record.platformID == 3:
-                records.append(record)
+        name_item = QTableWidgetItem(desc)
+        name_item.setFlags(Qt.ItemFlag.ItemIsEnabled)
         
-        records.sort(key=lambda x: x.nameID)
-
-        main_window.info_table.setRowCount(len(records))
+        val_item = QTableWidgetItem(value)
         
-        for row, record in enumerate(records):
-            id_item = QTableWidgetItem(str(record.nameID))
-            id_item.setFlags(Qt.ItemFlag.ItemIsEnabled)
-            id_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            
-            desc = name_map.get(record.nameID, f"Unknown ID {record.nameID}")
-            if record.langID == 1041: desc += " [🇯🇵 JP]"
-            elif record.langID == 2052: desc += " [🇨🇳 CN]"
-            elif record.langID == 1033: desc += " [🇺🇸 EN]"
-            
-            name_item = QTableWidgetItem(desc)
-            name_item.setFlags(Qt.ItemFlag.ItemIsEnabled)
-            
-            try:
-                value = record.toUnicode()
-            except:
-                value = "<无法解码的数据>"
-            
-            val_item = QTableWidgetItem(value)
-            
-            main_window.info_table.setItem(row, 0, id_item)
-            main_window.info_table.setItem(row, 1, name_item)
-            main_window.info_table.setItem(row, 2, val_item)
-
-        main_window.log(f"📖 成功读取 {len(records)} 条元数据。")
-
-    except Exception as e:
-        QMessageBox.critical(main_window, "读取失败", f"无法读取字体: {e}")
-        traceback.print_exc()
+        main_window.info_table.setItem(row, 0, id_item)
+        main_window.info_table.setItem(row, 1, name_item)
+        main_window.info_table.setItem(row, 2, val_item)
 
 def do_save_font_info(main_window):
     font_path = main_window.info_font.text()
     if not os.path.exists(font_path): return
 
-    try:
-        from core.history_manager import get_history_manager
-        history = get_history_manager()
-        
-        font = TTFont(font_path)
-        name_table = font['name']
+    rows = []
+    for row in range(main_window.info_table.rowCount()):
+        id_item = main_window.info_table.item(row, 0)
+        val_item = main_window.info_table.item(row, 2)
         
-        updated_count = 0
-        
-        for row in range(main_window.info_table.rowCount()):
-            id_item = main_window.info_table.item(row, 0)
-            val_item = main_window.info_table.item(row, 2)
-            
-            if not id_item or not val_item: continue
-            
-            nid = int(id_item.text())
-            new_string = val_item.text()
-            
-            for record in name_table.names:
-                if record.platformID == 3 and record.nameID == nid:
-                    try:
-                        old_str = record.toUnicode()
-                        if old_str != new_string:
-                            record.string = new_string.encode('utf-16-be')
-                            updated_count += 1
-                    except:
-                        pass
-
-        out_path = font_path.replace('.ttf', '_mod.ttf').replace('.otf', '_mod.otf')
-        file_existed = os.path.exists(out_path)
-        
-        if file_existed:
-            history.record_before_overwrite("修改元数据", out_path, f"更新{updated_count}条")
-        
-        font.save(out_path)
-        
-        if not file_existed and os.path.exists(out_path):
-            history.record_new_file("修改元数据", out_path, f"更新{updated_count}条")
-        elif os.path.exists(out_path):
-            history.record("修改元数据", out_path, f"更新{updated_count}条")
-        
-        update_history_buttons(main_window)
-        
-        main_window.log(f"💾 已保存修改！更新了相关记录。")
-        main_window.log(f"   输出文件: {out_path}")
-        QMessageBox.information(main_window, "成功", f"字体元数据已更新！\n保存在: {os.path.basename(out_path)}")
+        if not id_item or not val_item: continue
+        rows.append((int(id_item.text()), val_item.text()))
 
-    except Exception as e:
-        main_window.log(f"❌ 保存失败: {e}")
-        QMessageBox.critical(main_window, "保存失败", str(e))
+    main_window.run_worker('save_info', {'path': font_path, 'rows': rows},
+                           lambda result: _on_font_saved(main_window, result, "成功", "字体元数据已更新！\n保存在: {}"))
 
 def do_compare_fonts(main_window):
     path1 = main_window.cmp_font1.text()
@@ -603,43 +269,13 @@ def do_compare_fonts(main_window):
         QMessageBox.warning(main_window, "文件不存在", "请确保两个字体文件都存在")
         return
 
-    try:
-        chars1 = set(font_cache.get_cmap(path1).keys())
-        chars2 = set(font_cache.get_cmap(path2).keys())
-
-        common = chars1 & chars2
-        only_a = chars1 - chars2
-        only_b = chars2 - chars1
-
-        lines = []
-        lines.append(f"📊 字符集对比结果")
-        lines.append(f"{'=' * 40}")
-        lines.append(f"字体 A: {os.path.basename(path1)} ({len(chars1)} 字符)")
-        lines.append(f"字体 B: {os.path.basename(path2)} ({len(chars2)} 字符)")
-        lines.append(f"{'=' * 40}")
-        lines.append(f"✅ 共有字符: {len(common)}")
-        lines.append(f"🅰️ A 独有: {len(only_a)}")
-        lines.append(f"🅱️ B 独有: {len(only_b)}")
-        lines.append("")
-
-        if only_a:
-            lines.append("─── A 独有的字符 (前100个) ───")
-            sample_a = sorted(only_a)[:100]
-            lines.append(''.join(chr(c) for c in sample_a if c < 0x10000))
-            lines.append("")
-
-        if only_b:
-            lines.append("─── B 独有的字符 (前100个) ───")
-            sample_b = sorted(only_b)[:100]
-            lines.append(''.join(chr(c) for c in sample_b if c < 0x10000))
-
-        main_window.cmp_result.setPlainText("\n".join(lines))
-        main_window._compare_result = {'only_a': only_a, 'only_b': only_b, 'common': common}
-
-        main_window.log(f"🔍 对比完成: A独有 {len(only_a)}, B独有 {len(only_b)}, 共有 {len(common)}")
+    main_window.run_worker('compare', {'path1': path1, 'path2': path2},
+                           lambda result: _on_fonts_compared(main_window, result))
 
-    except Exception as e:
-        QMessageBox.critical(main_window, "对比失败", f"无法对比字体: {e}")
+def _on_fonts_compared(main_window, result):
+    if not result: return
+    main_window.cmp_result.setPlainText(result['text'])
+    main_window._compare_result = {'only_a': result['only_a'], 'only_b': result['only_b'], 'common': result['common']}
 
 def do_export_diff(main_window):
     if not main_window._compare_result:
@@ -659,11 +295,11 @@ def do_export_diff(main_window):
             only_b = main_window._compare_result.get('only_b', set())
 
             f.write(f"A 独有字符 ({len(only_a)} 个):\n")
-            f.write(''.join(chr(c) for c in sorted(only_a) if c < 0x10000))
+            f.write(''.join(c for c in only_a if c < '\U00010000'))
             f.write("\n\n")
 
             f.write(f"B 独有字符 ({len(only_b)} 个):\n")
-            f.write(''.join(chr(c) for c in sorted(only_b) if c < 0x10000))
+            f.write(''.join(c for c in only_b if c < '\U00010000'))
 
         main_window.log(f"📥 已导出差异报告: {path}")
         QMessageBox.information(main_window, "导出成功", f"已保存到:\n{path}")
@@ -671,17 +307,16 @@ def do_export_diff(main_window):
     except Exception as e:
         QMessageBox.critical(main_window, "导出失败", str(e))
 
-def do_checkup(main_window, source):
+def _checkup_conf(main_window, source):
     if source == 'map':
-        txt_dir = main_window.map_src.text()
-        exts = main_window.map_ext.text().split(';')
-        font_path = main_window.in_src.text()
-        json_path = main_window.in_json.text()
-    else:
-        txt_dir = main_window.sub_txt.text()
-        exts = ".txt;.json".split(';')
-        font_path = main_window.sub_font.text()
-        json_path = main_window.sub_json.text()
+        return {'txt_dir': main_window.map_src.text(), 'exts': main_window.map_ext.text(),
+                'font_path': main_window.in_src.text(), 'json_path': main_window.in_json.text()}
+    return {'txt_dir': main_window.sub_txt.text(), 'exts': ".txt;.json",
+            'font_path': main_window.sub_font.text(), 'json_path': main_window.sub_json.text()}
+
+def do_checkup(main_window, source):
+    conf = _checkup_conf(main_window, source)
+    txt_dir, font_path, json_path = conf['txt_dir'], conf['font_path'], conf['json_path']
 
     has_txt_dir = os.path.exists(txt_dir)
     has_json = os.path.exists(json_path)
@@ -693,61 +328,19 @@ def do_checkup(main_window, source):
         QMessageBox.warning(main_window, "路径无效", "请先指定字体文件！")
         return
 
-    main_window.log("🩺 <b>开始体检...</b>")
+    main_window.run_worker('checkup', conf, lambda result: _on_checkup_done(main_window, font_path, result))
 
-    all_chars = set()
-
-    if has_txt_dir:
-        all_files = []
-        for ext in exts:
-            ext = ext.strip()
-            if not ext: continue
-            if not ext.startswith('.'): ext = '.' + ext
-            all_files.extend(glob.glob(os.path.join(txt_dir, '**', f'*{ext}'), recursive=True))
-
-        main_window.log(f"   扫描文本目录: {len(all_files)} 个文件")
-
-        for fpath in all_files:
-            try:
-                with open(fpath, 'r', encoding='utf-8') as f:
-                    all_chars.update(f.read())
-            except:
-                pass
-    else:
-        main_window.log("   ⚠️ 文本目录不存在，跳过")
-
-    if has_json:
-        try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                all_chars.update(data.keys())
-                all_chars.update(data.values())
-                main_window.log(f"   读取映射表: {len(data)} 条映射")
-        except Exception as e:
-            main_window.log(f"   ⚠️ 映射表读取失败: {e}")
-    else:
-        main_window.log("   ⚠️ 映射表不存在，跳过")
-
-    try:
-        cmap = font_cache.get_cmap(font_path)
-        font_chars = set(chr(c) for c in cmap.keys())
-        main_window.log(f"   字体包含 {len(font_chars)} 个字符")
-    except Exception as e:
-        QMessageBox.critical(main_window, "字体读取失败", f"无法读取字体: {e}")
-        return
-
-    text_chars = {c for c in all_chars if c.isprintable() and not c.isspace()}
-    missing = text_chars - font_chars
-
-    main_window.log(f"   需要检查的可见字符: {len(text_chars)}")
-    main_window.log(f"   缺失字符: <b style='color:#F44336'>{len(missing)}</b>")
+def _on_checkup_done(main_window, font_path, result):
+    if not result: return
+    text_count = result['checked']
+    missing = result['missing']
 
     if not missing:
         QMessageBox.information(main_window, "✅ 体检通过",
-                                f"恭喜！文本和映射表中的 {len(text_chars)} 个可见字符在字体中全部存在。")
+                                f"恭喜！文本和映射表中的 {text_count} 个可见字符在字体中全部存在。")
         main_window.log("✅ <b>体检通过！所有字符均存在于字体中。</b>")
     else:
-        missing_sorted = sorted(missing, key=lambda x: ord(x))
+        missing_sorted = missing
         display_list = missing_sorted[:50]
         display_str = '】【'.join(display_list)
         extra_msg = f"\n\n... 以及其他 {len(missing_sorted) - 50} 个字符" if len(missing_sorted) > 50 else ""
@@ -788,13 +381,7 @@ def do_smart_fallback_scan(main_window):
         'fb_dir': main_window.sf_lib.text()
     }
     main_window.sf_table.setRowCount(0)
-    if hasattr(main_window, 'worker') and main_window.worker.isRunning():
-        QMessageBox.warning(main_window, "忙碌", "后台任务正在运行中...")
-        return
-        
-    main_window.run_worker('smart_fallback', conf)
-    main_window.worker.done.disconnect()
-    main_window.worker.done.connect(main_window.on_smart_scan_done)
+    main_window.run_worker('smart_fallback', conf, main_window.on_smart_scan_done)
 
 def on_smart_scan_done(main_window, result):
     if not isinstance(result, dict): return
@@ -811,11 +398,19 @@ def on_smart_scan_done(main_window, result):
         
     main_window.sf_table.setSortingEnabled(True)
     main_window.lbl_status.setText(f"分析完成，找到 {len(result)} 个补全建议")
-    main_window.set_ui_busy(False)
     
     if len(result) > 0:
         QMessageBox.information(main_window, "完成", f"分析结束！\n成功为 {len(result)} 个缺失字符找到了来源字体。")
 
+def _smart_plan_from_table(main_window):
+    data = {}
+    for row in range(main_window.sf_table.rowCount()):
+        char = main_window.sf_table.item(row, 0).text()
+        font = main_window.sf_table.item(row, 2).text()
+        if font not in data: data[font] = ""
+        data[font] += char
+    return data
+
 def export_smart_result(main_window):
     if main_window.sf_table.rowCount() == 0:
         QMessageBox.warning(main_window, "无数据", "表格为空，请先运行分析。")
@@ -823,21 +418,39 @@ def export_smart_result(main_window):
         
     path, _ = QFileDialog.getSaveFileName(main_window, "保存清单", "fallback_plan.json", "JSON (*.json)")
     if path:
-        data = {}
-        for row in range(main_window.sf_table.rowCount()):
-            char = main_window.sf_table.item(row, 0).text()
-            font = main_window.sf_table.item(row, 2).text()
-            if font not in data: data[font] = ""
-            data[font] += char
+        data = _smart_plan_from_table(main_window)
         
         try:
             with open(path, 'w', encoding='utf-8') as f:
                 json.dump(data, f, ensure_ascii=False, indent=2)
             main_window.log(f"💾 补全清单已保存: {path}")
-            main_window.log("💡 您可以根据这个清单，使用【字体合并】功能进行定向补全。")
+            main_window.log("💡 您可以直接点击【一键补全】，或根据这个清单使用【字体合并】功能进行定向补全。")
         except Exception as e:
             main_window.log(f"❌ 保存失败: {e}")
 
+def do_apply_smart_result(main_window):
+    if main_window.sf_table.rowCount() == 0:
+        QMessageBox.warning(main_window, "无数据", "表格为空，请先运行分析。")
+        return
+
+    primary = main_window.sf_primary.text()
+    if not os.path.exists(primary):
+        QMessageBox.warning(main_window, "路径无效", "主字体不存在！")
+        return
+
+    base = os.path.splitext(primary)[0]
+    path, _ = QFileDialog.getSaveFileName(main_window, "保存补全后的字体", f"{base}_filled.ttf", "TrueType (*.ttf)")
+    if not path:
+        return
+
+    conf = {
+        'primary': primary,
+        'plan': _smart_plan_from_table(main_window),
+        'fb_dir': main_window.sf_lib.text(),
+        'out_path': path
+    }
+    main_window.run_worker('transplant', conf)
+
 def do_gen_woff2(main_window):
     src = main_window.woff2_src.text()
     if not os.path.exists(src):
@@ -884,21 +497,13 @@ def do_gen_bmfont(main_window):
         return
 
     try:
-        content = ""
         if os.path.isdir(txt_path):
             exts = ('.txt', '.json', '.c', '.cpp', '.h', '.hpp', '.py', '.md', '.ini')
-            for root, dirs, files in os.walk(txt_path):
-                for file in files:
-                    if file.lower().endswith(exts):
-                        try:
-                            with open(os.path.join(root, file), 'r', encoding='utf-8', errors='ignore') as f:
-                                content += f.read()
-                        except: pass
+            found = scan_files(find_files(txt_path, exts), errors='ignore')
         else:
-            with open(txt_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
+            found = read_chars(txt_path, errors='ignore')
         
-        chars = sorted(list(set([c for c in content if c >= ' '])))
+        chars = sorted(c for c in found if c >= ' ')
         
         if not chars:
             QMessageBox.warning(main_window, "错误", "未能找到有效可显示字符")
@@ -916,26 +521,26 @@ def do_gen_bmfont(main_window):
     except Exception as e:
         QMessageBox.critical(main_window, "错误", f"读取字符文件失败: {e}")
 
-def do_gen_font(main_window):
-    mode_idx = main_window.combo_mode.currentIndex()
-    if mode_idx == 0:
-        QMessageBox.warning(main_window, "未选择模式", "请先在下拉菜单中选择一个处理模式！")
-        return
-
+def _font_conf(main_window):
     output_dir = ""
     if hasattr(main_window, 'in_output_dir') and main_window.in_output_dir.text().strip():
         output_dir = main_window.in_output_dir.text().strip()
 
-    conf = {
+    return {
         'src': main_window.in_src.text(),
         'fallback': main_window.in_fallback.text(),
         'json': main_window.in_json.text(),
         'file_name': main_window.in_file_name.text(),
         'internal_name': main_window.in_font_name.text(),
-        'mode': mode_idx,
+        'mode': main_window.combo_mode.currentIndex(),
         'output_dir': output_dir
     }
-    main_window.run_worker('font', conf)
+
+def do_gen_font(main_window):
+    if main_window.combo_mode.currentIndex() == 0:
+        QMessageBox.warning(main_window, "未选择模式", "请先在下拉菜单中选择一个处理模式！")
+        return
+    main_window.run_worker('font', _font_conf(main_window))
 
 def do_gen_pic(main_window):
     conf = {
@@ -944,7 +549,8 @@ def do_gen_pic(main_window):
         'cw': int(main_window.pic_cw.text()), 'ch': int(main_window.pic_ch.text()),
         'iw': int(main_window.pic_iw.text()), 'ih': int(main_window.pic_ih.text()),
         'img_w': int(main_window.pic_imw.text()), 'img_h': int(main_window.pic_imh.text()),
-        'ix': int(main_window.pic_ix.text()), 'iy': int(main_window.pic_iy.text())
+        'ix': int(main_window.pic_ix.text()), 'iy': int(main_window.pic_iy.text()),
+        'codepage': _codepage(main_window.imgfont_codepage)
     }
     main_window.run_worker('pic', conf)
 
@@ -955,7 +561,8 @@ def do_gen_tga(main_window):
         'fsize': int(main_window.tga_fs.text()),
         'cw': int(main_window.tga_cw.text()), 'ch': int(main_window.tga_ch.text()),
         'iw': int(main_window.tga_iw.text()), 'ih': int(main_window.tga_ih.text()),
-        'img_w': int(main_window.tga_w.text()), 'img_h': int(main_window.tga_h.text())
+        'img_w': int(main_window.tga_w.text()), 'img_h': int(main_window.tga_h.text()),
+        'codepage': _codepage(main_window.imgfont_codepage)
     }
     main_window.run_worker('tga', conf)
 
@@ -965,7 +572,8 @@ def do_gen_bmp(main_window):
         'font': main_window.bmp_font.text(), 'folder': 'bmp_output',
         'fsize': int(main_window.bmp_fs.text()), 'cw': sz, 'ch': sz,
         'count': int(main_window.bmp_cnt.text()), 'img_w': int(main_window.bmp_w.text()),
-        'scale': float(main_window.bmp_scale.text()), 'depth': int(main_window.bmp_depth.text())
+        'scale': float(main_window.bmp_scale.text()), 'depth': int(main_window.bmp_depth.text()),
+        'codepage': _codepage(main_window.imgfont_codepage)
     }
     main_window.run_worker('bmp', conf)
 
@@ -980,15 +588,20 @@ def do_gen_imgfont(main_window):
     elif mode == 3:
         do_gen_bmfont(main_window)
 
-def do_gen_map(main_window):
-    conf = {
+def _map_conf(main_window):
+    return {
         'src_dir': main_window.map_src.text(),
         'out_dir': main_window.map_out.text(),
         'out_json': main_window.map_json.text(),
         'exts': main_window.map_ext.text(),
-        'limit_font': getattr(main_window, 'map_limit_font', None).text() if hasattr(main_window, 'map_limit_font') else ""
+        'limit_font': getattr(main_window, 'map_limit_font', None).text() if hasattr(main_window, 'map_limit_font') else "",
+        'incremental': main_window.chk_map_incremental.isChecked(),
+        'recycle': main_window.chk_map_recycle.isChecked(),
+        'codepage': _codepage(main_window.map_codepage),
     }
-    main_window.run_worker('map', conf)
+
+def do_gen_map(main_window):
+    main_window.run_worker('map', _map_conf(main_window))
 
 def do_preview_mapping(main_window):
     json_path = main_window.in_json.text()
@@ -1091,104 +704,13 @@ def do_convert_format(main_window):
         QMessageBox.warning(main_window, "格式错误", "仅支持 TTF 和 OTF 格式互转")
         return
     
-    try:
-        from core.history_manager import get_history_manager
-        history = get_history_manager()
-        
-        main_window.log("🔄 <b>开始格式转换...</b>")
-        main_window.log(f"   源文件: {os.path.basename(src_path)} ({src_ext.upper()})")
-        main_window.log(f"   目标: {os.path.basename(out_path)} ({out_ext.upper()})")
-        
-        font = TTFont(src_path)
-        
-        if src_ext == '.otf' and out_ext == '.ttf':
-            if 'CFF ' in font:
-                main_window.log("   ⚠️ CFF 轮廓字体，正在转换为 TrueType 轮廓...")
-                try:
-                    from fontTools.pens.cu2quPen import Cu2QuPen
-                    from fontTools.pens.ttGlyphPen import TTGlyphPen
-                    from fontTools.ttLib.tables._g_l_y_f import Glyph
-                    from fontTools.ttLib.tables import _g_l_y_f
-                    
-                    glyph_order = font.getGlyphOrder()
-                    glyph_set = font.getGlyphSet()
-                    
-                    glyphs = {}
-                    widths = {}
-                    failed_glyphs = []
-                    
-                    max_err = 1.0
-                    
-                    for glyph_name in glyph_order:
-                        try:
-                            tt_pen = TTGlyphPen(None)
-                            cu2qu_pen = Cu2QuPen(tt_pen, max_err, reverse_direction=True)
-                            glyph_set[glyph_name].draw(cu2qu_pen)
-                            glyphs[glyph_name] = tt_pen.glyph()
-                            widths[glyph_name] = glyph_set[glyph_name].width
-                        except Exception as glyph_err:
-                            failed_glyphs.append(glyph_name)
-                            glyphs[glyph_name] = Glyph()
-                            widths[glyph_name] = glyph_set[glyph_name].width if glyph_name in glyph_set else 0
-                    
-                    if failed_glyphs:
-                        main_window.log(f"   ⚠️ {len(failed_glyphs)} 个字形转换失败: {', '.join(failed_glyphs[:5])}{'...' if len(failed_glyphs) > 5 else ''}")
-                    
-                    del font['CFF ']
-                    if 'CFF2' in font:
-                        del font['CFF2']
-                    
-                    glyf_table = _g_l_y_f.table__g_l_y_f()
-                    glyf_table.glyphs = glyphs
-                    font['glyf'] = glyf_table
-                    
-                    from fontTools.ttLib.tables import _l_o_c_a
-                    font['loca'] = _l_o_c_a.table__l_o_c_a()
-                    
-                    font['maxp'].tableTag = 'maxp'
-                    font['maxp'].version = 0x00010000
-                    
-                    font['head'].glyphDataFormat = 0
-                    
-                    main_window.log(f"   ✓ 轮廓转换完成 ({len(glyph_order) - len(failed_glyphs)}/{len(glyph_order)} 成功)")
-                    
-                except ImportError:
-                    main_window.log("   ❌ 缺少 cu2qu 库，请运行: pip install cu2qu")
-                    QMessageBox.warning(main_window, "缺少依赖", "请先安装 cu2qu 库：\npip install cu2qu")
-                    font.close()
-                    return
-                except Exception as conv_err:
-                    main_window.log(f"   ❌ 轮廓转换失败: {conv_err}")
-                    traceback.print_exc()
-                    QMessageBox.critical(main_window, "转换失败", f"CFF 轮廓转换失败：\n{conv_err}")
-                    font.close()
-                    return
-        
-        elif src_ext == '.ttf' and out_ext == '.otf':
-            main_window.log("   TTF -> OTF: 保持 TrueType 轮廓 (仅改变容器格式)")
-        
-        file_existed = os.path.exists(out_path)
-        if file_existed:
-            history.record_before_overwrite("格式转换", out_path, f"{src_ext} -> {out_ext}")
-        
-        font.save(out_path)
-        font.close()
-        
-        if not file_existed and os.path.exists(out_path):
-            history.record_new_file("格式转换", out_path, f"{src_ext} -> {out_ext}")
-        elif os.path.exists(out_path):
-            history.record("格式转换", out_path, f"{src_ext} -> {out_ext}")
-        
-        update_history_buttons(main_window)
-        
-        main_window.log(f"✅ <b>转换完成!</b>")
-        main_window.log(f"   输出: {out_path}")
-        QMessageBox.information(main_window, "转换成功", f"格式转换完成！\n输出: {out_path}")
-        
-    except Exception as e:
-        main_window.log(f"❌ 转换失败: {e}")
-        traceback.print_exc()
-        QMessageBox.critical(main_window, "转换失败", f"转换出错: {e}")
+    main_window.run_worker('convert', {'src': src_path, 'out_path': out_path},
+                           lambda result: _on_font_saved(main_window, result, "转换成功", "格式转换完成！\n输出: {}"))
+
+# 图片字库的排版参数：配置里的键名即控件名去掉前缀 (pic_cw -> cw)
+_PIC_LAYOUT = ('cw', 'ch', 'iw', 'ih', 'imw', 'imh', 'ix', 'iy')
+_TGA_LAYOUT = ('eng_n', 'eng_p', 'fs', 'cw', 'ch', 'iw', 'ih', 'w', 'h')
+_BMP_LAYOUT = ('sz', 'cnt', 'w', 'scale', 'depth')
 
 def do_export_config(main_window):
     config = {
@@ -1209,6 +731,10 @@ def do_export_config(main_window):
             'out': main_window.map_out.text(),
             'json': main_window.map_json.text(),
             'ext': main_window.map_ext.text(),
+            'limit_font': main_window.map_limit_font.text() if hasattr(main_window, 'map_limit_font') else '',
+            'incremental': main_window.chk_map_incremental.isChecked(),
+            'recycle': main_window.chk_map_recycle.isChecked(),
+            'codepage': _codepage(main_window.map_codepage),
         },
         'subset': {
             'font': main_window.sub_font.text(),
@@ -1228,14 +754,20 @@ def do_export_config(main_window):
             'fmt': main_window.pic_fmt.text(),
             'fs': main_window.pic_fs.text(),
             'cnt': main_window.pic_cnt.text(),
+            **{key: getattr(main_window, f'pic_{key}').text() for key in _PIC_LAYOUT},
+            'codepage': _codepage(main_window.imgfont_codepage),
         },
         'tga': {
             'font': main_window.tga_font.text(),
             'dat': main_window.tga_dat.text(),
+            **{key: getattr(main_window, f'tga_{key}').text() for key in _TGA_LAYOUT},
+            'codepage': _codepage(main_window.imgfont_codepage),
         },
         'bmp': {
             'font': main_window.bmp_font.text(),
             'fs': main_window.bmp_fs.text(),
+            **{key: getattr(main_window, f'bmp_{key}').text() for key in _BMP_LAYOUT},
+            'codepage': _codepage(main_window.imgfont_codepage),
         },
         'woff2': {
             'src': main_window.woff2_src.text() if hasattr(main_window, 'woff2_src') else '',
@@ -1245,6 +777,12 @@ def do_export_config(main_window):
             'src': main_window.fix_src.text() if hasattr(main_window, 'fix_src') else '',
             'ref': main_window.fix_ref.text() if hasattr(main_window, 'fix_ref') else '',
             'out': main_window.fix_out.text() if hasattr(main_window, 'fix_out') else '',
+            'scale_x': main_window.fix_scale_x.text() if hasattr(main_window, 'fix_scale_x') else '',
+            'scale_y': main_window.fix_scale_y.text() if hasattr(main_window, 'fix_scale_y') else '',
+            'spacing': main_window.fix_spacing.text() if hasattr(main_window, 'fix_spacing') else '',
+            'asc': main_window.fix_asc.text() if hasattr(main_window, 'fix_asc') else '',
+            'desc': main_window.fix_desc.text() if hasattr(main_window, 'fix_desc') else '',
+            'gap': main_window.fix_gap.text() if hasattr(main_window, 'fix_gap') else '',
         },
     }
     
@@ -1298,6 +836,11 @@ def do_import_config(main_window):
             if 'out' in m: main_window.map_out.setText(m['out'])
             if 'json' in m: main_window.map_json.setText(m['json'])
             if 'ext' in m: main_window.map_ext.setText(m['ext'])
+            if 'limit_font' in m and hasattr(main_window, 'map_limit_font'):
+                main_window.map_limit_font.setText(m['limit_font'])
+            if 'incremental' in m: main_window.chk_map_incremental.setChecked(bool(m['incremental']))
+            if 'recycle' in m: main_window.chk_map_recycle.setChecked(bool(m['recycle']))
+            if m.get('codepage') in CODEPAGES: main_window.map_codepage.setCurrentIndex(list(CODEPAGES).index(m['codepage']))
         
         if 'subset' in config:
             s = config['subset']
@@ -1320,16 +863,29 @@ def do_import_config(main_window):
             if 'fmt' in p: main_window.pic_fmt.setText(p['fmt'])
             if 'fs' in p: main_window.pic_fs.setText(p['fs'])
             if 'cnt' in p: main_window.pic_cnt.setText(p['cnt'])
+            for key in _PIC_LAYOUT:
+                if key in p: getattr(main_window, f'pic_{key}').setText(str(p[key]))
         
         if 'tga' in config:
             tg = config['tga']
             if 'font' in tg: main_window.tga_font.setText(tg['font'])
             if 'dat' in tg: main_window.tga_dat.setText(tg['dat'])
+            for key in _TGA_LAYOUT:
+                if key in tg: getattr(main_window, f'tga_{key}').setText(str(tg[key]))
         
         if 'bmp' in config:
             bm = config['bmp']
             if 'font' in bm: main_window.bmp_font.setText(bm['font'])
             if 'fs' in bm: main_window.bmp_fs.setText(bm['fs'])
+            for key in _BMP_LAYOUT:
+                if key in bm: getattr(main_window, f'bmp_{key}').setText(str(bm[key]))
+        
+        # 三种图片字库共用一个代码页选项
+        for name in ('pic', 'tga', 'bmp'):
+            codepage = config.get(name, {}).get('codepage')
+            if codepage in CODEPAGES:
+                main_window.imgfont_codepage.setCurrentIndex(list(CODEPAGES).index(codepage))
+                break
         
         if 'woff2' in config and hasattr(main_window, 'woff2_src'):
             w = config['woff2']
@@ -1341,6 +897,9 @@ def do_import_config(main_window):
             if 'src' in fx: main_window.fix_src.setText(fx['src'])
             if 'ref' in fx: main_window.fix_ref.setText(fx['ref'])
             if 'out' in fx: main_window.fix_out.setText(fx['out'])
+            for key in ('scale_x', 'scale_y', 'spacing', 'asc', 'desc', 'gap'):
+                if key in fx and hasattr(main_window, f'fix_{key}'):
+                    getattr(main_window, f'fix_{key}').setText(str(fx[key]))
         
         main_window.log(f"📂 配置已导入: {os.path.basename(load_path)}")
         QMessageBox.information(main_window, "导入成功", f"已从配置文件恢复设置：\n{os.path.basename(load_path)}")
@@ -18,6 +18,9 @@ def paintEvent(main_window, event):
     painter.strokePath(path, pen)
 
 def closeEvent(main_window, event):
+    if main_window.scheduler.is_busy():
+        main_window.scheduler.cancel_all()
+        main_window.scheduler.wait_all()
     main_window.settings.setValue("in_src", main_window.in_src.text())
     main_window.settings.setValue("in_fallback", main_window.in_fallback.text())
     main_window.settings.setValue("in_json", main_window.in_json.text())
@@ -26,6 +29,7 @@ def closeEvent(main_window, event):
     main_window.settings.setValue("lock_file_name", main_window.chk_lock_file_name.isChecked())
     main_window.settings.setValue("lock_font_name", main_window.chk_lock_font_name.isChecked())
     main_window.settings.setValue("theme", main_window.current_theme_name)
+    main_window.settings.setValue("max_jobs", main_window.spin_max_jobs.value())
     if hasattr(main_window, 'in_output_dir'):
         main_window.settings.setValue("output_dir", main_window.in_output_dir.text())
     if hasattr(main_window, 'recent_files'):
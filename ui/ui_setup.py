@@ -9,6 +9,14 @@ from PyQt6.QtGui import QFont
 
 from .widgets import IOSInput, IOSButton
 from config import HAS_BROTLI
+from core.codepage_index import CODEPAGES
+
+def _codepage_combo(tooltip):
+    combo = QComboBox()
+    combo.addItems([spec['label'] for spec in CODEPAGES.values()])
+    combo.setFixedHeight(38)
+    combo.setToolTip(tooltip)
+    return combo
 
 def setup_image_font_ui(main_window, parent_widget):
     """统一的图片字库生成界面，通过下拉框选择不同模式"""
@@ -31,6 +39,9 @@ def setup_image_font_ui(main_window, parent_widget):
     main_window.imgfont_mode.setFixedHeight(38)
     main_window.imgfont_mode.currentIndexChanged.connect(lambda idx: main_window.imgfont_stack.setCurrentIndex(idx))
     mode_layout.addWidget(main_window.imgfont_mode)
+    mode_layout.addWidget(QLabel("编码:"))
+    main_window.imgfont_codepage = _codepage_combo("图片/TGA/BMP 字库按该编码的码位排列 (BMFont 不受影响)")
+    mode_layout.addWidget(main_window.imgfont_codepage)
     l.addLayout(mode_layout)
     
     line = QFrame()
@@ -266,6 +277,18 @@ def setup_mapping_manager_ui(main_window, parent_widget):
     gd_map.addWidget(main_window.map_ext, 3, 1)
     gd_map.addWidget(QLabel("限制字体(选):"), 4, 0)
     gd_map.addLayout(main_window.create_file_row(main_window.map_limit_font, btn_limit_font), 4, 1)
+    main_window.chk_map_incremental = QCheckBox("增量分配 (沿用上次码表)")
+    main_window.chk_map_incremental.setToolTip("保留输出码表中已有的分配，只给新字符分配空位，只重写含有变动字符的文件")
+    main_window.chk_map_recycle = QCheckBox("回收不再使用的空位")
+    main_window.chk_map_recycle.setToolTip("上次码表中已不在文本里的字符让出空位；不勾选时只追加")
+    box_inc = QHBoxLayout()
+    box_inc.addWidget(main_window.chk_map_incremental)
+    box_inc.addWidget(main_window.chk_map_recycle)
+    box_inc.addStretch()
+    gd_map.addLayout(box_inc, 5, 1)
+    main_window.map_codepage = _codepage_combo("游戏引擎使用的编码：不在其中的字符会被映射到该编码的汉字区")
+    gd_map.addWidget(QLabel("目标编码:"), 6, 0)
+    gd_map.addWidget(main_window.map_codepage, 6, 1)
     l_map.addLayout(gd_map)
     info_txt = QLabel("将包含翻译文本的文件夹直接拖入上方输入框即可")
     info_txt.setStyleSheet("color: gray; font-size: 11px;")
@@ -750,10 +773,14 @@ def setup_smart_fallback_ui(main_window, parent_widget):
     main_window.btn_export_smart = QPushButton("导出补全清单")
     main_window.btn_export_smart.setFixedHeight(45)
     main_window.btn_export_smart.clicked.connect(main_window.export_smart_result)
+    main_window.btn_apply_smart = QPushButton("一键补全")
+    main_window.btn_apply_smart.setFixedHeight(45)
+    main_window.btn_apply_smart.clicked.connect(main_window.do_apply_smart_result)
     btn_box.addWidget(main_window.btn_run_smart)
     btn_box.addWidget(main_window.btn_export_smart)
+    btn_box.addWidget(main_window.btn_apply_smart)
     l_smart.addLayout(btn_box)
-    hint = QLabel("工具会扫描库中所有字体，优先推荐包含缺字数量最多的那个")
+    hint = QLabel("工具会扫描库中所有字体，用尽量少的字体补齐缺字；一键补全只加载、保存一次主字体")
     hint.setStyleSheet("color: gray; font-size: 11px;")
     l_smart.addWidget(hint)
 
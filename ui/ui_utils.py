@@ -3,7 +3,7 @@ import json
 from PyQt6.QtWidgets import QFileDialog, QMessageBox, QLabel, QHBoxLayout, QPushButton
 from PyQt6.QtGui import QColor, QFont, QFontDatabase
 from config import THEMES
-from core.worker import Worker
+from core.job_scheduler import JobScheduler, QUEUED
 
 def log(main_window, m):
     main_window.log_area.append(m)
@@ -96,19 +96,50 @@ def load_preset(main_window):
         main_window.log(f"❌ 加载预设失败: {e}")
         QMessageBox.warning(main_window, "加载失败", f"无法加载预设：\n{e}")
 
-def run_worker(main_window, task, conf):
-    main_window.set_ui_busy(True)
-    main_window.worker = Worker(task, conf)
-    main_window.worker.log.connect(main_window.log)
-    main_window.worker.prog.connect(main_window.progress.setValue)
-    main_window.worker.done.connect(main_window.on_worker_done)
-    main_window.worker.finished.connect(lambda: main_window.set_ui_busy(False))
-    main_window.worker.start()
+def setup_scheduler(main_window):
+    main_window.scheduler = JobScheduler(parent=main_window)
+    main_window.last_job = None
+    main_window.scheduler.job_log.connect(lambda jid, m: on_job_log(main_window, jid, m))
+    main_window.scheduler.job_prog.connect(lambda jid, v: update_job_status(main_window))
+    main_window.scheduler.job_started.connect(lambda jid: update_job_status(main_window))
+    main_window.scheduler.job_finished.connect(lambda jid, state: update_job_status(main_window))
+    main_window.scheduler.busy_changed.connect(main_window.set_ui_busy)
+
+def run_worker(main_window, task, conf, on_done=None):
+    job = main_window.scheduler.submit(task, conf, on_done or main_window.on_worker_done)
+    if job.state == QUEUED:
+        main_window.log(f"⏳ 任务 #{job.id} ({task}) 已排队，等待占用相同文件的任务完成")
+    main_window.last_job = job
+    return job
+
+def cancel_worker(main_window):
+    if main_window.scheduler.is_busy():
+        main_window.lbl_status.setText("正在取消...")
+        main_window.scheduler.cancel_all()
+
+def on_job_log(main_window, job_id, message):
+    job = main_window.scheduler.jobs.get(job_id)
+    # 多个任务同时输出时给每行加上任务编号，方便区分
+    if job is not None and len(main_window.scheduler.running()) > 1:
+        message = f"<span style='color:gray'>[#{job_id} {job.task}]</span> {message}"
+    main_window.log(message)
+
+def update_job_status(main_window):
+    running = main_window.scheduler.running()
+    pending = main_window.scheduler.pending()
+    if not running:
+        return
+    main_window.progress.setValue(sum(job.progress for job in running) // len(running))
+    main_window.progress.setToolTip("\n".join(f"#{job.id} {job.task}: {job.progress}%" for job in running))
+    status = f"正在处理 {len(running)} 个任务"
+    if pending:
+        status += f"，{len(pending)} 个排队中"
+    main_window.lbl_status.setText(status)
 
 def set_ui_busy(main_window, busy):
-    main_window.left_card.setEnabled(not busy)
-    main_window.right_card.setEnabled(not busy)
+    main_window.btn_cancel_task.setVisible(busy)
     main_window.progress.setValue(0 if busy else 100)
+    main_window.progress.setToolTip("")
     main_window.lbl_status.setText("正在处理..." if busy else "就绪")
 
 def on_worker_done(main_window, result):
@@ -148,6 +179,7 @@ def load_settings(main_window):
     main_window.chk_lock_font_name.setChecked(main_window.settings.value("lock_font_name", False) == "true" or main_window.settings.value("lock_font_name", False) is True)
     if hasattr(main_window, 'in_output_dir'):
         main_window.in_output_dir.setText(main_window.settings.value("output_dir", ""))
+    main_window.spin_max_jobs.setValue(int(main_window.settings.value("max_jobs", main_window.scheduler.max_jobs)))
     main_window.current_theme_name = main_window.settings.value("theme", "🌊 深海 (Ocean)")
     idx = main_window.combo_theme.findText(main_window.current_theme_name)
     if idx >= 0: main_window.combo_theme.setCurrentIndex(idx)